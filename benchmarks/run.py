@@ -0,0 +1,306 @@
+# Run this file from the root of this directory: python benchmarks/run.py [--sizes 10,100,1000,10000] [--json results.json]
+#
+# Measures SmartSQL's own overhead offline, with a FakeBackend in place of the AI and a local SQLite database
+# holding a synthetic schema of each size. Reports throughput, p50/p99 latency, prompt size and peak memory.
+# Startup (importing SmartSQL, then loading settings through to the first query's result) is timed in fresh processes.
+
+# IMPORT
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path[:0] = [os.getcwd(), os.path.join(os.getcwd(), 'src')]
+
+import src.settingsManager as settingsManager
+from src import SmartSQL
+from Helpers import FakeBackend
+
+
+WORDS = ['customer', 'order', 'product', 'invoice', 'payment', 'shipment', 'supplier', 'employee', 'account', 'region', 'store', 'warehouse', 'campaign', 'ticket', 'contract', 'asset']
+TYPES = ['INTEGER', 'TEXT', 'REAL', 'DATE']
+
+# Run in a fresh process for each startup measurement, printing its timings as JSON
+STARTUP = """
+import json, os, sys, time
+
+start = time.perf_counter()
+
+sys.path[:0] = [os.getcwd(), os.path.join(os.getcwd(), 'src')]
+
+import src.settingsManager as settingsManager
+from src import SmartSQL
+from Helpers import FakeBackend
+
+imported = time.perf_counter()
+
+settings = settingsManager.loadSettings(sys.argv[1])
+smartSQL = SmartSQL(settings, 'sqlite', confirmExecute=False, backend=FakeBackend(default=sys.argv[3]), DB_PATH=sys.argv[2])
+smartSQL.query(sys.argv[4])
+
+print(json.dumps({'import': imported - start, 'firstQuery': time.perf_counter() - imported}))
+"""
+
+
+# SYNTHETIC SCHEMA
+def syntheticSettings(tableCount: int, columnCount: int = 8, seed: int = 0) -> dict:
+	"""
+	Settings dictionary of a made up schema, each table holding a primary key, a foreign key to an earlier table and other columns
+
+	Args:
+		tableCount (int): Number of tables
+		columnCount (int): Columns per table
+		seed (int): Seed for the random names and links
+	"""
+
+	rng = random.Random(seed)
+	tables = []
+
+	for i in range(tableCount):
+		name = f"{rng.choice(WORDS)}_{rng.choice(WORDS)}_{i}"
+		layout = [column(f"{name}_id", 'INTEGER', f"Identifier of the {name.replace('_', ' ')}", isPrimaryKey=True)]
+
+		if i > 0:
+			parent = tables[rng.randrange(i)]['Name']
+			layout.append(column(f"{parent}_id", 'INTEGER', '', constraints=[f"FOREIGN KEY REFERENCES {parent}({parent}_id)"]))
+
+		while len(layout) < columnCount:
+			word = rng.choice(WORDS)
+			layout.append(column(f"{word}_{len(layout)}", rng.choice(TYPES), f"The {word} detail"))
+
+		tables.append({'Name': name, 'Description': f"Records of each {name.split('_')[0]} {name.split('_')[1]}", 'Layout': layout})
+
+	return {'Server_Name': 'Benchmark', 'Server_Description': 'a synthetic schema', 'SQL_Flavor': 'SQLite', 'Tables': tables}
+
+def column(name: str, type: str, description: str, isPrimaryKey: bool = False, constraints: list[str] = None) -> dict:
+	return {'Name': name, 'Type': type, 'Description': description, 'Properties': {'isPrimaryKey': isPrimaryKey, 'Foreign_Reference': '', 'Constraints': constraints or []}}
+
+def createDatabase(settings: dict, path: str, rows: int = 10) -> None:
+	"""
+	Create the tables of settings in a SQLite file, each with a few rows
+
+	Args:
+		settings (dict): Settings dictionary
+		path (str): Path of SQLite file
+		rows (int): Rows inserted per table
+	"""
+
+	import sqlite3
+
+	connection = sqlite3.connect(path)
+
+	for table in settings['Tables']:
+		columns = []
+
+		for entry in table['Layout']:
+			definition = f"{entry['Name']} {entry['Type']}{' PRIMARY KEY' if entry['Properties']['isPrimaryKey'] else ''}"
+
+			for constraint in entry['Properties']['Constraints']:
+				definition += f" {constraint.replace('FOREIGN KEY ', '')}"
+
+			columns.append(definition)
+
+		connection.execute(f"CREATE TABLE {table['Name']} ({', '.join(columns)})")
+		connection.executemany(f"INSERT INTO {table['Name']} ({table['Layout'][0]['Name']}) VALUES (?)", [(i,) for i in range(rows)])
+
+	connection.commit()
+	connection.close()
+
+
+# MEASURING
+def measure(name: str, size: int, run, iterations: int) -> dict:
+	"""
+	Call run() iterations times, timing each call, after measuring the peak memory of one call
+
+	Args:
+		name (str): Name of benchmark
+		size (int): Number of tables
+		run (callable): Benchmarked work, returning the prompt tokens of the call (or None)
+		iterations (int): Number of calls
+	"""
+
+	latencies = []
+	tokens = []
+
+	# Peak memory of one call, measured apart since tracing slows every allocation
+	tracemalloc.start()
+	run()
+	peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+
+	start = time.perf_counter()
+
+	for _ in range(iterations):
+		callStart = time.perf_counter()
+		result = run()
+		latencies.append(time.perf_counter() - callStart)
+
+		if result != None:
+			tokens.append(result)
+
+	elapsed = time.perf_counter() - start
+
+	latencies.sort()
+
+	return {
+		'benchmark': name,
+		'tables': size,
+		'iterations': iterations,
+		'throughput': iterations / elapsed,
+		'p50Ms': latencies[len(latencies) // 2] * 1000,
+		'p99Ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+		'promptTokens': sum(tokens) / len(tokens) if tokens else None,
+		'peakMemoryMB': peak / 2**20
+	}
+
+def measureStartup(size: int, settingsPath: str, path: str, sql: str, query: str, iterations: int) -> list[dict]:
+	"""
+	Time importing SmartSQL, then everything up to the first query's result, each in a fresh process
+
+	Args:
+		size (int): Number of tables
+		settingsPath (str): Path of the settings JSON
+		path (str): Path of the SQLite file
+		sql (str): SQL the fake AI replies with
+		query (str): Request of the first query
+		iterations (int): Number of processes
+	"""
+
+	timings = {'import': [], 'firstQuery': []}
+	start = time.perf_counter()
+
+	for _ in range(iterations):
+		output = subprocess.run([sys.executable, '-c', STARTUP, settingsPath, path, sql, query], capture_output=True, text=True, check=True).stdout
+		result = json.loads(output.strip().splitlines()[-1])
+
+		for name in timings:
+			timings[name].append(result[name])
+
+	elapsed = time.perf_counter() - start
+	results = []
+
+	for name, latencies in timings.items():
+		latencies.sort()
+
+		results.append({
+			'benchmark': name,
+			'tables': size,
+			'iterations': iterations,
+			'throughput': iterations / elapsed,
+			'p50Ms': latencies[len(latencies) // 2] * 1000,
+			'p99Ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+			'promptTokens': None,
+			'peakMemoryMB': None
+		})
+
+	return results
+
+def runSize(size: int, iterations: int, latency: float, directory: str) -> list[dict]:
+	"""
+	Run every benchmark against a synthetic schema of size tables
+
+	Args:
+		size (int): Number of tables
+		iterations (int): Calls per benchmark
+		latency (float): Seconds the fake AI takes to reply
+		directory (str): Directory for the SQLite file and settings JSON
+	"""
+
+	settings = syntheticSettings(size)
+	path = os.path.join(directory, f"bench_{size}.db")
+	createDatabase(settings, path)
+
+	settingsPath = os.path.join(directory, f"bench_{size}.json")
+	settingsManager.exportSettings(settings, settingsPath)
+	settingsManager.loadSettings(settingsPath).close() # Compiled once, as a worker would find it
+
+	tables = [table['Name'] for table in settings['Tables']]
+	rng = random.Random(size)
+
+	def request() -> str:
+		# Mentions a couple of table names, as a user would
+		picked = rng.sample(tables, min(2, len(tables)))
+		return f"How many {picked[0].replace('_', ' ')} rows link to each {picked[-1].replace('_', ' ')}?"
+
+	backend = FakeBackend(default=f"SELECT COUNT(*) FROM {tables[0]}", latency=latency)
+	smartSQL = SmartSQL(settings, 'sqlite', confirmExecute=False, backend=backend, DB_PATH=path)
+
+	def init():
+		SmartSQL(settings, 'sqlite', confirmExecute=False, backend=backend, DB_PATH=path)
+
+	def buildPrompt():
+		smartSQL._buildPrompt(request())
+		return smartSQL.promptTokens
+
+	def query():
+		smartSQL.query(request())
+		return smartSQL.promptTokens
+
+	def introspect():
+		settingsManager.settingsFromDB('sqlite', {'DB_PATH': path})
+
+	def parseSettings():
+		settingsManager.parseSettings(settingsPath)
+
+	def loadSettings():
+		# Open the compiled settings and decode two tables, as a script looking a few tables up would
+		compiled = settingsManager.loadSettings(settingsPath)
+		compiled.toSettings(rng.sample(tables, min(2, len(tables))))
+		compiled.close()
+
+	def initFromJSON():
+		SmartSQL(settingsManager.parseSettings(settingsPath), 'sqlite', confirmExecute=False, backend=backend, DB_PATH=path)
+
+	def initFromCompiled():
+		# SmartSQL reads the stored catalog and table index, decoding tables only once they are rendered into a prompt
+		compiled = settingsManager.loadSettings(settingsPath)
+		SmartSQL(compiled, 'sqlite', confirmExecute=False, backend=backend, DB_PATH=path)
+		compiled.close()
+
+	return [
+		measure('init', size, init, max(1, iterations // 50)),
+		measure('buildPrompt', size, buildPrompt, iterations),
+		measure('query', size, query, iterations),
+		measure('settingsFromDB', size, introspect, max(1, iterations // 50)),
+		measure('parseSettings', size, parseSettings, max(1, iterations // 10)),
+		measure('loadSettings', size, loadSettings, max(1, iterations // 10)),
+		measure('initFromJSON', size, initFromJSON, max(1, iterations // 50)),
+		measure('initFromCompiled', size, initFromCompiled, max(1, iterations // 50)),
+		*measureStartup(size, settingsPath, path, f"SELECT COUNT(*) FROM {tables[0]}", request(), max(1, iterations // 50))
+	]
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description="Offline SmartSQL benchmarks")
+	parser.add_argument('--sizes', default='10,100,1000,10000', help="Comma separated numbers of tables")
+	parser.add_argument('--iterations', type=int, default=200, help="Calls per benchmark")
+	parser.add_argument('--latency', type=float, default=0.0, help="Seconds the fake AI takes to reply")
+	parser.add_argument('--json', default=None, help="Path to write results to as JSON")
+	args = parser.parse_args()
+
+	results = []
+
+	with tempfile.TemporaryDirectory() as directory:
+		for size in [int(size) for size in args.sizes.split(',')]:
+			results.extend(runSize(size, args.iterations, args.latency, directory))
+
+	# Output results
+	print(f"{'benchmark':<16}{'tables':>8}{'ops/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'tokens':>10}{'peak MB':>10}")
+
+	for result in results:
+		tokens = f"{result['promptTokens']:.0f}" if result['promptTokens'] != None else '-'
+		peak = f"{result['peakMemoryMB']:.1f}" if result['peakMemoryMB'] != None else '-'
+		print(f"{result['benchmark']:<16}{result['tables']:>8}{result['throughput']:>12.1f}{result['p50Ms']:>10.2f}{result['p99Ms']:>10.2f}{tokens:>10}{peak:>10}")
+
+	if args.json:
+		with open(args.json, 'w+') as file:
+			json.dump(results, file, indent='\t')
+
+
+if __name__ == '__main__':
+	main()
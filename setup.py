@@ -32,5 +32,10 @@ setuptools.setup(
 		"dotenv>=0.9.9",
 		"oracledb>=3.2.0",
 		"psycopg2>=2.9.10"
-	]
+	],
+	extras_require={
+		"async": ["asyncpg>=0.29.0"],
+		"columnar": ["numpy>=1.24.0", "pyarrow>=14.0.0"],
+		"otel": ["opentelemetry-api>=1.20.0"]
+	}
 )
\ No newline at end of file
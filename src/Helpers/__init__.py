@@ -1,4 +1,22 @@
 # Helper classes
 
-from .prompt import Prompter # For AI prompting
-from .database import Database # For SQL executing
\ No newline at end of file
+from .prompt import Prompter, AsyncPrompter # For AI prompting
+from .database import Database, AsyncDatabase, ResultPage # For SQL executing
+from .pool import ConnectionPool, sharedPool, closePools # For connection pooling
+from .cache import ResponseCache # For caching AI responses
+from .schemaIndex import SchemaIndex # For picking tables relevant to a request
+from .tokens import estimateTokens # For measuring prompt size
+from .joinGraph import JoinGraph # For finding tables needed to join others
+from .schemaRender import SchemaRenderer # For describing tables in prompts
+from .backlog import Backlog # For remembering schema changes
+from .rateLimit import RateLimitGate # For respecting AI rate limits
+from .costGuard import CostGuard, describePlan # For checking plans before executing
+from .columnar import ColumnarResult # For column by column results
+from .backends import LLMBackend, AzureOpenAIBackend, FakeBackend, openaiErrors # For choosing what answers prompts
+from .metrics import Metrics, Histogram, SpanExporter, OpenTelemetryExporter # For timing each stage of a request
+from .retry import RetryPolicy # For timing out, retrying and hedging AI requests
+from .balancer import BalancedBackend # For spreading prompts across deployments
+from .router import ModelRouter # For picking a model by request complexity
+from .templates import TemplateCache # For reusing SQL of requests differing only in literals
+from .schemaCatalog import SchemaCatalog, TableRecord, ColumnRecord # For indexed lookups of tables and columns
+from .compiledSettings import CompiledSettings, compileSettings # For memory-mapped settings read table by table
\ No newline at end of file
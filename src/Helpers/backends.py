@@ -0,0 +1,242 @@
+import re
+import sys
+import threading
+import time
+
+from .tokens import estimateTokens
+
+
+def openaiErrors(*names: str) -> tuple:
+	"""
+	openai exception classes by name, as a tuple for except clauses. Empty while openai has not been imported, since no
+	error can have come from it, so catching its errors does not import it
+
+	Args:
+		*names (str): Names of exception classes, e.g. 'RateLimitError'
+	"""
+
+	module = sys.modules.get('openai')
+
+	return tuple(getattr(module, name) for name in names) if module != None else ()
+
+
+class LLMBackend:
+	"""
+	Interface of what Prompter sends prompts to. Subclass it to use another AI provider or a local model
+
+	`complete()` returns a dictionary: `{'text': str, 'headers': dict, 'usage': dict}`, where 'headers' are the response
+	headers used for rate limiting (empty if there are none) and 'usage' is `{'promptTokens': int, 'completionTokens': int}`
+	(None if unknown). `stream()` returns the same with 'pieces', an iterator of text, instead of 'text'. Its 'usage' may be
+	filled in once the pieces are exhausted.
+	"""
+
+	# Identifies the model in cache keys
+	name = ''
+
+	def complete(self, messages: list[dict], **kwargs) -> dict:
+		"""
+		Get the model's reply to chat messages
+
+		Args:
+			messages (list[dict]): Chat messages, as {'role': ..., 'content': ...} dictionaries
+			**kwargs: Any arguments for the provider
+		"""
+
+		raise NotImplementedError
+
+	def stream(self, messages: list[dict], **kwargs) -> dict:
+		"""
+		Get the model's reply to chat messages as it is written. Defaults to the full reply in one piece
+
+		Args:
+			messages (list[dict]): Chat messages, as {'role': ..., 'content': ...} dictionaries
+			**kwargs: Any arguments for the provider
+		"""
+
+		response = self.complete(messages, **kwargs)
+
+		return {'pieces': iter([response['text']]), 'headers': response['headers'], 'usage': response.get('usage')}
+
+	async def completeAsync(self, messages: list[dict], **kwargs) -> dict:
+		"""
+		Asynchronous complete(). Defaults to running complete() in a thread
+
+		Args:
+			messages (list[dict]): Chat messages, as {'role': ..., 'content': ...} dictionaries
+			**kwargs: Any arguments for the provider
+		"""
+
+		import asyncio
+
+		return await asyncio.to_thread(self.complete, messages, **kwargs)
+
+	def warmup(self) -> None:
+		"""
+		Create any clients ahead of the first prompt
+		"""
+
+	def close(self) -> None:
+		"""
+		Release any connections held
+		"""
+
+	async def closeAsync(self) -> None:
+		"""
+		Asynchronous close()
+		"""
+
+		self.close()
+
+
+class AzureOpenAIBackend(LLMBackend):
+	def __init__(self, APIkeys: dict[str], asynchronous: bool = False) -> None:
+		"""
+		Azure OpenAI chat completions deployment
+
+		Args:
+			APIkeys (dict[str]): AZURE_OPENAI_API_KEY, AZURE_OPENAI_API_VERSION, AZURE_OPENAI_ENDPOINT and AZURE_OPENAI_DEPLOYMENT_NAME
+			asynchronous (bool): Whether to use the asynchronous client (for completeAsync()) instead of the blocking one
+		"""
+
+		self.APIkeys = APIkeys
+		self.asynchronous = asynchronous
+		self.name = APIkeys['AZURE_OPENAI_DEPLOYMENT_NAME']
+
+		# Client (and openai itself) is only loaded on first use
+		self._client = None
+		self._lock = threading.Lock()
+
+
+	@property
+	def client(self):
+		"""
+		Azure OpenAI client, created on first use
+		"""
+
+		if self._client == None:
+			with self._lock:
+				if self._client == None:
+					from openai import AzureOpenAI, AsyncAzureOpenAI
+
+					# Retries are left to Prompter's RetryPolicy
+					self._client = (AsyncAzureOpenAI if self.asynchronous else AzureOpenAI)(
+						api_key= self.APIkeys['AZURE_OPENAI_API_KEY'],
+						api_version= self.APIkeys['AZURE_OPENAI_API_VERSION'],
+						azure_endpoint= self.APIkeys['AZURE_OPENAI_ENDPOINT'],
+						max_retries= 0
+					)
+
+		return self._client
+
+	def warmup(self) -> None:
+		self.client
+
+	def complete(self, messages: list[dict], **kwargs) -> dict:
+		raw = self.client.chat.completions.with_raw_response.create(model=self.name, messages=messages, **kwargs)
+		completion = raw.parse()
+
+		return {'text': completion.choices[0].message.content, 'headers': raw.headers, 'usage': _usage(completion.usage)}
+
+	def stream(self, messages: list[dict], **kwargs) -> dict:
+		"""
+		Pass `stream_options={'include_usage': True}` to get token usage for streamed replies
+		"""
+
+		raw = self.client.chat.completions.with_raw_response.create(model=self.name, messages=messages, stream=True, **kwargs)
+		response = {'pieces': None, 'headers': raw.headers, 'usage': None}
+
+		def pieces():
+			for chunk in raw.parse():
+				# Usage arrives in a last chunk without choices
+				if getattr(chunk, 'usage', None):
+					response['usage'] = _usage(chunk.usage)
+
+				if chunk.choices and chunk.choices[0].delta.content:
+					yield chunk.choices[0].delta.content
+
+		response['pieces'] = pieces()
+
+		return response
+
+	async def completeAsync(self, messages: list[dict], **kwargs) -> dict:
+		raw = await self.client.chat.completions.with_raw_response.create(model=self.name, messages=messages, **kwargs)
+		completion = raw.parse()
+
+		return {'text': completion.choices[0].message.content, 'headers': raw.headers, 'usage': _usage(completion.usage)}
+
+	def close(self) -> None:
+		if self._client != None:
+			self._client.close()
+
+	async def closeAsync(self) -> None:
+		if self._client != None:
+			await self._client.close()
+
+
+class FakeBackend(LLMBackend):
+	def __init__(self, responses: dict[str] = None, default: str = 'SELECT 1', latency: float = 0.0, tokensPerSecond: float = None, name: str = 'fake') -> None:
+		"""
+		Deterministic stand-in for an AI model, replying with canned SQL after a set delay. For benchmarks and offline use
+
+		Args:
+			responses (dict[str]): Reply for each user prompt. Keys are regular expressions, the first one found in the prompt wins
+			default (str): Reply when no key matches
+			latency (float): Seconds before the reply (or its first piece, when streamed)
+			tokensPerSecond (float): If given, streamed replies arrive one word at a time at this rate
+			name (str): Model name, used in cache keys
+		"""
+
+		self.responses = [(re.compile(pattern, re.IGNORECASE), reply) for pattern, reply in (responses or {}).items()]
+		self.default = default
+		self.latency = latency
+		self.tokensPerSecond = tokensPerSecond
+		self.name = name
+
+		# Number of replies given
+		self.calls = 0
+
+
+	def complete(self, messages: list[dict], **kwargs) -> dict:
+		time.sleep(self.latency)
+
+		return self._response(messages)
+
+	def stream(self, messages: list[dict], **kwargs) -> dict:
+		response = self._response(messages)
+		reply = response.pop('text')
+
+		def pieces():
+			time.sleep(self.latency)
+
+			for piece in re.findall(r'\S+\s*', reply) or ['']:
+				yield piece
+
+				if self.tokensPerSecond:
+					time.sleep(1 / self.tokensPerSecond)
+
+		return {**response, 'pieces': pieces()}
+
+	async def completeAsync(self, messages: list[dict], **kwargs) -> dict:
+		import asyncio
+
+		await asyncio.sleep(self.latency)
+
+		return self._response(messages)
+
+
+	def _response(self, messages: list[dict]) -> dict:
+		self.calls += 1
+		query = messages[-1]['content']
+		reply = next((reply for pattern, reply in self.responses if pattern.search(query)), self.default)
+
+		# Estimated the same way as prompt sizes are, so benchmarks can report token counts
+		usage = {'promptTokens': sum(estimateTokens(message['content']) for message in messages), 'completionTokens': estimateTokens(reply)}
+
+		return {'text': reply, 'headers': {}, 'usage': usage}
+
+
+def _usage(usage) -> dict | None:
+	if usage == None:
+		return None
+
+	return {'promptTokens': usage.prompt_tokens, 'completionTokens': usage.completion_tokens}
@@ -0,0 +1,495 @@
+import copy
+import itertools
+import re
+
+from .compiledSettings import CompiledSettings
+from .tokens import estimateTokens
+
+
+# Statements that only read or change rows, which the AI does not need to remember
+DATA_STATEMENTS = ('SELECT', 'WITH', 'EXPLAIN', 'SHOW', 'DESC', 'DESCRIBE', 'INSERT', 'UPDATE', 'DELETE', 'MERGE', 'TRUNCATE', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'SET', 'VALUES', 'CALL', 'COPY')
+
+# Words that end a column's type and start its constraints
+COLUMN_CONSTRAINT = re.compile(r'\b(CONSTRAINT|NOT\s+NULL|NULL|PRIMARY\s+KEY|REFERENCES|UNIQUE|CHECK|DEFAULT|GENERATED|COLLATE)\b', re.IGNORECASE)
+
+# How many appends .pop() can undo
+UNDO_DEPTH = 16
+
+# Every state of every backlog gets its own version, so a version never comes back after .pop()
+_VERSIONS = itertools.count()
+
+
+class Backlog:
+	def __init__(self, settings: dict | CompiledSettings = None, tokenBudget: int = 2000) -> None:
+		"""
+		History of changes made through the AI, kept as small as possible so prompts stay bounded
+
+		Queries and row changes are dropped. CREATE/ALTER/DROP/RENAME TABLE statements are folded straight into an in-memory
+		copy of the settings (see .settings). Any other schema statement is kept as text, with the oldest ones summarized and
+		then evicted once the text goes over tokenBudget.
+
+		The settings may be CompiledSettings, whose tables are only decoded when a schema statement has to be folded in. The
+		settings then become a dictionary until undone with .pop() or .clear().
+
+		Iterating gives the text entries, so it can be used like the list of commands it replaces.
+
+		Args:
+			settings (dict | CompiledSettings): Settings to fold table changes into. If None, every schema statement is kept as text
+			tokenBudget (int): Maximum estimated tokens of the text entries
+		"""
+
+		self.tokenBudget = tokenBudget
+		self.reset(settings)
+
+
+	def append(self, statement: str) -> None:
+		"""
+		Record SQL generated by the AI
+
+		Args:
+			statement (str): SQL code, possibly several statements separated by semicolons
+		"""
+
+		self._undo.append((self.settings, self.entries, self.summary, self.version))
+		del self._undo[:-UNDO_DEPTH]
+
+		entries = list(self.entries)
+		base = None
+		tables = None
+
+		for code in _splitStatements(statement):
+			keyword = code.split(None, 1)[0].upper()
+
+			if keyword in DATA_STATEMENTS:
+				continue
+
+			# Try to fold into the settings copy, copying the table list on first change
+			if self.settings != None:
+				if base == None:
+					base = _tables(self.settings)
+
+				changed = list(tables if tables != None else base)
+
+				if _applyStatement(changed, code):
+					tables = changed
+					continue
+
+			entries.append(code)
+
+		if tables != None:
+			self.settings = {**_server(self.settings), 'Tables': tables}
+			self.version = next(_VERSIONS)
+
+		self.entries = tuple(entries)
+		self._enforceBudget()
+
+	def pop(self) -> str:
+		"""
+		Undo the last append, e.g. when the generated SQL was not executed. Returns the text entries removed
+		"""
+
+		if not self._undo:
+			raise IndexError("pop from empty backlog")
+
+		removed = [entry for entry in self.entries if entry not in self._undo[-1][1]]
+		self.settings, self.entries, self.summary, self.version = self._undo.pop()
+
+		return '\n'.join(removed)
+
+	def clear(self) -> None:
+		"""
+		Forget every change, going back to the settings the backlog was created with
+		"""
+
+		self.reset(self.baseSettings)
+
+	def reset(self, settings: dict | CompiledSettings = None) -> None:
+		"""
+		Forget every change and use new base settings
+
+		Args:
+			settings (dict | CompiledSettings): Settings to fold table changes into. If None, every schema statement is kept as text
+		"""
+
+		self.baseSettings = settings
+		self.settings = settings
+		self.entries = ()
+		self.summary = ()
+		self.version = next(_VERSIONS)
+		self._undo = []
+
+	def __iter__(self):
+		if self.summary:
+			yield f"-- Earlier changes (details omitted): {'; '.join(self.summary)}"
+
+		yield from self.entries
+
+	def __len__(self) -> int:
+		return len(self.entries) + (1 if self.summary else 0)
+
+
+	def _enforceBudget(self) -> None:
+		# Summarize oldest entries, then drop oldest summaries, until within budget. The newest entry is only summarized
+		# once no summaries are left, so the latest change is not lost behind a growing list of summaries
+		entries, summary = list(self.entries), list(self.summary)
+
+		while (entries or summary) and estimateTokens('\n'.join(summary + entries)) > self.tokenBudget:
+			if len(entries) > 1 or (entries and not summary):
+				summary.append(_summarize(entries.pop(0)))
+			else:
+				summary.pop(0)
+
+		self.entries, self.summary = tuple(entries), tuple(summary)
+
+
+def _tables(settings: dict | CompiledSettings) -> list[dict]:
+	# Table dictionaries of a settings dictionary or CompiledSettings, decoding every table of the latter
+	return settings['Tables'] if isinstance(settings, dict) else settings.toSettings()['Tables']
+
+def _server(settings: dict | CompiledSettings) -> dict:
+	# Everything but the tables of a settings dictionary or CompiledSettings
+	return settings if isinstance(settings, dict) else settings.toSettings([])
+
+
+def _summarize(statement: str) -> str:
+	# Keep the head of the statement, e.g. "CREATE INDEX IDX_ORDERS ON ORDERS"
+	head = re.split(r'[(\n]', statement, 1)[0].strip()
+
+	return ' '.join(head.split()[:6])
+
+
+def _splitStatements(code: str) -> list[str]:
+	# PL/SQL blocks contain semicolons of their own
+	if re.search(r'\bBEGIN\b', code, re.IGNORECASE):
+		return [code.strip()] if code.strip() else []
+
+	return [statement.strip() for statement in _splitTopLevel(code, ';') if statement.strip()]
+
+
+def _splitTopLevel(text: str, separator: str = ',') -> list[str]:
+	# Split outside of parentheses and quotes
+	parts, depth, quote, start = [], 0, None, 0
+
+	for i, char in enumerate(text):
+		if quote:
+			if char == quote:
+				quote = None
+		elif char in '\'"':
+			quote = char
+		elif char == '(':
+			depth += 1
+		elif char == ')':
+			depth -= 1
+		elif char == separator and depth == 0:
+			parts.append(text[start:i])
+			start = i + 1
+
+	parts.append(text[start:])
+
+	return parts
+
+
+def _identifier(name: str) -> str:
+	# Drop quotes and schema prefix
+	return name.strip().split('.')[-1].strip('"')
+
+
+def _findTable(tables: list[dict], name: str) -> int | None:
+	name = _identifier(name).lower()
+
+	return next((i for i, table in enumerate(tables) if table['Name'].lower() == name), None)
+
+
+def _findColumn(table: dict, name: str) -> dict | None:
+	name = _identifier(name).lower()
+
+	return next((column for column in table['Layout'] if column['Name'].lower() == name), None)
+
+
+def _applyStatement(tables: list[dict], code: str) -> bool:
+	"""
+	Fold a CREATE/ALTER/DROP/RENAME TABLE statement into a list of settings tables, returning False if it could not be
+
+	Tables are replaced by modified copies, never changed in place, so other holders of the original dictionaries are unaffected.
+	"""
+
+	code = code.strip()
+
+	try:
+		# CREATE TABLE name (columns...)
+		match = re.match(r'CREATE\s+(?:GLOBAL\s+TEMPORARY\s+|TEMPORARY\s+|TEMP\s+|UNLOGGED\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?([\w$#."]+)\s*\((.*)\)[^)]*$', code, re.IGNORECASE | re.DOTALL)
+
+		if match:
+			name = _identifier(match.group(1))
+			table = {'Name': name, 'Description': '', 'Layout': []}
+
+			for definition in _splitTopLevel(match.group(2)):
+				if not (_applyTableConstraint(table, definition) or _addColumn(table, definition)):
+					return False
+
+			index = _findTable(tables, name)
+
+			if index == None:
+				tables.append(table)
+			else:
+				tables[index] = table
+
+			return True
+
+		# DROP TABLE name
+		match = re.match(r'DROP\s+TABLE\s+(?:IF\s+EXISTS\s+)?([\w$#."]+)', code, re.IGNORECASE)
+
+		if match:
+			index = _findTable(tables, match.group(1))
+
+			if index != None:
+				del tables[index]
+
+			return True
+
+		# RENAME old TO new (Oracle)
+		match = re.match(r'RENAME\s+([\w$#."]+)\s+TO\s+([\w$#."]+)$', code, re.IGNORECASE)
+
+		if match:
+			index = _findTable(tables, match.group(1))
+
+			if index == None:
+				return False
+
+			tables[index] = {**tables[index], 'Name': _identifier(match.group(2))}
+
+			return True
+
+		# ALTER TABLE name action, action...
+		match = re.match(r'ALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?(?:ONLY\s+)?([\w$#."]+)\s+(.*)$', code, re.IGNORECASE | re.DOTALL)
+
+		if match:
+			index = _findTable(tables, match.group(1))
+
+			if index == None:
+				return False
+
+			table = copy.deepcopy(tables[index])
+
+			for action in _splitTopLevel(match.group(2)):
+				if not _applyAlter(table, action.strip()):
+					return False
+
+			tables[index] = table
+
+			return True
+
+	except (ValueError, IndexError, KeyError):
+		pass
+
+	return False
+
+
+def _applyAlter(table: dict, action: str) -> bool:
+	flags = re.IGNORECASE | re.DOTALL
+
+	# ADD CONSTRAINT / ADD PRIMARY KEY (...)
+	match = re.match(r'ADD\s+((?:CONSTRAINT|PRIMARY\s+KEY|UNIQUE|FOREIGN\s+KEY|CHECK)\b.*)$', action, flags)
+
+	if match:
+		return _applyTableConstraint(table, match.group(1))
+
+	# ADD (col type, col type) or ADD [COLUMN] col type
+	match = re.match(r'ADD\s+(?:COLUMN\s+)?(?:IF\s+NOT\s+EXISTS\s+)?(.*)$', action, flags)
+
+	if match:
+		definition = match.group(1).strip()
+		definitions = _splitTopLevel(definition[1:-1]) if definition.startswith('(') and definition.endswith(')') else [definition]
+
+		return all(_addColumn(table, definition) for definition in definitions)
+
+	# DROP (col, col) or DROP [COLUMN] col
+	match = re.match(r'DROP\s*(?:\((.*)\)|(?:COLUMN\s+)(?:IF\s+EXISTS\s+)?([\w$#"]+))', action, flags)
+
+	if match:
+		names = {_identifier(name).lower() for name in (match.group(1) or match.group(2)).split(',')}
+		table['Layout'] = [column for column in table['Layout'] if column['Name'].lower() not in names]
+
+		return True
+
+	# RENAME COLUMN old TO new
+	match = re.match(r'RENAME\s+COLUMN\s+([\w$#"]+)\s+TO\s+([\w$#"]+)$', action, flags)
+
+	if match:
+		column = _findColumn(table, match.group(1))
+
+		if column == None:
+			return False
+
+		column['Name'] = _identifier(match.group(2))
+
+		return True
+
+	# RENAME TO new
+	match = re.match(r'RENAME\s+TO\s+([\w$#."]+)$', action, flags)
+
+	if match:
+		table['Name'] = _identifier(match.group(1))
+
+		return True
+
+	# MODIFY (col type, ...) or MODIFY col type (Oracle)
+	match = re.match(r'MODIFY\s+(?:COLUMN\s+)?(.*)$', action, flags)
+
+	if match:
+		definition = match.group(1).strip()
+		definitions = _splitTopLevel(definition[1:-1]) if definition.startswith('(') and definition.endswith(')') else [definition]
+
+		return all(_modifyColumn(table, definition) for definition in definitions)
+
+	# ALTER [COLUMN] col [SET DATA] TYPE type / SET NOT NULL / DROP NOT NULL (Postgres)
+	match = re.match(r'ALTER\s+(?:COLUMN\s+)?([\w$#"]+)\s+(.*)$', action, flags)
+
+	if match:
+		column = _findColumn(table, match.group(1))
+		change = match.group(2).strip()
+
+		if column == None:
+			return False
+
+		constraints = column['Properties']['Constraints']
+		typeChange = re.match(r'(?:SET\s+DATA\s+)?TYPE\s+(.*?)(?:\s+USING\b.*)?$', change, flags)
+
+		if typeChange:
+			column['Type'] = typeChange.group(1).strip()
+		elif re.match(r'SET\s+NOT\s+NULL$', change, flags):
+			if 'NOT NULL' not in constraints:
+				constraints.append('NOT NULL')
+		elif re.match(r'DROP\s+NOT\s+NULL$', change, flags):
+			column['Properties']['Constraints'] = [constraint for constraint in constraints if constraint != 'NOT NULL']
+		elif not re.match(r'(SET|DROP)\s+DEFAULT\b', change, flags):
+			return False
+
+		return True
+
+	return False
+
+
+def _parseColumn(definition: str) -> dict:
+	match = re.match(r'\s*("[^"]+"|[\w$#]+)\s*(.*)$', definition, re.DOTALL)
+
+	if not match:
+		raise ValueError(f"Cannot parse column: {definition}")
+
+	rest = match.group(2)
+	start = COLUMN_CONSTRAINT.search(rest)
+	options = rest[start.start():] if start else ''
+
+	constraints = []
+	isPrimaryKey = re.search(r'\bPRIMARY\s+KEY\b', options, re.IGNORECASE) != None
+
+	reference = re.search(r'\bREFERENCES\s+([\w$#."]+)\s*(?:\(([^)]*)\))?', options, re.IGNORECASE)
+
+	if reference:
+		constraints.append(f"FOREIGN KEY REFERENCES {_identifier(reference.group(1))}({_identifier(reference.group(2) or match.group(1))})")
+
+	if re.search(r'\bUNIQUE\b', options, re.IGNORECASE):
+		constraints.append("UNIQUE")
+
+	check = re.search(r'\bCHECK\s*\(', options, re.IGNORECASE)
+
+	if check:
+		depth, end = 1, check.end()
+
+		while depth:
+			depth += {'(': 1, ')': -1}.get(options[end], 0)
+			end += 1
+
+		constraints.append(f"CHECK ({options[check.end():end - 1].strip()})")
+
+	if isPrimaryKey or re.search(r'\bNOT\s+NULL\b', options, re.IGNORECASE):
+		constraints.append("NOT NULL")
+
+	return {
+		'Name': _identifier(match.group(1)),
+		'Type': (rest[:start.start()] if start else rest).strip(),
+		'Description': '',
+		'Properties': {
+			'isPrimaryKey': isPrimaryKey,
+			'Foreign_Reference': '',
+			'Constraints': constraints
+		},
+		'_nullable': re.search(r'(?<!NOT)\s+NULL\b|^NULL\b', options, re.IGNORECASE) != None
+	}
+
+
+def _addColumn(table: dict, definition: str) -> bool:
+	column = _parseColumn(definition)
+	del column['_nullable']
+
+	if not column['Type']:
+		return False
+
+	table['Layout'].append(column)
+
+	return True
+
+
+def _modifyColumn(table: dict, definition: str) -> bool:
+	change = _parseColumn(definition)
+	column = _findColumn(table, change['Name'])
+
+	if column == None:
+		return False
+
+	if change['Type']:
+		column['Type'] = change['Type']
+
+	constraints = column['Properties']['Constraints']
+
+	if change['_nullable']:
+		constraints[:] = [constraint for constraint in constraints if constraint != 'NOT NULL']
+
+	for constraint in change['Properties']['Constraints']:
+		if constraint not in constraints:
+			constraints.append(constraint)
+
+	column['Properties']['isPrimaryKey'] |= change['Properties']['isPrimaryKey']
+
+	return True
+
+
+def _applyTableConstraint(table: dict, definition: str) -> bool:
+	# Returns False if the definition is not a table constraint (so is a column)
+	text = re.sub(r'^\s*CONSTRAINT\s+[\w$#"]+\s+', '', definition, flags=re.IGNORECASE)
+	match = re.match(r'\s*(PRIMARY\s+KEY|UNIQUE|FOREIGN\s+KEY)\s*\(([^)]*)\)(.*)$', text, re.IGNORECASE | re.DOTALL)
+
+	if not match:
+		# Table CHECK constraints are not tied to a single column
+		return re.match(r'\s*CHECK\b', text, re.IGNORECASE) != None
+
+	kind = match.group(1).upper().split()[0]
+	names = [_identifier(name) for name in match.group(2).split(',')]
+
+	if kind == 'FOREIGN':
+		reference = re.search(r'REFERENCES\s+([\w$#."]+)\s*(?:\(([^)]*)\))?', match.group(3), re.IGNORECASE)
+
+		if not reference:
+			return False
+
+		targets = [_identifier(name) for name in reference.group(2).split(',')] if reference.group(2) else names
+
+	for i, name in enumerate(names):
+		column = _findColumn(table, name)
+
+		if column == None:
+			raise ValueError(f"Unknown column {name}")
+
+		constraints = column['Properties']['Constraints']
+
+		if kind == 'PRIMARY':
+			column['Properties']['isPrimaryKey'] = True
+
+			if 'NOT NULL' not in constraints:
+				constraints.append('NOT NULL')
+		elif kind == 'UNIQUE':
+			constraints.append('UNIQUE')
+		else:
+			constraints.append(f"FOREIGN KEY REFERENCES {_identifier(reference.group(1))}({targets[i]})")
+
+	return True
@@ -0,0 +1,227 @@
+import threading
+import time
+
+from .backends import LLMBackend, openaiErrors
+from .rateLimit import RateLimitGate
+
+
+STRATEGIES = ('leastOutstanding', 'latency')
+
+
+class BalancedBackend(LLMBackend):
+	def __init__(self, backends: list[LLMBackend], strategy: str = 'leastOutstanding', smoothing: float = 0.2, name: str = None) -> None:
+		"""
+		Spreads prompts across several deployments of the same model, so throughput adds up across their quotas
+
+		Each deployment has its own rate limit gate fed with its response headers. While a deployment is rate limited it is
+		left out of rotation, and a request it refuses with a 429 is sent to the next available one. Once its quota resets it
+		is used again. Only when every deployment is limited does the 429 reach the Prompter, which then backs off.
+
+		Args:
+			backends (list[LLMBackend]): Deployments to spread prompts across
+			strategy (str): 'leastOutstanding' picks the deployment with the fewest requests in flight, 'latency' the one with the shortest expected wait (requests in flight times its average reply time)
+			smoothing (float): Weight of the newest reply time in each deployment's moving average
+			name (str): Model name, used in cache keys. Defaults to the first deployment's
+		"""
+
+		if not backends:
+			raise ValueError("At least one backend is needed")
+
+		if strategy not in STRATEGIES:
+			raise ValueError(f"Unknown strategy '{strategy}', expected one of {', '.join(STRATEGIES)}")
+
+		self.backends = list(backends)
+		self.strategy = strategy
+		self.smoothing = smoothing
+		self.name = name if name != None else self.backends[0].name
+
+		self.gates = [RateLimitGate() for _ in self.backends]
+
+		# Per deployment state, guarded by the lock
+		self._lock = threading.Lock()
+		self._outstanding = [0] * len(self.backends)
+		self._requests = [0] * len(self.backends)
+		self._latency = [None] * len(self.backends)
+
+
+	def complete(self, messages: list[dict], **kwargs) -> dict:
+		tried = {}
+
+		while True:
+			index, delay = self._pick(tried)
+			time.sleep(delay)
+
+			start = time.perf_counter()
+
+			try:
+				response = self.backends[index].complete(messages, **kwargs)
+			except openaiErrors('RateLimitError') as e:
+				self._throttled(index, e, tried)
+				continue
+			finally:
+				self._release(index)
+
+			return self._answered(index, response, start)
+
+	def stream(self, messages: list[dict], **kwargs) -> dict:
+		tried = {}
+
+		while True:
+			index, delay = self._pick(tried)
+			time.sleep(delay)
+
+			start = time.perf_counter()
+
+			try:
+				response = self.backends[index].stream(messages, **kwargs)
+			except openaiErrors('RateLimitError') as e:
+				self._release(index)
+				self._throttled(index, e, tried)
+				continue
+			except BaseException:
+				self._release(index)
+				raise
+
+			response = self._answered(index, response, start)
+
+			# Still in flight until every piece has arrived, or the pieces are closed or dropped
+			response['pieces'] = _Pieces(response['pieces'], lambda index=index: self._release(index))
+
+			return response
+
+	async def completeAsync(self, messages: list[dict], **kwargs) -> dict:
+		import asyncio
+
+		tried = {}
+
+		while True:
+			index, delay = self._pick(tried)
+			await asyncio.sleep(delay)
+
+			start = time.perf_counter()
+
+			try:
+				response = await self.backends[index].completeAsync(messages, **kwargs)
+			except openaiErrors('RateLimitError') as e:
+				self._throttled(index, e, tried)
+				continue
+			finally:
+				self._release(index)
+
+			return self._answered(index, response, start)
+
+	def warmup(self) -> None:
+		for backend in self.backends:
+			backend.warmup()
+
+	def close(self) -> None:
+		for backend in self.backends:
+			backend.close()
+
+	async def closeAsync(self) -> None:
+		for backend in self.backends:
+			await backend.closeAsync()
+
+	def stats(self) -> list[dict]:
+		"""
+		Get each deployment's requests sent, requests in flight, times throttled, average reply time in seconds and whether it is in rotation
+		"""
+
+		with self._lock:
+			return [
+				{
+					'name': backend.name,
+					'requests': self._requests[index],
+					'outstanding': self._outstanding[index],
+					'throttled': self.gates[index].stats()['throttled'],
+					'latency': self._latency[index],
+					'available': self.gates[index].delay() == 0
+				}
+				for index, backend in enumerate(self.backends)
+			]
+
+
+	def _pick(self, tried: dict) -> tuple[int, float]:
+		# Deployment to send to next and seconds to wait before sending. tried maps deployments that refused to their errors
+		with self._lock:
+			untried = [index for index in range(len(self.backends)) if index not in tried]
+
+			if not untried:
+				raise list(tried.values())[-1]
+
+			available = [index for index in untried if self.gates[index].delay() == 0]
+
+			if available:
+				index, delay = min(available, key=self._load), 0.0
+			else:
+				# Everything left is rate limited: hand a fresh refusal back to the Prompter, otherwise wait for the first to reset
+				if tried:
+					raise list(tried.values())[-1]
+
+				index = min(untried, key=lambda index: self.gates[index].delay())
+				delay = self.gates[index].delay()
+
+			self._outstanding[index] += 1
+			self._requests[index] += 1
+
+			return index, delay
+
+	def _load(self, index: int) -> tuple:
+		# Lower is picked first, ties going to the deployment used least
+		if self.strategy == 'latency':
+			return ((self._outstanding[index] + 1) * (self._latency[index] or 0.0), self._requests[index])
+
+		return (self._outstanding[index], self._requests[index])
+
+	def _release(self, index: int) -> None:
+		with self._lock:
+			self._outstanding[index] -= 1
+
+	def _throttled(self, index: int, error: Exception, tried: dict) -> None:
+		self.gates[index].update(error.response.headers, throttled=True)
+		tried[index] = error
+
+	def _answered(self, index: int, response: dict, start: float) -> dict:
+		seconds = time.perf_counter() - start
+
+		self.gates[index].update(response['headers'])
+
+		with self._lock:
+			latency = self._latency[index]
+			self._latency[index] = seconds if latency == None else latency + self.smoothing * (seconds - latency)
+
+		# Limits are per deployment and handled here, so the Prompter should not pause every deployment for one
+		return {**response, 'headers': {}}
+
+
+class _Pieces:
+	# Iterator over a stream's pieces that calls release once: when the pieces run out or fail, or on close() or garbage
+	# collection. A generator's finally would not run if it were dropped before its first piece was pulled
+	def __init__(self, source, release) -> None:
+		self._source = iter(source)
+		self._release = release
+
+	def __iter__(self):
+		return self
+
+	def __next__(self) -> str:
+		try:
+			return next(self._source)
+		except BaseException:
+			self.close()
+			raise
+
+	def close(self) -> None:
+		release, self._release = self._release, None
+
+		if release == None:
+			return
+
+		try:
+			if hasattr(self._source, 'close'):
+				self._source.close()
+		finally:
+			release()
+
+	def __del__(self) -> None:
+		self.close()
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+	def __init__(self, path: str = None, maxEntries: int = 256, maxDiskEntries: int = 10000, ttl: float = 86400) -> None:
+		"""
+		Two-tier cache of AI responses: an in-memory LRU in front of an optional SQLite file shared across runs
+
+		Keys cover the normalized user query, a hash of the full system prompt (schema and backlog) and the deployment name,
+		so any change to the schema or backlog sent to the AI misses the cache.
+
+		Args:
+			path (str): Path of the SQLite file for the on-disk tier. If None, only the in-memory tier is used
+			maxEntries (int): Maximum number of responses kept in memory
+			maxDiskEntries (int): Maximum number of responses kept on disk, least recently used are removed first
+			ttl (float): Seconds a response stays valid. If None, responses never expire
+		"""
+
+		self.maxEntries = maxEntries
+		self.maxDiskEntries = maxDiskEntries
+		self.ttl = ttl
+
+		self._memory = OrderedDict() # key -> (response, created, latency)
+		self._lock = threading.Lock()
+
+		# Counters reported by stats()
+		self._memoryHits = 0
+		self._diskHits = 0
+		self._misses = 0
+		self._savedSeconds = 0.0
+
+		self._disk = None
+
+		if path != None:
+			self._disk = sqlite3.connect(path, check_same_thread=False)
+			self._disk.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT, created REAL, latency REAL, used REAL)")
+			self._disk.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses (used)")
+			self._disk.commit()
+
+
+	@staticmethod
+	def key(query: str, basePrompt: str, deploymentName: str, **kwargs) -> str:
+		"""
+		Build the cache key for a prompt
+
+		Args:
+			query (str): User prompt, normalized for whitespace and trailing punctuation. Case is kept, as it may be part of a value
+			basePrompt (str): System prompt
+			deploymentName (str): AI model deployment
+			**kwargs: Any arguments passed into .create() for AI
+		"""
+
+		normalized = re.sub(r'\s+', ' ', query).strip().rstrip('?.!')
+		promptHash = hashlib.sha256(basePrompt.encode()).hexdigest()
+
+		return hashlib.sha256('\0'.join([normalized, promptHash, deploymentName, json.dumps(kwargs, sort_keys=True, default=str)]).encode()).hexdigest()
+
+	def get(self, key: str) -> str | None:
+		"""
+		Get a cached response, or None on a miss
+
+		Args:
+			key (str): Key from ResponseCache.key()
+		"""
+
+		now = time.time()
+
+		with self._lock:
+			# Memory tier
+			entry = self._memory.get(key)
+
+			if entry != None and self._expired(entry[1], now):
+				del self._memory[key]
+				entry = None
+
+			if entry != None:
+				self._memory.move_to_end(key)
+				self._memoryHits += 1
+				self._savedSeconds += entry[2]
+				return entry[0]
+
+			# Disk tier
+			if self._disk != None:
+				row = self._disk.execute("SELECT response, created, latency FROM responses WHERE key = ?", (key,)).fetchone()
+
+				if row != None and not self._expired(row[1], now):
+					self._disk.execute("UPDATE responses SET used = ? WHERE key = ?", (now, key))
+					self._disk.commit()
+
+					self._remember(key, tuple(row))
+					self._diskHits += 1
+					self._savedSeconds += row[2]
+					return row[0]
+
+			self._misses += 1
+
+			return None
+
+	def put(self, key: str, response: str, latency: float = 0.0) -> None:
+		"""
+		Store a response
+
+		Args:
+			key (str): Key from ResponseCache.key()
+			response (str): AI response
+			latency (float): Seconds the AI took to respond, counted as saved on every later hit
+		"""
+
+		now = time.time()
+
+		with self._lock:
+			self._remember(key, (response, now, latency))
+
+			if self._disk != None:
+				self._disk.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)", (key, response, now, latency, now))
+
+				# Evict expired, then least recently used above the size limit
+				if self.ttl != None:
+					self._disk.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+
+				self._disk.execute("DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY used DESC LIMIT -1 OFFSET ?)", (self.maxDiskEntries,))
+				self._disk.commit()
+
+	def clear(self) -> None:
+		"""
+		Remove every cached response from both tiers
+		"""
+
+		with self._lock:
+			self._memory.clear()
+
+			if self._disk != None:
+				self._disk.execute("DELETE FROM responses")
+				self._disk.commit()
+
+	def stats(self) -> dict:
+		"""
+		Get hit/miss counters and the AI latency saved by hits
+		"""
+
+		with self._lock:
+			hits = self._memoryHits + self._diskHits
+			total = hits + self._misses
+
+			return {
+				'hits': hits,
+				'memoryHits': self._memoryHits,
+				'diskHits': self._diskHits,
+				'misses': self._misses,
+				'hitRate': hits / total if total else 0.0,
+				'savedSeconds': self._savedSeconds,
+				'entries': len(self._memory)
+			}
+
+
+	def _expired(self, created: float, now: float) -> bool:
+		return self.ttl != None and now - created > self.ttl
+
+	def _remember(self, key: str, entry: tuple) -> None:
+		self._memory[key] = entry
+		self._memory.move_to_end(key)
+
+		while len(self._memory) > self.maxEntries:
+			self._memory.popitem(last=False)
@@ -0,0 +1,208 @@
+class ColumnarResult:
+	def __init__(self, columns: list[dict], data, backend: str, truncated: bool = False) -> None:
+		"""
+		Query result stored column by column, as NumPy arrays or an Arrow table, so it reaches pandas or Polars without per-row Python objects
+
+		Built with ColumnarResult.fromCursor() or ColumnarResult.fromArrow(), usually through Database.columnar().
+
+		Args:
+			columns (list[dict]): Metadata of each column - 'name', 'type', 'precision', 'scale' and 'nullable'
+			data: Dictionary of NumPy arrays by column name for 'numpy', pyarrow.Table for 'arrow'
+			backend (str): 'numpy' or 'arrow'
+			truncated (bool): Whether rows past a cap were left unfetched
+		"""
+
+		self.columns = columns
+		self.data = data
+		self.backend = backend
+		self.truncated = truncated
+
+
+	@classmethod
+	def fromCursor(cls, cursor, backend: str = 'numpy', arraysize: int = 1000, maxRows: int = None) -> 'ColumnarResult':
+		"""
+		Fetch the rows of an executed cursor `arraysize` at a time, turning each batch into columns before fetching the next
+
+		Args:
+			cursor: DB-API cursor a query was executed on
+			backend (str): 'numpy' or 'arrow'
+			arraysize (int): Rows fetched per round trip
+			maxRows (int): Most rows to fetch (Optional)
+		"""
+
+		convert = _importBackend(backend)
+
+		description = cursor.description or []
+		columns = [{
+			'name': column[0],
+			'type': getattr(column[1], 'name', str(column[1])),
+			'precision': column[4],
+			'scale': column[5],
+			'nullable': column[6]
+		} for column in description]
+
+		# Joins can return the same name twice, but every column needs its own key
+		seen = {}
+
+		for column in columns:
+			seen[column['name']] = seen.get(column['name'], 0) + 1
+
+			if seen[column['name']] > 1:
+				column['name'] = f"{column['name']}_{seen[column['name']]}"
+
+		names = [column['name'] for column in columns]
+		chunks = [[] for _ in names]
+		fetched = 0
+		truncated = False
+
+		while description:
+			rows = cursor.fetchmany(arraysize)
+
+			if not rows:
+				break
+
+			if maxRows != None and fetched + len(rows) > maxRows:
+				rows = rows[:maxRows - fetched]
+				truncated = True
+
+			fetched += len(rows)
+
+			# Each batch of rows becomes one chunk per column, so row tuples never pile up
+			for chunk, values in zip(chunks, zip(*rows)):
+				chunk.append(convert(list(values)))
+
+			if truncated:
+				break
+
+		return cls(columns, _combine(backend, names, chunks), backend, truncated)
+
+	@classmethod
+	def fromArrow(cls, batches, backend: str = 'numpy', maxRows: int = None) -> 'ColumnarResult':
+		"""
+		Build from Arrow data, such as the DataFrames python-oracledb fetches natively
+
+		Args:
+			batches: Iterable of objects pyarrow.table() accepts (pyarrow tables or record batches, Oracle DataFrames, ...)
+			backend (str): 'numpy' or 'arrow'
+			maxRows (int): Most rows to keep (Optional)
+		"""
+
+		import pyarrow
+
+		tables = []
+		fetched = 0
+		truncated = False
+
+		for batch in batches:
+			table = pyarrow.table(batch)
+
+			if maxRows != None and fetched + table.num_rows > maxRows:
+				table = table.slice(0, maxRows - fetched)
+				truncated = True
+
+			tables.append(table)
+			fetched += table.num_rows
+
+			if truncated:
+				break
+
+		if not tables:
+			return cls([], {} if backend == 'numpy' else pyarrow.table({}), backend)
+
+		table = pyarrow.concat_tables(tables, promote_options='permissive')
+
+		columns = [{
+			'name': field.name,
+			'type': str(field.type),
+			'precision': getattr(field.type, 'precision', None),
+			'scale': getattr(field.type, 'scale', None),
+			'nullable': field.nullable
+		} for field in table.schema]
+
+		if backend == 'numpy':
+			table = {name: column.to_numpy() for name, column in zip(table.column_names, table.columns)}
+
+		return cls(columns, table, backend, truncated)
+
+
+	def __len__(self) -> int:
+		if self.backend == 'arrow':
+			return self.data.num_rows
+
+		return len(next(iter(self.data.values()))) if self.data else 0
+
+	def __getitem__(self, name: str):
+		"""
+		Get one column, as a NumPy array or Arrow chunked array
+		"""
+
+		return self.data[name] if self.backend == 'numpy' else self.data.column(name)
+
+	@property
+	def names(self) -> list[str]:
+		"""
+		Names of the columns, in order
+		"""
+
+		return [column['name'] for column in self.columns]
+
+	def toArrow(self):
+		"""
+		Get the result as a pyarrow.Table
+		"""
+
+		if self.backend == 'arrow':
+			return self.data
+
+		import pyarrow
+		return pyarrow.table(self.data)
+
+	def toNumpy(self) -> dict:
+		"""
+		Get the result as a dictionary of NumPy arrays by column name
+		"""
+
+		if self.backend == 'numpy':
+			return self.data
+
+		return {name: column.to_numpy() for name, column in zip(self.data.column_names, self.data.columns)}
+
+	def toPandas(self):
+		"""
+		Get the result as a pandas DataFrame
+		"""
+
+		if self.backend == 'arrow':
+			return self.data.to_pandas()
+
+		import pandas
+		return pandas.DataFrame(self.data, columns=self.names, copy=False)
+
+
+def _importBackend(backend: str):
+	# Returns the function turning one column of a batch into a chunk
+	match backend:
+		case 'numpy':
+			import numpy
+			return lambda values: numpy.asarray(values) if None not in values else numpy.asarray(values, dtype=object)
+
+		case 'arrow':
+			import pyarrow
+			return pyarrow.array
+
+		case _:
+			raise ValueError("Only 'numpy' and 'arrow' backends available at the moment.")
+
+def _combine(backend: str, names: list[str], chunks: list[list]):
+	if backend == 'numpy':
+		import numpy
+		return {name: numpy.concatenate(chunk) if chunk else numpy.asarray([]) for name, chunk in zip(names, chunks)}
+
+	import pyarrow
+
+	if not chunks or not chunks[0]:
+		return pyarrow.Table.from_arrays([pyarrow.array([]) for _ in names], names=names)
+
+	# Batches may infer different types (all nulls, ints then floats), which concatenating promotes to one
+	batches = [pyarrow.Table.from_arrays(list(arrays), names=names) for arrays in zip(*chunks)]
+	return pyarrow.concat_tables(batches, promote_options='permissive')
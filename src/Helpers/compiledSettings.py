@@ -0,0 +1,290 @@
+import hashlib
+import json
+import marshal
+import mmap
+import os
+import struct
+
+from .schemaCatalog import SchemaCatalog, TableRecord, _VERSIONS
+from .schemaIndex import SchemaIndex
+
+
+# Header: magic, format version, marshal version, source mtime (ns), source size, source SHA-256, index offset, index length
+HEADER = struct.Struct('<8sHHqq32sQQ')
+MAGIC = b'SMARTSQL'
+FORMAT_VERSION = 2
+
+# Offset of the source mtime in the header, rewritten in place when only the mtime changed
+_MTIME_OFFSET = 12
+
+
+class CompiledSettings:
+	def __init__(self, settingsPath: str, compiledPath: str = None) -> None:
+		"""
+		Memory-mapped, lazily decoded view of a settings JSON, for fast cold starts
+
+		The JSON is compiled once into a binary file next to it (`settings.json.compiled` by default): a header recording
+		the JSON's mtime, size and SHA-256, every table stored separately and an index of where each table starts. Opening
+		only reads the header and index, and a table is decoded the first time it is asked for. The file is memory-mapped
+		read-only, so processes opening the same settings share its pages instead of each keeping a full copy.
+
+		The column and foreign key lookups of a SchemaCatalog and the terms of a SchemaIndex are stored too, each decoded
+		on first use, so catalog lookups and table search never decode a table. Like a SchemaCatalog, it has a `version`
+		caches can key on.
+
+		The compiled file is rebuilt whenever the JSON's mtime or size changed and its hash no longer matches (a JSON that
+		was only touched keeps its compiled file). Rebuilding writes a new file and swaps it in, so processes still reading
+		the old one are unaffected.
+
+		Args:
+			settingsPath (str): Path of settings/JSON file
+			compiledPath (str): Path of the compiled file. Defaults to the settings path with a '.compiled' extension
+		"""
+
+		self.settingsPath = settingsPath
+		self.compiledPath = compiledPath if compiledPath != None else settingsPath + '.compiled'
+
+		if not _fresh(self.settingsPath, self.compiledPath):
+			compileSettings(self.settingsPath, self.compiledPath)
+
+		with open(self.compiledPath, 'rb') as file:
+			self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+		offset, length = HEADER.unpack_from(self._map)[-2:]
+		index = marshal.loads(self._map[offset:offset + length])
+
+		server = index['server']
+
+		self.name = server.get('Server_Name')
+		self.description = server.get('Server_Description')
+		self.flavor = server.get('SQL_Flavor')
+
+		self._server = server
+		self._names = tuple(name for name, start, size in index['tables'])
+		self._spans = {name.lower(): (name, start, size) for name, start, size in index['tables']}
+		self._records = {} # Lower case name -> TableRecord, filled in as tables are asked for
+		self._sections = index['sections'] # Section name -> (offset, length) of lookups stored at compile time
+		self._decoded = {} # Section name -> decoded section, filled in as sections are asked for
+		self._searchIndex = None
+
+		self.version = next(_VERSIONS)
+
+
+	def table(self, name: str) -> TableRecord:
+		"""
+		Get a table by name (case insensitive), decoding it on first use. Raises a KeyError if there is none
+
+		Args:
+			name (str): Name of table
+		"""
+
+		key = name.lower()
+		record = self._records.get(key)
+
+		if record == None:
+			record = self._records[key] = TableRecord.fromDict(self._decode(key, name))
+
+		return record
+
+	def names(self) -> tuple[str]:
+		"""
+		Names of every table, in settings order, without decoding any
+		"""
+
+		return self._names
+
+	def tablesWithColumn(self, column: str) -> tuple[str]:
+		"""
+		Names of the tables that have a column (case insensitive), without decoding any table
+
+		Args:
+			column (str): Name of column
+		"""
+
+		return self._section('lookups')['columns'].get(column.lower(), ())
+
+	def references(self, table: str) -> tuple[tuple[str, str]]:
+		"""
+		Foreign keys of a table, as (column, referenced table) pairs, without decoding any table
+
+		Args:
+			table (str): Name of table
+		"""
+
+		return self._section('lookups')['references'].get(self._name(table), ())
+
+	def referencedBy(self, table: str) -> tuple[tuple[str, str]]:
+		"""
+		Foreign keys referencing a table, as (table, column) pairs, without decoding any table
+
+		Args:
+			table (str): Name of table
+		"""
+
+		return self._section('lookups')['referencedBy'].get(self._name(table), ())
+
+	def searchIndex(self) -> SchemaIndex:
+		"""
+		Get the SchemaIndex of the settings, loaded from the terms stored at compile time on first use
+		"""
+
+		if self._searchIndex == None:
+			search = self._section('search')
+			self._searchIndex = SchemaIndex.fromPostings(search['names'], search['lengths'], search['postings'])
+
+		return self._searchIndex
+
+	def toSettings(self, tables: list[str] = None) -> dict:
+		"""
+		Get the settings dictionary, decoding only the tables asked for
+
+		Args:
+			tables (list[str]): Names of tables to include (case insensitive). If None, every table is included
+		"""
+
+		names = self._names if tables == None else tables
+
+		return {**self._server, 'Tables': [self._decode(name.lower(), name) for name in names]}
+
+	def close(self) -> None:
+		"""
+		Unmap the compiled file
+		"""
+
+		self._map.close()
+
+	def __contains__(self, name: str) -> bool:
+		return isinstance(name, str) and name.lower() in self._spans
+
+	def __iter__(self):
+		return (self.table(name) for name in self._names)
+
+	def __len__(self) -> int:
+		return len(self._names)
+
+
+	def _name(self, name: str) -> str:
+		# Name of a table as written in settings. Raises a KeyError if there is none
+		span = self._spans.get(name.lower())
+
+		if span == None:
+			raise KeyError(f"No table named '{name}'")
+
+		return span[0]
+
+	def _section(self, name: str) -> dict:
+		# Lookups stored at compile time, decoded on first use
+		section = self._decoded.get(name)
+
+		if section == None:
+			offset, length = self._sections[name]
+			section = self._decoded[name] = marshal.loads(self._map[offset:offset + length])
+
+		return section
+
+	def _decode(self, key: str, name: str) -> dict:
+		# Fresh dictionary of one table, straight from the mapped file
+		span = self._spans.get(key)
+
+		if span == None:
+			raise KeyError(f"No table named '{name}'")
+
+		return marshal.loads(self._map[span[1]:span[1] + span[2]])
+
+
+def compileSettings(settingsPath: str, compiledPath: str = None) -> str:
+	"""
+	Compile a settings JSON for CompiledSettings, returning the path of the compiled file
+
+	Args:
+		settingsPath (str): Path of settings/JSON file
+		compiledPath (str): Path of the compiled file. Defaults to the settings path with a '.compiled' extension
+	"""
+
+	if compiledPath == None:
+		compiledPath = settingsPath + '.compiled'
+
+	with open(settingsPath, 'rb') as file:
+		source = file.read()
+		stat = os.fstat(file.fileno())
+
+	settings = json.loads(source)
+
+	catalog = SchemaCatalog(settings)
+	search = SchemaIndex(settings)
+
+	# Lookups that would otherwise need every table decoded
+	sections = {
+		'lookups': {
+			'columns': {name: catalog.tablesWithColumn(name) for name in {column.name.lower() for table in catalog for column in table.columns}},
+			'references': {name: catalog.references(name) for name in catalog.names() if catalog.references(name)},
+			'referencedBy': {name: catalog.referencedBy(name) for name in catalog.names() if catalog.referencedBy(name)}
+		},
+		'search': {'names': search.names, 'lengths': search.lengths, 'postings': {term: tuple(docs) for term, docs in search.postings.items()}}
+	}
+
+	# Each table on its own, after the header, then the lookups, then the index
+	blobs = [marshal.dumps(table) for table in settings['Tables']]
+	tables, offset = [], HEADER.size
+
+	for table, blob in zip(settings['Tables'], blobs):
+		tables.append((table['Name'], offset, len(blob)))
+		offset += len(blob)
+
+	spans = {}
+
+	for name, section in sections.items():
+		blobs.append(marshal.dumps(section))
+		spans[name] = (offset, len(blobs[-1]))
+		offset += len(blobs[-1])
+
+	index = marshal.dumps({'server': {key: value for key, value in settings.items() if key != 'Tables'}, 'tables': tables, 'sections': spans})
+	header = HEADER.pack(MAGIC, FORMAT_VERSION, marshal.version, stat.st_mtime_ns, stat.st_size, hashlib.sha256(source).digest(), offset, len(index))
+
+	# Written aside and swapped in, so readers never see a partial file
+	temporary = f"{compiledPath}.{os.getpid()}.tmp"
+
+	with open(temporary, 'wb') as file:
+		file.write(header)
+		file.writelines(blobs)
+		file.write(index)
+
+	os.replace(temporary, compiledPath)
+
+	return compiledPath
+
+
+def _fresh(settingsPath: str, compiledPath: str) -> bool:
+	# Whether the compiled file is usable for the JSON as it is now
+	try:
+		with open(compiledPath, 'rb') as file:
+			header = file.read(HEADER.size)
+	except FileNotFoundError:
+		return False
+
+	if len(header) != HEADER.size:
+		return False
+
+	magic, version, marshalVersion, mtime, size, digest = HEADER.unpack(header)[:6]
+
+	if magic != MAGIC or version != FORMAT_VERSION or marshalVersion != marshal.version:
+		return False
+
+	stat = os.stat(settingsPath)
+
+	if stat.st_mtime_ns == mtime and stat.st_size == size:
+		return True
+
+	if stat.st_size != size:
+		return False
+
+	# Same size but touched, so compare contents before rebuilding
+	with open(settingsPath, 'rb') as file:
+		if hashlib.sha256(file.read()).digest() != digest:
+			return False
+
+	with open(compiledPath, 'r+b') as file:
+		file.seek(_MTIME_OFFSET)
+		file.write(struct.pack('<q', stat.st_mtime_ns))
+
+	return True
@@ -0,0 +1,68 @@
+class CostGuard:
+	def __init__(self, maxCost: float = None, maxRows: float = None, noFullScan: list[str] = None, allowCartesian: bool = False, action: str = 'confirm', maxRewrites: int = 2) -> None:
+		"""
+		Limits on the estimated execution plan of generated SQL, checked before it runs
+
+		Args:
+			maxCost (float): Highest optimizer cost allowed (Optional)
+			maxRows (float): Highest estimated rows returned allowed (Optional)
+			noFullScan (list[str]): Tables that must not be fully scanned, or ['*'] for every table (Optional)
+			allowCartesian (bool): Whether joins without a join condition are allowed
+			action (str): What to do with SQL over a limit - 'reject' (raise an error), 'confirm' (ask before executing, even if confirmExecute is off) or 'rewrite' (send the plan back to the AI for a cheaper version, rejecting if still over after maxRewrites)
+			maxRewrites (int): Attempts at a cheaper version when action is 'rewrite'
+		"""
+
+		if action not in ('reject', 'confirm', 'rewrite'):
+			raise ValueError("Only 'reject', 'confirm' and 'rewrite' actions available at the moment.")
+
+		self.maxCost = maxCost
+		self.maxRows = maxRows
+		self.noFullScan = {table.lower() for table in noFullScan or []}
+		self.allowCartesian = allowCartesian
+		self.action = action
+		self.maxRewrites = maxRewrites
+
+
+	def check(self, plan: dict) -> list[str]:
+		"""
+		Get the limits a plan goes over, as readable strings (empty if within every limit)
+
+		Args:
+			plan (dict): Plan summary from Database.explain()
+		"""
+
+		violations = []
+
+		if self.maxCost != None and plan['cost'] != None and plan['cost'] > self.maxCost:
+			violations.append(f"estimated cost {plan['cost']} is over {self.maxCost}")
+
+		if self.maxRows != None and plan['rows'] != None and plan['rows'] > self.maxRows:
+			violations.append(f"estimated rows {plan['rows']} is over {self.maxRows}")
+
+		for table in plan['fullScans']:
+			if '*' in self.noFullScan or table.lower() in self.noFullScan:
+				violations.append(f"full scan of {table}")
+
+		if plan['cartesian'] and not self.allowCartesian:
+			violations.append("cartesian join (join without a join condition)")
+
+		return violations
+
+
+def describePlan(plan: dict) -> str:
+	"""
+	One line summary of a plan from Database.explain(), e.g. for confirmation prompts
+
+	Args:
+		plan (dict): Plan summary from Database.explain()
+	"""
+
+	summary = f"Estimated cost: {plan['cost']}, rows: {plan['rows']}"
+
+	if plan['fullScans']:
+		summary += f", full scans: {', '.join(plan['fullScans'])}"
+
+	if plan['cartesian']:
+		summary += ", cartesian join"
+
+	return summary
@@ -1,13 +1,39 @@
 # NOTE: If using different database provider, please modify this class as fit
 
+import json
+import re
+from contextlib import asynccontextmanager, contextmanager
+from uuid import uuid4
+
+from .columnar import ColumnarResult
+from .metrics import Metrics
+from .pool import sharedPool
+
+
+# Row limiting clause of an Oracle query, which cannot take a second one
+ROW_LIMIT = re.compile(r'\b(FETCH\s+(FIRST|NEXT)|OFFSET\s+\S+\s+ROWS?)\b', re.IGNORECASE)
+
+# Table and alias after FROM, JOIN or a comma, e.g. "FROM ORDERS o" or "JOIN CUSTOMERS AS c", for reading SQLite plans
+SQLITE_ALIAS = re.compile(r'(?:\bFROM|\bJOIN|,)\s*([\w$]+)\s+(?:AS\s+)?(\w+)', re.IGNORECASE)
+
+# Words that can follow a table in place of an alias
+SQL_KEYWORDS = frozenset(('AS', 'CROSS', 'EXCEPT', 'FROM', 'FULL', 'GROUP', 'HAVING', 'INDEXED', 'INNER', 'INTERSECT', 'JOIN', 'LEFT', 'LIMIT', 'NATURAL', 'NOT', 'ON', 'ORDER', 'OUTER', 'RIGHT', 'SET', 'UNION', 'USING', 'VALUES', 'WHERE', 'WINDOW'))
+
+# Async pools are bound to an event loop, so they are shared per loop and connection details
+_ASYNC_POOLS = {}
+
+
 class Database:
-	def __init__(self, connection: dict[str], flavor: str) -> None:
+	def __init__(self, connection: dict[str], flavor: str, pooled: bool = False, metrics: Metrics = None, **poolOptions) -> None:
 		"""
 		Class to manage database, provided connection details
 
 		Args:
 			connection (dict[str]): Dictionary of strings containing properties of database connection string
-			flavor (str): Type of SQL - Currently only 'oracle' or 'postgres' supported
+			flavor (str): Type of SQL - Currently only 'oracle', 'postgres' or 'sqlite' supported
+			pooled (bool): Whether to reuse connections from a pool shared by the whole process instead of connecting per query (not for 'sqlite')
+			metrics (Metrics): Where to record the time spent connecting, executing and fetching (Optional)
+			**poolOptions: Any arguments to pass into ConnectionPool (minSize, maxSize, pingInterval, idleTimeout, acquireTimeout)
 		
 		### Example Structure of `connection` for 'oracle':
 
@@ -30,50 +56,857 @@ class Database:
 			"DB_PORT": "0000"
 		}
 		```
+
+		### Example Structure of `connection` for 'sqlite':
+
+		```
+		{
+			"DB_PATH" : "./local.db"
+		}
+		```
+		"""
+
+		if flavor not in ('oracle', 'postgres', 'sqlite'):
+			raise ValueError("Only 'oracle', 'postgres' and 'sqlite' flavors available at the moment.")
+
+		if pooled and flavor == 'sqlite':
+			raise ValueError("Only 'oracle' and 'postgres' flavors available at the moment.")
+
+		self.flavor = flavor
+		self.details = connection
+		self.pooled = pooled
+		self.metrics = metrics if metrics != None else Metrics()
+		self.poolOptions = poolOptions
+
+		# Nothing is imported or opened until first use (or warmup())
+		self._pool = None
+		self._spare = [] # Connection opened by warmup(), used by the next query when not pooled
+
+
+	@property
+	def pool(self):
 		"""
+		Pool shared with every other pooled Database using the same connection details, created on first use. None if not pooled
+		"""
+
+		if self.pooled and self._pool == None:
+			self._pool = sharedPool(self.details, self.flavor, **self.poolOptions)
 
-		match flavor:
+		return self._pool
+
+	def connect(self):
+		"""
+		Open a new connection, importing the driver on first use
+		"""
+
+		match self.flavor:
 			case 'oracle':
 				import oracledb
-				self.connect = lambda: oracledb.connect(
-					user= connection['DB_USER'],
-					password= connection['DB_PASSWORD'],
-					dsn= connection['DB_DSN']
+				return oracledb.connect(
+					user= self.details['DB_USER'],
+					password= self.details['DB_PASSWORD'],
+					dsn= self.details['DB_DSN']
 				)
 
 			case 'postgres':
 				import psycopg2
-				self.connect = lambda: psycopg2.connect(
-					user= connection['DB_USER'],
-					password= connection['DB_PASSWORD'],
-					dbname= connection['DB_NAME'],
-					host= connection['DB_HOST'],
-					port= connection['DB_PORT']
+				return psycopg2.connect(
+					user= self.details['DB_USER'],
+					password= self.details['DB_PASSWORD'],
+					dbname= self.details['DB_NAME'],
+					host= self.details['DB_HOST'],
+					port= self.details['DB_PORT']
 				)
-			
-			case _:
-				raise ValueError("Only 'oracle' and 'postgres' flavors available at the moment.")
 
+			case 'sqlite':
+				import sqlite3
+				return sqlite3.connect(self.details['DB_PATH'], isolation_level=None)
+
+	def warmup(self) -> None:
+		"""
+		Import the driver and open a connection ahead of the first query: the pool's connections if pooled, otherwise one
+		connection kept for the next query (except for SQLite, whose connections are cheap and tied to the thread opening them)
+		"""
+
+		if self.pooled:
+			self.pool.release(self.pool.acquire())
+		elif self.flavor == 'sqlite':
+			import sqlite3
+		elif not self._spare:
+			self._spare.append(self.connect())
+
+	@contextmanager
+	def connection(self):
+		"""
+		Context manager giving a connection, checked out from the pool if pooled, otherwise freshly opened
+
+		Example:
+			```
+			with db.connection() as connection:
+				cursor = connection.cursor()
+			```
+		"""
+
+		with self.metrics.span('connect', pooled=self.pooled):
+			connection = self._acquire()
+
+		try:
+			yield connection
+		finally:
+			self._release(connection)
 
-	def execute(self, code: str) -> list:
+	def execute(self, code: str, params: dict | list = None, stream: bool = False, arraysize: int = 1000, maxRows: int = None) -> list:
 		"""
 		Executes SQL code given with Oracle DB
+
+		Args:
+			code (str): SQL code to run
+			params (dict | list): Bind variables for the statement (Optional)
+			stream (bool): If true, return a RowStream fetching rows in batches instead of a list of every row
+			arraysize (int): Rows fetched per round trip when streaming
+			maxRows (int): If given, return a ResultPage of at most this many rows instead of a list of every row
 		"""
 
+		if stream:
+			return self.stream(code, params, arraysize)
+
+		if maxRows != None:
+			return self.page(code, params, maxRows)
+
 		# Connect to DB
-		connection = self.connect()
-		cursor = connection.cursor()
+		with self.connection() as connection:
+			cursor = connection.cursor()
 
-		# Run SQL
-		cursor.execute(code)
+			# Run SQL
+			with self.metrics.span('execute'):
+				if params:
+					cursor.execute(code, params)
+				else:
+					cursor.execute(code)
 
-		try:
-			result = cursor.fetchall()
-		except Exception: # No result needed – .fetchall() fails
-			result = []
+			with self.metrics.span('fetch') as span:
+				try:
+					result = cursor.fetchall()
+				except Exception: # No result needed – .fetchall() fails
+					result = []
+
+				span['attributes']['rows'] = len(result)
 
-		# Close connections
-		cursor.close()
-		connection.close()
+			# Close cursor
+			cursor.close()
 
 		return result
+
+	def stream(self, code: str, params: dict | list = None, arraysize: int = 1000) -> 'RowStream':
+		"""
+		Executes SQL code and returns an iterator over its rows, fetched `arraysize` at a time so memory stays flat
+
+		The connection is held until the iterator is exhausted or closed. On Postgres, queries use a named (server-side) cursor.
+
+		Args:
+			code (str): SQL code to run
+			params (dict | list): Bind variables for the statement (Optional)
+			arraysize (int): Rows fetched per round trip
+		"""
+
+		with self.metrics.span('connect', pooled=self.pooled):
+			connection = self._acquire()
+
+		try:
+			# Server-side cursor so Postgres does not send the whole result on execute (only valid for queries)
+			if self.flavor == 'postgres' and code.lstrip().upper().startswith(('SELECT', 'WITH')):
+				cursor = connection.cursor(name=f"smartsql_{uuid4().hex}")
+				cursor.itersize = arraysize
+			else:
+				cursor = connection.cursor()
+
+			cursor.arraysize = arraysize
+
+			if self.flavor == 'oracle':
+				cursor.prefetchrows = arraysize
+
+			# Run SQL
+			with self.metrics.span('execute', stream=True):
+				if params:
+					cursor.execute(code, params)
+				else:
+					cursor.execute(code)
+
+		except Exception:
+			self._release(connection)
+			raise
+
+		return RowStream(cursor, lambda: self._release(connection), arraysize)
+
+	def page(self, code: str, params: dict | list = None, maxRows: int = 1000, offset: int = 0, keyset: str = None, after = None) -> 'ResultPage':
+		"""
+		Executes SQL code and returns at most `maxRows` rows as a ResultPage, whose .next() fetches the following page
+
+		Queries are wrapped in a LIMIT (Postgres) or FETCH NEXT (Oracle) clause asking for one row more than the cap, to tell
+		if there are more. On Oracle the clause is added to the query itself rather than around it, unless paging by keyset.
+		Other statements, and Oracle queries with a row limiting clause of their own, are run as they are and fetching stops
+		at the cap.
+
+		Pages are found by offset unless `keyset` names a result column, in which case rows are ordered by it and the next page
+		starts after the last value seen. That stays fast however deep the page, but the column should be unique (and on Oracle,
+		so should the query's column names, as the query is then wrapped in an inline view).
+
+		Args:
+			code (str): SQL code to run
+			params (dict | list): Bind variables for the statement (Optional)
+			maxRows (int): Rows per page
+			offset (int): Rows to skip, when paging by offset
+			keyset (str): Result column to page by instead of offset. A table prefix such as "o." is dropped (Optional)
+			after: Value of `keyset` the page starts after. If None, the first page
+		"""
+
+		baseParams = params
+		statement = code.strip().rstrip(';')
+		wrapped = statement.upper().startswith(('SELECT', 'WITH')) and ';' not in statement
+
+		if wrapped:
+			where = order = ''
+
+			if keyset != None:
+				if params and not isinstance(params, dict):
+					raise ValueError("Paging by keyset needs named bind variables.")
+
+				# Outside the query only its result columns are known, so drop any table prefix (e.g. "o.ORDER_ID")
+				column = keyset.split('.')[-1]
+				order = f" ORDER BY {column}"
+
+				if after != None:
+					if self.flavor == 'postgres' and not params:
+						statement = statement.replace('%', '%%') # Becomes a bind statement, so escape literal percent signs
+
+					where = f" WHERE {column} > {'%(smartsql_after)s' if self.flavor == 'postgres' else ':smartsql_after'}"
+					params = {**(params or {}), 'smartsql_after': after}
+
+				offset = 0
+
+			if self.flavor in ('postgres', 'sqlite'):
+				statement = f"SELECT * FROM ({statement}) smartsql_page{where}{order} LIMIT {maxRows + 1} OFFSET {offset}"
+			elif keyset != None:
+				statement = f"SELECT * FROM ({statement}) smartsql_page{where}{order} OFFSET {offset} ROWS FETCH NEXT {maxRows + 1} ROWS ONLY"
+			elif not ROW_LIMIT.search(statement):
+				# Oracle rejects inline views with duplicate column names (ORA-00918, e.g. SELECT * over a join), so limit the query itself
+				statement = f"{statement} OFFSET {offset} ROWS FETCH NEXT {maxRows + 1} ROWS ONLY"
+			else:
+				# Already limited, so run as it is and stop fetching at the cap
+				wrapped = False
+
+		with self.connection() as connection:
+			cursor = connection.cursor()
+			cursor.arraysize = maxRows + 1
+
+			try:
+				with self.metrics.span('execute'):
+					if params:
+						cursor.execute(statement, params)
+					else:
+						cursor.execute(statement)
+
+				columns = [column[0] for column in cursor.description] if cursor.description != None else []
+
+				with self.metrics.span('fetch') as span:
+					rows = cursor.fetchmany(maxRows + 1) if cursor.description != None else []
+					span['attributes']['rows'] = min(len(rows), maxRows)
+
+			finally:
+				cursor.close()
+
+		truncated = len(rows) > maxRows
+		rows = rows[:maxRows]
+		fetchNext = None
+
+		# Only wrapped queries can be asked for the next page
+		if truncated and wrapped:
+			if keyset != None:
+				names = [column.lower() for column in columns]
+				key = keyset.replace('"', '').split('.')[-1].lower()
+
+				if key not in names:
+					raise ValueError(f"Keyset column {keyset} is not in the result.")
+
+				last = rows[-1][names.index(key)]
+				fetchNext = lambda: self.page(code, baseParams, maxRows, 0, keyset, last)
+			else:
+				fetchNext = lambda: self.page(code, baseParams, maxRows, offset + maxRows)
+
+		return ResultPage(rows, columns, truncated, offset, fetchNext)
+
+	def columnar(self, code: str, params: dict | list = None, backend: str = 'numpy', arraysize: int = 1000, maxRows: int = None) -> ColumnarResult:
+		"""
+		Executes a query and returns its rows column by column as a ColumnarResult, built batch by batch
+
+		On Oracle, rows are fetched straight into Arrow memory with python-oracledb's DataFrame fetch when pyarrow is installed.
+
+		Args:
+			code (str): SQL query to run
+			params (dict | list): Bind variables for the statement (Optional)
+			backend (str): 'numpy' (dictionary of NumPy arrays) or 'arrow' (pyarrow.Table)
+			arraysize (int): Rows fetched per round trip
+			maxRows (int): Most rows to fetch (Optional)
+		"""
+
+		with self.connection() as connection:
+			if self.flavor == 'oracle' and hasattr(connection, 'fetch_df_batches') and _hasPyarrow():
+				# Executes and fetches together
+				with self.metrics.span('fetch', native=True) as span:
+					result = ColumnarResult.fromArrow(connection.fetch_df_batches(code, params, size=arraysize), backend, maxRows)
+					span['attributes']['rows'] = len(result)
+
+				return result
+
+			cursor = connection.cursor()
+			cursor.arraysize = arraysize
+
+			if self.flavor == 'oracle':
+				cursor.prefetchrows = arraysize
+
+			try:
+				with self.metrics.span('execute'):
+					if params:
+						cursor.execute(code, params)
+					else:
+						cursor.execute(code)
+
+				with self.metrics.span('fetch') as span:
+					result = ColumnarResult.fromCursor(cursor, backend, arraysize, maxRows)
+					span['attributes']['rows'] = len(result)
+
+				return result
+
+			finally:
+				cursor.close()
+
+	def explain(self, code: str, params: dict | list = None) -> dict:
+		"""
+		Get the optimizer's estimated plan for SQL code without running it
+
+		Returns a dictionary: `{'cost': float, 'rows': float, 'fullScans': list[str], 'cartesian': bool, 'plan': str}`, where
+		'plan' is the plan as indented text. Oracle needs a PLAN_TABLE, which every recent version provides.
+
+		Args:
+			code (str): SQL code to explain (a single SELECT, WITH, INSERT, UPDATE, DELETE or MERGE statement)
+			params (dict | list): Bind variables for the statement (Optional)
+		"""
+
+		code = code.strip().rstrip(';')
+
+		with self.metrics.span('explain'), self.connection() as connection:
+			cursor = connection.cursor()
+
+			try:
+				if self.flavor == 'postgres':
+					cursor.execute(f"EXPLAIN (FORMAT JSON) {code}", params or None)
+					return _postgresPlan(cursor.fetchone()[0][0]['Plan'])
+
+				if self.flavor == 'sqlite':
+					cursor.execute(f"EXPLAIN QUERY PLAN {code}", params or {})
+					return _sqlitePlan(cursor.fetchall(), code)
+
+				statementId = uuid4().hex[:30]
+				cursor.execute(f"EXPLAIN PLAN SET STATEMENT_ID = '{statementId}' FOR {code}", params or {})
+				cursor.execute("SELECT depth, operation, options, object_name, cost, cardinality FROM plan_table WHERE statement_id = :id ORDER BY id", {'id': statementId})
+				rows = cursor.fetchall()
+				cursor.execute("DELETE FROM plan_table WHERE statement_id = :id", {'id': statementId})
+				connection.commit()
+
+				return _oraclePlan(rows)
+
+			finally:
+				cursor.close()
+
+	def poolStats(self) -> dict:
+		"""
+		Get usage and counters of the shared pool, or an empty dictionary if not pooled
+		"""
+
+		return self.pool.stats() if self.pooled else {}
+
+
+	def _acquire(self):
+		if self.pooled:
+			return self.pool.acquire()
+
+		try:
+			return self._spare.pop()
+		except IndexError:
+			return self.connect()
+
+	def _release(self, connection) -> None:
+		if self.pooled:
+			self.pool.release(connection)
+		else:
+			connection.close()
+
+
+def _hasPyarrow() -> bool:
+	try:
+		import pyarrow
+		return True
+	except ImportError:
+		return False
+
+def _postgresPlan(root: dict) -> dict:
+	fullScans = []
+	cartesian = False
+	lines = []
+
+	def walk(node: dict, depth: int) -> None:
+		nonlocal cartesian
+
+		relation = node.get('Relation Name')
+		lines.append(f"{'  ' * depth}{node['Node Type']}{' on ' + relation if relation else ''} (cost={node.get('Total Cost')} rows={node.get('Plan Rows')})")
+
+		if node['Node Type'] == 'Seq Scan' and relation:
+			fullScans.append(relation)
+
+		children = node.get('Plans', [])
+
+		# A nested loop with nothing relating its sides joins every row to every row
+		if node['Node Type'] == 'Nested Loop' and 'Join Filter' not in node and not any(_lookedUp(child) for child in children):
+			cartesian = True
+
+		for child in children:
+			walk(child, depth + 1)
+
+	walk(root, 0)
+
+	return {
+		'cost': root.get('Total Cost'),
+		'rows': root.get('Plan Rows'),
+		'fullScans': list(dict.fromkeys(fullScans)),
+		'cartesian': cartesian,
+		'plan': '\n'.join(lines)
+	}
+
+def _lookedUp(node: dict) -> bool:
+	# Whether a side of a nested loop is found by a condition, looking through the nodes caching it (Memoize on Postgres 14+)
+	if 'Index Cond' in node or 'Recheck Cond' in node or 'Cache Key' in node:
+		return True
+
+	if node['Node Type'] in ('Memoize', 'Materialize'):
+		return any(_lookedUp(child) for child in node.get('Plans', []))
+
+	return False
+
+def _sqlitePlan(rows: list[tuple], code: str = '') -> dict:
+	# SQLite only describes each step, without costs, row estimates or join conditions, and names tables by their alias if they have one
+	aliases = {alias.lower(): table for table, alias in SQLITE_ALIAS.findall(code) if alias.upper() not in SQL_KEYWORDS}
+	depths = {0: -1}
+	loops = {}
+	lines = []
+	fullScans = []
+	cartesian = False
+
+	for node, parent, _, detail in rows:
+		depths[node] = depths.get(parent, -1) + 1
+		lines.append(f"{'  ' * depths[node]}{detail}")
+
+		loop = re.match(r'(SCAN|SEARCH) (?:TABLE )?(\w+)', detail)
+
+		if not loop or detail == 'SCAN CONSTANT ROW':
+			continue
+
+		# Later loops of the same step run once per row of the earlier ones, so a full scan there reads every row every time
+		if loop.group(1) == 'SCAN' and 'USING' not in detail:
+			fullScans.append(aliases.get(loop.group(2).lower(), loop.group(2)))
+			cartesian |= loops.get(parent, 0) > 0
+
+		loops[parent] = loops.get(parent, 0) + 1
+
+	return {
+		'cost': None,
+		'rows': None,
+		'fullScans': list(dict.fromkeys(fullScans)),
+		'cartesian': cartesian,
+		'plan': '\n'.join(lines)
+	}
+
+def _oraclePlan(rows: list[tuple]) -> dict:
+	fullScans = []
+	cartesian = False
+	lines = []
+
+	for depth, operation, options, objectName, cost, cardinality in rows:
+		if operation == 'TABLE ACCESS' and options and options.endswith('FULL') and objectName:
+			fullScans.append(objectName)
+
+		if options == 'CARTESIAN':
+			cartesian = True
+
+		lines.append(f"{'  ' * (depth or 0)}{operation}{' ' + options if options else ''}{' on ' + objectName if objectName else ''} (cost={cost} rows={cardinality})")
+
+	return {
+		'cost': rows[0][4] if rows else None,
+		'rows': rows[0][5] if rows else None,
+		'fullScans': list(dict.fromkeys(fullScans)),
+		'cartesian': cartesian,
+		'plan': '\n'.join(lines)
+	}
+
+
+class ResultPage(list):
+	def __init__(self, rows: list, columns: list[str], truncated: bool, offset: int, fetchNext = None) -> None:
+		"""
+		List of rows capped at a maximum, returned by Database.page()
+
+		Args:
+			rows (list): Rows of this page
+			columns (list[str]): Names of the result columns
+			truncated (bool): Whether there were more rows than the cap
+			offset (int): Rows skipped before this page, when paging by offset
+			fetchNext (callable): Fetches the following page (Optional)
+		"""
+
+		super().__init__(rows)
+
+		self.columns = columns
+		self.truncated = truncated
+		self.offset = offset
+		self._fetchNext = fetchNext
+
+	def next(self) -> 'ResultPage | None':
+		"""
+		Fetch the following page by running the same SQL again, or None if this is the last page
+		"""
+
+		return self._fetchNext() if self._fetchNext != None else None
+
+
+class RowStream:
+	def __init__(self, cursor, release, arraysize: int) -> None:
+		"""
+		Iterator over the rows of an executed cursor, fetched in batches. Returned by Database.stream()
+
+		Holds its connection until exhausted or closed, so use it in a `with` block or call .close() when stopping early.
+
+		Args:
+			cursor: Cursor the statement was executed on
+			release (callable): Called once to give the connection back
+			arraysize (int): Rows fetched per round trip
+		"""
+
+		self._cursor = cursor
+		self._release = release
+		self._batch = iter(())
+		self.arraysize = arraysize
+
+	def __iter__(self) -> 'RowStream':
+		return self
+
+	def __next__(self) -> tuple:
+		for row in self._batch:
+			return row
+
+		if self._cursor == None:
+			raise StopIteration
+
+		try:
+			# Statements without a result set have nothing to fetch
+			rows = self._cursor.fetchmany(self.arraysize) if self._cursor.description != None or getattr(self._cursor, 'name', None) else []
+		except Exception:
+			self.close()
+			raise
+
+		if not rows:
+			self.close()
+			raise StopIteration
+
+		self._batch = iter(rows)
+
+		return next(self._batch)
+
+	def __enter__(self) -> 'RowStream':
+		return self
+
+	def __exit__(self, *args) -> None:
+		self.close()
+
+	def __del__(self) -> None:
+		self.close()
+
+	def close(self) -> None:
+		"""
+		Close the cursor and give the connection back
+		"""
+
+		if self._cursor != None:
+			cursor, self._cursor = self._cursor, None
+
+			try:
+				cursor.close()
+			finally:
+				self._release()
+
+
+class AsyncDatabase:
+	def __init__(self, connection: dict[str], flavor: str, pooled: bool = False, metrics: Metrics = None, **poolOptions) -> None:
+		"""
+		Asynchronous version of Database, using python-oracledb's async connections for 'oracle' and asyncpg for 'postgres'
+
+		Takes the same `connection` layout as Database. Note asyncpg uses positional `$1, $2, ...` bind variables.
+
+		Args:
+			connection (dict[str]): Dictionary of strings containing properties of database connection string
+			flavor (str): Type of SQL - Currently only 'oracle' or 'postgres' supported
+			pooled (bool): Whether to reuse connections from a pool shared by every pooled AsyncDatabase on the same event loop
+			metrics (Metrics): Where to record the time spent connecting and executing (Optional)
+			**poolOptions: minSize, maxSize, pingInterval, idleTimeout and acquireTimeout, as for ConnectionPool
+		"""
+
+		if flavor not in ('oracle', 'postgres'):
+			raise ValueError("Only 'oracle' and 'postgres' flavors available at the moment.")
+
+		self.flavor = flavor
+		self.details = connection
+		self.pooled = pooled
+		self.metrics = metrics if metrics != None else Metrics()
+		self.poolOptions = {'minSize': 1, 'maxSize': 4, 'pingInterval': 60, 'idleTimeout': 300, 'acquireTimeout': 30, **poolOptions}
+
+
+	async def connect(self):
+		"""
+		Open a new connection
+		"""
+
+		match self.flavor:
+			case 'oracle':
+				import oracledb
+				return await oracledb.connect_async(
+					user= self.details['DB_USER'],
+					password= self.details['DB_PASSWORD'],
+					dsn= self.details['DB_DSN']
+				)
+
+			case 'postgres':
+				import asyncpg
+				return await asyncpg.connect(
+					user= self.details['DB_USER'],
+					password= self.details['DB_PASSWORD'],
+					database= self.details['DB_NAME'],
+					host= self.details['DB_HOST'],
+					port= self.details['DB_PORT']
+				)
+
+	@asynccontextmanager
+	async def connection(self):
+		"""
+		Async context manager giving a connection, checked out from the pool if pooled, otherwise freshly opened
+		"""
+
+		if not self.pooled:
+			with self.metrics.span('connect', pooled=False):
+				connection = await self.connect()
+
+			try:
+				yield connection
+			finally:
+				await connection.close()
+
+			return
+
+		with self.metrics.span('connect', pooled=True):
+			pool = await self._pool()
+
+			if self.flavor == 'oracle':
+				connection = await pool.acquire()
+			else:
+				connection = await pool.acquire(timeout=self.poolOptions['acquireTimeout'])
+
+		try:
+			yield connection
+		finally:
+			await pool.release(connection)
+
+	async def execute(self, code: str, params: dict | list = None, maxRows: int = None) -> list:
+		"""
+		Executes SQL code given, returning a list of row tuples
+
+		Args:
+			code (str): SQL code to run
+			params (dict | list): Bind variables for the statement (Optional)
+			maxRows (int): If given, return a ResultPage of at most this many rows instead of a list of every row. Fetching stops at the cap and the page has no next page (Optional)
+		"""
+
+		async with self.connection() as connection:
+			# Drivers execute and fetch in one call
+			with self.metrics.span('execute') as span:
+				if self.flavor == 'postgres' and maxRows == None:
+					result = [tuple(record) for record in await connection.fetch(code, *(params or []))]
+				elif self.flavor == 'postgres':
+					statement = await connection.prepare(code)
+					columns = [attribute.name for attribute in statement.get_attributes()]
+
+					# asyncpg cursors only exist inside a transaction, and only for statements returning rows
+					if columns:
+						async with connection.transaction():
+							cursor = await statement.cursor(*(params or []))
+							result = [tuple(record) for record in await cursor.fetch(maxRows + 1)]
+					else:
+						result = [tuple(record) for record in await statement.fetch(*(params or []))]
+				else:
+					cursor = connection.cursor()
+
+					try:
+						await cursor.execute(code, params)
+						columns = [column[0] for column in cursor.description] if cursor.description != None else []
+
+						if cursor.description == None:
+							result = []
+						elif maxRows == None:
+							result = await cursor.fetchall()
+						else:
+							result = await cursor.fetchmany(maxRows + 1)
+					finally:
+						cursor.close()
+
+				if maxRows != None:
+					result = ResultPage(result[:maxRows], columns, len(result) > maxRows, 0)
+
+				span['attributes']['rows'] = len(result)
+
+			return result
+
+	async def stream(self, code: str, params: dict | list = None, arraysize: int = 1000):
+		"""
+		Async generator over the rows of a query, fetched `arraysize` at a time. Holds the connection until exhausted or closed
+
+		Args:
+			code (str): SQL code to run
+			params (dict | list): Bind variables for the statement (Optional)
+			arraysize (int): Rows fetched per round trip
+		"""
+
+		async with self.connection() as connection:
+			if self.flavor == 'postgres':
+				# asyncpg cursors only exist inside a transaction
+				async with connection.transaction():
+					async for record in connection.cursor(code, *(params or []), prefetch=arraysize):
+						yield tuple(record)
+
+				return
+
+			cursor = connection.cursor()
+			cursor.arraysize = arraysize
+			cursor.prefetchrows = arraysize
+
+			try:
+				await cursor.execute(code, params)
+
+				while cursor.description != None and (rows := await cursor.fetchmany(arraysize)):
+					for row in rows:
+						yield row
+			finally:
+				cursor.close()
+
+	async def explain(self, code: str, params: dict | list = None) -> dict:
+		"""
+		Get the optimizer's estimated plan for SQL code without running it, as for Database.explain()
+
+		Args:
+			code (str): SQL code to explain (a single SELECT, WITH, INSERT, UPDATE, DELETE or MERGE statement)
+			params (dict | list): Bind variables for the statement (Optional)
+		"""
+
+		code = code.strip().rstrip(';')
+
+		with self.metrics.span('explain'):
+			async with self.connection() as connection:
+				if self.flavor == 'postgres':
+					# asyncpg gives JSON as text
+					plan = await connection.fetchval(f"EXPLAIN (FORMAT JSON) {code}", *(params or []))
+					return _postgresPlan((json.loads(plan) if isinstance(plan, str) else plan)[0]['Plan'])
+
+				cursor = connection.cursor()
+
+				try:
+					statementId = uuid4().hex[:30]
+					await cursor.execute(f"EXPLAIN PLAN SET STATEMENT_ID = '{statementId}' FOR {code}", params or {})
+					await cursor.execute("SELECT depth, operation, options, object_name, cost, cardinality FROM plan_table WHERE statement_id = :id ORDER BY id", {'id': statementId})
+					rows = await cursor.fetchall()
+					await cursor.execute("DELETE FROM plan_table WHERE statement_id = :id", {'id': statementId})
+					await connection.commit()
+
+					return _oraclePlan(rows)
+
+				finally:
+					cursor.close()
+
+	async def warmup(self) -> None:
+		"""
+		Create the pool for this event loop if pooled, otherwise import the driver, ahead of the first query
+		"""
+
+		if self.pooled:
+			await self._pool()
+		elif self.flavor == 'oracle':
+			import oracledb
+		else:
+			import asyncpg
+
+	async def close(self) -> None:
+		"""
+		Close the shared pool for this event loop, if pooled
+		"""
+
+		task = _ASYNC_POOLS.pop(self._poolKey(), None)
+
+		if task != None:
+			pool = await task
+
+			if self.flavor == 'oracle':
+				await pool.close(force=True)
+			else:
+				await pool.close()
+
+
+	def _poolKey(self) -> tuple:
+		import asyncio
+
+		return (id(asyncio.get_running_loop()), self.flavor, tuple(sorted(self.details.items())))
+
+	async def _pool(self):
+		import asyncio
+
+		# Create the pool once per event loop, even if many coroutines ask at the same time
+		key = self._poolKey()
+
+		if key not in _ASYNC_POOLS:
+			_ASYNC_POOLS[key] = asyncio.ensure_future(self._createPool())
+
+		return await _ASYNC_POOLS[key]
+
+	async def _createPool(self):
+		options = self.poolOptions
+
+		match self.flavor:
+			case 'oracle':
+				import oracledb
+				return oracledb.create_pool_async(
+					user= self.details['DB_USER'],
+					password= self.details['DB_PASSWORD'],
+					dsn= self.details['DB_DSN'],
+					min= options['minSize'],
+					max= options['maxSize'],
+					increment= 1,
+					ping_interval= options['pingInterval'],
+					timeout= options['idleTimeout'],
+					wait_timeout= options['acquireTimeout'] * 1000,
+					getmode= oracledb.POOL_GETMODE_TIMEDWAIT
+				)
+
+			case 'postgres':
+				import asyncpg
+				return await asyncpg.create_pool(
+					user= self.details['DB_USER'],
+					password= self.details['DB_PASSWORD'],
+					database= self.details['DB_NAME'],
+					host= self.details['DB_HOST'],
+					port= self.details['DB_PORT'],
+					min_size= options['minSize'],
+					max_size= options['maxSize'],
+					max_inactive_connection_lifetime= options['idleTimeout']
+				)
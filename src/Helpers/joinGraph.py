@@ -0,0 +1,136 @@
+import re
+from collections import deque
+
+
+# Matches the referenced table in "FOREIGN KEY REFERENCES orders(id)" or "FOREIGN KEY (order_id) REFERENCES public.orders(id)"
+REFERENCE = re.compile(r'REFERENCES\s+([\w$#."]+)', re.IGNORECASE)
+
+
+class JoinGraph:
+	def __init__(self, settings: dict) -> None:
+		"""
+		Undirected graph of tables joined by foreign keys, built from the 'Constraints' and 'Foreign_Reference' entries of settings
+
+		Args:
+			settings (dict): Settings dictionary
+		"""
+
+		# Referenced names may differ in case, quoting or schema prefix from the table names in settings
+		names = {table['Name'].lower(): table['Name'] for table in settings['Tables']}
+
+		self.edges = {table['Name']: set() for table in settings['Tables']}
+
+		for table in settings['Tables']:
+			for column in table.get('Layout', []):
+				properties = column.get('Properties', {})
+				references = [match.group(1) for constraint in properties.get('Constraints', []) for match in REFERENCE.finditer(constraint)]
+
+				if properties.get('Foreign_Reference'):
+					references.append(re.split(r'[(\s]', properties['Foreign_Reference'].strip())[0])
+
+				for reference in references:
+					target = names.get(reference.replace('"', '').split('.')[-1].lower())
+
+					if target == None and '.' in reference:
+						# "TABLE.COLUMN" style reference
+						target = names.get(reference.replace('"', '').split('.')[-2].lower())
+
+					if target != None and target != table['Name']:
+						self.edges[table['Name']].add(target)
+						self.edges[target].add(table['Name'])
+
+	@classmethod
+	def fromCatalog(cls, catalog) -> 'JoinGraph':
+		"""
+		Build from the foreign keys a SchemaCatalog or CompiledSettings already resolved, without reading any table layout
+
+		Args:
+			catalog (SchemaCatalog | CompiledSettings): Catalog of the settings
+		"""
+
+		graph = cls.__new__(cls)
+		graph.edges = {name: set() for name in catalog.names()}
+
+		for name in catalog.names():
+			for column, target in catalog.references(name):
+				graph.edges[name].add(target)
+				graph.edges[target].add(name)
+
+		return graph
+
+
+	def connect(self, tables: list[str]) -> list[str]:
+		"""
+		Expand tables with the bridge tables on the shortest join paths between them
+
+		Returns the requested tables, in order, followed by any bridge tables. Tables that cannot be joined are kept as they are.
+
+		Args:
+			tables (list[str]): Names of tables that need to be joined
+		"""
+
+		terminals = [table for table in dict.fromkeys(tables) if table in self.edges]
+
+		if len(terminals) < 2:
+			return list(tables)
+
+		# Grow a tree from the first table, each time adding the shortest path to the nearest table still unconnected
+		tree = {terminals[0]}
+		bridges = []
+		remaining = set(terminals[1:])
+
+		while remaining:
+			path = self._nearest(tree, remaining)
+
+			if path == None:
+				break
+
+			for table in path:
+				if table not in tree:
+					tree.add(table)
+
+					if table not in remaining:
+						bridges.append(table)
+
+			remaining.discard(path[-1])
+
+		return list(tables) + [table for table in bridges if table not in tables]
+
+	def path(self, start: str, end: str) -> list[str] | None:
+		"""
+		Shortest join path between two tables, or None if they cannot be joined
+
+		Args:
+			start (str): Name of first table
+			end (str): Name of second table
+		"""
+
+		if start not in self.edges or end not in self.edges:
+			return None
+
+		return self._nearest({start}, {end})
+
+
+	def _nearest(self, sources: set[str], targets: set[str]) -> list[str] | None:
+		# Breadth first search from every source at once, stopping at the first target reached
+		parents = {source: None for source in sources}
+		queue = deque(sources)
+
+		while queue:
+			table = queue.popleft()
+
+			if table in targets:
+				path = []
+
+				while table != None:
+					path.append(table)
+					table = parents[table]
+
+				return path[::-1]
+
+			for neighbour in self.edges[table]:
+				if neighbour not in parents:
+					parents[neighbour] = table
+					queue.append(neighbour)
+
+		return None
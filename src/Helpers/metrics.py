@@ -0,0 +1,285 @@
+import itertools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+# Span currently open in this thread or task, so new spans know their parent
+_CURRENT = ContextVar('smartsqlSpan', default=None)
+
+_IDS = itertools.count(1)
+
+# Span attributes that are also added up into counters
+COUNTED = ('promptTokens', 'completionTokens', 'rows')
+
+
+class Histogram:
+	def __init__(self, growth: float = 2 ** 0.25, smallest: float = 1e-6) -> None:
+		"""
+		Distribution of durations in log-scale buckets, so percentiles cost constant memory however many values are added
+
+		Percentiles are accurate to within one bucket (about 19% with the default growth).
+
+		Args:
+			growth (float): Ratio between the bounds of neighbouring buckets
+			smallest (float): Upper bound of the first bucket, in seconds
+		"""
+
+		self.growth = growth
+		self.smallest = smallest
+		self.buckets = {}
+		self.count = 0
+		self.total = 0.0
+		self.max = 0.0
+
+
+	def add(self, value: float) -> None:
+		"""
+		Add one value
+
+		Args:
+			value (float): Value to add
+		"""
+
+		bucket = max(0, math.ceil(math.log(max(value, self.smallest) / self.smallest, self.growth)))
+
+		self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+		self.count += 1
+		self.total += value
+		self.max = max(self.max, value)
+
+	def percentile(self, percent: float) -> float:
+		"""
+		Upper bound of the bucket holding the given percentile, or 0 if empty
+
+		Args:
+			percent (float): Percentile, from 0 to 100
+		"""
+
+		rank = math.ceil(self.count * percent / 100)
+		seen = 0
+
+		for bucket in sorted(self.buckets):
+			seen += self.buckets[bucket]
+
+			if seen >= rank:
+				return min(self.max, self.smallest * self.growth ** bucket)
+
+		return 0.0
+
+	def summary(self) -> dict:
+		"""
+		Count, total, mean, p50, p90, p99 and max
+		"""
+
+		return {
+			'count': self.count,
+			'total': self.total,
+			'mean': self.total / self.count if self.count else 0.0,
+			'p50': self.percentile(50),
+			'p90': self.percentile(90),
+			'p99': self.percentile(99),
+			'max': self.max
+		}
+
+
+class Metrics:
+	def __init__(self, exporter: 'SpanExporter' = None) -> None:
+		"""
+		Times each stage of a request (prompt building, AI request, connecting, executing, fetching) and counts tokens and rows
+
+		Every finished span is added to a histogram for its stage, passed to each hook and sent to the exporter, if any.
+		A span is a dictionary: `{'id': int, 'parent': int, 'name': str, 'start': int, 'seconds': float, 'attributes': dict}`,
+		where 'start' is in nanoseconds since the epoch and 'parent' is the id of the span it ran inside (or None).
+
+		Args:
+			exporter (SpanExporter): Where to send finished spans, e.g. an OpenTelemetryExporter (Optional)
+		"""
+
+		self.exporter = exporter
+		self.hooks = []
+
+		self._lock = threading.Lock()
+		self._histograms = {}
+		self._counters = {}
+
+
+	@contextmanager
+	def span(self, name: str, **attributes):
+		"""
+		Context manager timing a stage. Yields the span, whose 'attributes' can be added to before it ends
+
+		Example:
+			```
+			with metrics.span('fetch') as span:
+				rows = cursor.fetchall()
+				span['attributes']['rows'] = len(rows)
+			```
+
+		Args:
+			name (str): Name of stage
+			**attributes: Details to attach to the span
+		"""
+
+		span = self._open(name, attributes)
+		token = _CURRENT.set(span)
+		start = time.perf_counter()
+
+		try:
+			yield span
+		except Exception as e:
+			span['attributes']['error'] = type(e).__name__
+			raise
+		finally:
+			span['seconds'] = time.perf_counter() - start
+			_CURRENT.reset(token)
+			self._finish(span)
+
+	def record(self, name: str, seconds: float, **attributes) -> None:
+		"""
+		Add a span that has already finished, e.g. one timed across the yields of a generator
+
+		Args:
+			name (str): Name of stage
+			seconds (float): Duration
+			**attributes: Details to attach to the span
+		"""
+
+		span = self._open(name, attributes)
+		span['start'] -= int(seconds * 1e9)
+		span['seconds'] = seconds
+
+		self._finish(span)
+
+	def addHook(self, hook) -> None:
+		"""
+		Call a function with every finished span
+
+		Args:
+			hook (callable): Function taking the span dictionary
+		"""
+
+		self.hooks.append(hook)
+
+	def stats(self) -> dict:
+		"""
+		Get a summary of each stage's durations in seconds (count, total, mean, p50, p90, p99, max) and the counters
+		"""
+
+		with self._lock:
+			return {
+				'stages': {name: histogram.summary() for name, histogram in self._histograms.items()},
+				'counters': dict(self._counters)
+			}
+
+	def reset(self) -> None:
+		"""
+		Clear every histogram and counter
+		"""
+
+		with self._lock:
+			self._histograms = {}
+			self._counters = {}
+
+
+	def _open(self, name: str, attributes: dict) -> dict:
+		parent = _CURRENT.get()
+
+		return {
+			'id': next(_IDS),
+			'parent': parent['id'] if parent != None else None,
+			'name': name,
+			'start': time.time_ns(),
+			'seconds': None,
+			'attributes': attributes
+		}
+
+	def _finish(self, span: dict) -> None:
+		with self._lock:
+			self._histograms.setdefault(span['name'], Histogram()).add(span['seconds'])
+
+			for name in COUNTED:
+				if isinstance(span['attributes'].get(name), (int, float)):
+					self._counters[name] = self._counters.get(name, 0) + span['attributes'][name]
+
+		for hook in self.hooks:
+			hook(span)
+
+		if self.exporter != None:
+			self.exporter.export(span)
+
+
+class SpanExporter:
+	"""
+	Interface of what Metrics sends finished spans to
+	"""
+
+	def export(self, span: dict) -> None:
+		"""
+		Handle one finished span. Children finish, and so are exported, before their parent
+
+		Args:
+			span (dict): Finished span, see Metrics
+		"""
+
+		raise NotImplementedError
+
+
+class OpenTelemetryExporter(SpanExporter):
+	def __init__(self, tracer = None) -> None:
+		"""
+		Sends spans to OpenTelemetry, keeping each request's stages nested under it. Needs the opentelemetry-api package
+
+		Spans are buffered until their outermost span finishes, then created with their recorded start and end times.
+
+		Args:
+			tracer: OpenTelemetry tracer. Defaults to the global tracer provider's 'smartsql' tracer
+		"""
+
+		from opentelemetry import trace
+
+		self._trace = trace
+		self.tracer = tracer if tracer != None else trace.get_tracer('smartsql')
+
+		self._lock = threading.Lock()
+		self._children = {} # parent id -> finished child spans waiting for their outermost span
+
+
+	def export(self, span: dict) -> None:
+		with self._lock:
+			if span['parent'] != None:
+				self._children.setdefault(span['parent'], []).append(span)
+				return
+
+			# Outermost span finished, so take its whole tree
+			tree = self._take(span['id'])
+
+		self._emit(span, tree, None)
+
+
+	def _take(self, root: int) -> dict:
+		# Map of parent id to child spans for everything under root, removed from pending. Linear in the size of the tree
+		children = {}
+		ids = [root]
+
+		while ids:
+			spans = self._children.pop(ids.pop(), None)
+
+			if spans != None:
+				children[spans[0]['parent']] = spans
+				ids.extend(span['id'] for span in spans)
+
+		return children
+
+	def _emit(self, span: dict, children: dict, parent) -> None:
+		context = self._trace.set_span_in_context(parent) if parent != None else None
+		attributes = {key: value for key, value in span['attributes'].items() if isinstance(value, (str, bool, int, float))}
+
+		otelSpan = self.tracer.start_span(f"smartsql.{span['name']}", context=context, start_time=span['start'], attributes=attributes)
+
+		for child in sorted(children.get(span['id'], []), key=lambda child: child['start']):
+			self._emit(child, children, otelSpan)
+
+		otelSpan.end(end_time=span['start'] + int(span['seconds'] * 1e9))
@@ -0,0 +1,273 @@
+# NOTE: If using different database provider, please add its pool to this class as fit
+
+import threading
+import time
+
+
+# Pools shared by every Database/SmartSQL instance in the process, keyed by flavor and connection details
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+class ConnectionPool:
+	def __init__(self, connection: dict[str], flavor: str, minSize: int = 1, maxSize: int = 4, pingInterval: int = 60, idleTimeout: int = 300, acquireTimeout: int = 30) -> None:
+		"""
+		Pool of open database connections so that queries do not pay a full connect/authenticate handshake each time
+
+		Args:
+			connection (dict[str]): Dictionary of strings containing properties of database connection string (see Database)
+			flavor (str): Type of SQL - Currently only 'oracle' or 'postgres' supported
+			minSize (int): Number of connections kept open even when idle
+			maxSize (int): Maximum number of connections open at once. Callers wait for a free connection beyond this
+			pingInterval (int): Seconds a connection may sit idle before it is health checked on checkout
+			idleTimeout (int): Seconds an idle connection above minSize is kept before it is closed
+			acquireTimeout (int): Seconds to wait for a free connection before raising an error
+		"""
+
+		self.flavor = flavor
+		self.minSize = minSize
+		self.maxSize = maxSize
+		self.pingInterval = pingInterval
+		self.idleTimeout = idleTimeout
+		self.acquireTimeout = acquireTimeout
+
+		# Counters reported by stats()
+		self._lock = threading.Lock()
+		self._checkouts = 0
+		self._waitTime = 0.0
+		self._failedPings = 0
+		self._evicted = 0
+
+		match flavor:
+			case 'oracle':
+				import oracledb
+
+				# Native pool already pings stale connections on acquire and closes idle ones above min
+				self._pool = oracledb.create_pool(
+					user= connection['DB_USER'],
+					password= connection['DB_PASSWORD'],
+					dsn= connection['DB_DSN'],
+					min= minSize,
+					max= maxSize,
+					increment= 1,
+					ping_interval= pingInterval,
+					timeout= idleTimeout,
+					wait_timeout= acquireTimeout * 1000,
+					getmode= oracledb.POOL_GETMODE_TIMEDWAIT
+				)
+
+			case 'postgres':
+				from psycopg2.pool import ThreadedConnectionPool
+
+				self._pool = ThreadedConnectionPool(
+					minSize,
+					maxSize,
+					user= connection['DB_USER'],
+					password= connection['DB_PASSWORD'],
+					dbname= connection['DB_NAME'],
+					host= connection['DB_HOST'],
+					port= connection['DB_PORT']
+				)
+
+				# psycopg2 raises instead of waiting when exhausted, so gate checkouts on a semaphore
+				self._slots = threading.BoundedSemaphore(maxSize)
+
+				# Idle connections are kept here rather than handed back to psycopg2, which is only used to open and close
+				# them, so their ages and counts need none of its internals. Guarded by the lock
+				self._idle = {} # id -> (connection, idle since), oldest first
+				self._busy = 0
+
+				now = time.monotonic()
+
+				for _ in range(minSize):
+					connection = self._pool.getconn()
+					self._idle[id(connection)] = (connection, now)
+
+			case _:
+				raise ValueError("Only 'oracle' and 'postgres' flavors available at the moment.")
+
+
+	def acquire(self):
+		"""
+		Check out a healthy connection from the pool, waiting if all are busy
+		"""
+
+		start = time.perf_counter()
+
+		if self.flavor == 'oracle':
+			connection = self._pool.acquire()
+		else:
+			connection = self._acquirePostgres()
+
+		with self._lock:
+			self._checkouts += 1
+			self._waitTime += time.perf_counter() - start
+
+		return connection
+
+	def release(self, connection) -> None:
+		"""
+		Return a connection to the pool. Uncommitted work is rolled back by the pool.
+
+		Args:
+			connection: Connection previously returned by acquire()
+		"""
+
+		if self.flavor == 'oracle':
+			self._pool.release(connection)
+			return
+
+		try:
+			with self._lock:
+				self._busy -= 1
+
+			if self._reset(connection):
+				with self._lock:
+					self._idle[id(connection)] = (connection, time.monotonic())
+			else:
+				self._pool.putconn(connection, close=True)
+		finally:
+			self._slots.release()
+
+		self._evictIdle()
+
+	def stats(self) -> dict:
+		"""
+		Get current pool usage and counters
+		"""
+
+		if self.flavor == 'oracle':
+			opened, busy = self._pool.opened, self._pool.busy
+
+		with self._lock:
+			if self.flavor == 'postgres':
+				opened, busy = self._busy + len(self._idle), self._busy
+
+			return {
+				'min': self.minSize,
+				'max': self.maxSize,
+				'opened': opened,
+				'busy': busy,
+				'idle': opened - busy,
+				'checkouts': self._checkouts,
+				'avgWait': self._waitTime / self._checkouts if self._checkouts else 0.0,
+				'failedPings': self._failedPings,
+				'evicted': self._evicted
+			}
+
+	def close(self) -> None:
+		"""
+		Close every connection held by the pool
+		"""
+
+		if self.flavor == 'oracle':
+			self._pool.close(force=True)
+		else:
+			self._pool.closeall()
+
+			with self._lock:
+				self._idle.clear()
+
+
+	def _acquirePostgres(self):
+		# Wait for a free slot instead of failing on an exhausted pool
+		if not self._slots.acquire(timeout=self.acquireTimeout):
+			raise RuntimeError(f"Timed out after {self.acquireTimeout}s waiting for a database connection.")
+
+		try:
+			while True:
+				# Most recently used first, so the oldest age out
+				with self._lock:
+					connection, idleSince = self._idle.popitem()[1] if self._idle else (None, None)
+
+				if connection == None:
+					connection = self._pool.getconn()
+
+				# Health check connections that are closed or have been idle for a while
+				if connection.closed == 0 and (idleSince == None or time.monotonic() - idleSince < self.pingInterval or self._ping(connection)):
+					with self._lock:
+						self._busy += 1
+
+					return connection
+
+				with self._lock:
+					self._failedPings += 1
+
+				self._pool.putconn(connection, close=True)
+
+		except Exception:
+			self._slots.release()
+			raise
+
+	def _ping(self, connection) -> bool:
+		try:
+			with connection.cursor() as cursor:
+				cursor.execute("SELECT 1")
+			connection.rollback()
+			return True
+		except Exception:
+			return False
+
+	def _reset(self, connection) -> bool:
+		# Roll back uncommitted work so the connection can be reused, False if it is closed or broken
+		if connection.closed != 0:
+			return False
+
+		try:
+			connection.rollback()
+			return True
+		except Exception:
+			return False
+
+	def _evictIdle(self) -> None:
+		# Close connections above minSize that have sat idle longer than idleTimeout
+		now = time.monotonic()
+		stale = []
+
+		with self._lock:
+			opened = self._busy + len(self._idle)
+
+			for key, (connection, idleSince) in list(self._idle.items()):
+				if opened <= self.minSize or now - idleSince <= self.idleTimeout:
+					break
+
+				del self._idle[key]
+				stale.append(connection)
+				opened -= 1
+				self._evicted += 1
+
+		for connection in stale:
+			self._pool.putconn(connection, close=True)
+
+
+def sharedPool(connection: dict[str], flavor: str, **options) -> ConnectionPool:
+	"""
+	Get the process-wide pool for the given connection details, creating it on first use
+
+	Options only take effect when the pool is first created.
+
+	Args:
+		connection (dict[str]): Dictionary of strings containing properties of database connection string
+		flavor (str): Type of SQL - Currently only 'oracle' or 'postgres' supported
+		**options: Any arguments to pass into ConnectionPool
+	"""
+
+	key = (flavor, tuple(sorted(connection.items())))
+
+	with _POOLS_LOCK:
+		if key not in _POOLS:
+			_POOLS[key] = ConnectionPool(connection, flavor, **options)
+
+		return _POOLS[key]
+
+
+def closePools() -> None:
+	"""
+	Close and forget every shared pool in the process
+	"""
+
+	with _POOLS_LOCK:
+		for pool in _POOLS.values():
+			pool.close()
+
+		_POOLS.clear()
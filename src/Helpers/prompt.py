@@ -1,13 +1,33 @@
-from openai import AzureOpenAI
+import contextvars
+import time
+
+from .backends import LLMBackend, AzureOpenAIBackend, openaiErrors
+from .balancer import BalancedBackend
+from .backlog import Backlog
+from .cache import ResponseCache
+from .metrics import Metrics
+from .rateLimit import RateLimitGate
+from .retry import RetryPolicy
+from .tokens import estimateTokens
+
+
+# Timing and tokens of the last prompt of each Prompter, kept per thread and asyncio task so concurrent callers each see their own
+_LAST_PROMPT = contextvars.ContextVar('smartsqlLastPrompt', default={})
 
 
 class Prompter:
-	def __init__(self, APIkeys: dict[str]) -> None:
+	def __init__(self, APIkeys: dict[str], cache: ResponseCache = None, backlog: Backlog = None, backend: LLMBackend = None, metrics: Metrics = None, retry: RetryPolicy = None, deployments: list[dict] = None) -> None:
 		"""
 		Helper class to manage prompting given API keys
 
 		Args:
 			APIkeys (dict[str]): Equivalent of .env in dictionary form, see README.md for more information/layout example
+			cache (ResponseCache): Cache of responses to check before prompting the AI (Optional)
+			backlog (Backlog): Backlog to record responses in. Defaults to one that keeps every schema change as text
+			backend (LLMBackend): What to send prompts to. Defaults to the Azure OpenAI deployment in APIkeys
+			metrics (Metrics): Where to record the time and tokens of each AI request (Optional)
+			retry (RetryPolicy): Timeout, retries and hedging of AI requests. Defaults to 2 retries with a 60 second timeout
+			deployments (list[dict]): Several Azure OpenAI deployments to spread prompts across, each with the same keys as APIkeys. Missing keys are taken from APIkeys (Optional)
 		
 		### Example Structure of `APIkeys`:
 
@@ -23,19 +43,23 @@ class Prompter:
 		```
 		"""
 
-		# Set up client
-		self.client = AzureOpenAI(
-			api_key= APIkeys['AZURE_OPENAI_API_KEY'],
-			api_version= APIkeys['AZURE_OPENAI_API_VERSION'],
-			azure_endpoint= APIkeys['AZURE_OPENAI_ENDPOINT']
-		)
+		# Set up backend
+		self.backend = backend if backend != None else self._createBackend(APIkeys, deployments)
+
+		self.deploymentName = self.backend.name
+
+		self.backlog = backlog if backlog != None else Backlog()
+
+		self.cache = cache
 
-		self.deploymentName = APIkeys['AZURE_OPENAI_DEPLOYMENT_NAME']
+		# Shared by every thread prompting through this instance
+		self.rateLimit = RateLimitGate()
+		self.retry = retry if retry != None else RetryPolicy()
 
-		self.backlog = []
+		self.metrics = metrics if metrics != None else Metrics()
 
 
-	def prompt(self, basePrompt: str, query: str, updateBacklog: bool = True, **kwargs) -> str:
+	def prompt(self, basePrompt: str, query: str, updateBacklog: bool = True, backlog: Backlog = None, **kwargs) -> str:
 		"""
 		Helper method to prompt the query to the AI model. Returns result as a string.
 
@@ -43,36 +67,249 @@ class Prompter:
 			basePrompt (str): System prompt
 			query (str): User prompt
 			updateBacklog (bool): If need to add record to backlog
+			backlog (Backlog): Backlog to add the record to instead of this instance's, e.g. a SmartSQL session's (Optional)
 			**kwargs: Any arguments needed to pass into .create() for AI
 		"""
 
-		# Prompt GPT
-		response = self.client.chat.completions.create(
-			model = self.deploymentName,
-			messages = [
-					{
-						"role": "system", 
-						"content": basePrompt,
-					},
-					{
-						"role": "user", 
-						"content": query
-					}
-				],
-			**kwargs
-		)
-
-		result = response.choices[0].message.content
+		# Check cache before prompting
+		key, result = self._lookup(basePrompt, query, kwargs)
+
+		if result == None:
+			start = time.perf_counter()
+
+			# Prompt GPT
+			with self.metrics.span('llm', deployment=self.deploymentName, cached=False) as span:
+				response = self._create(basePrompt, query, **kwargs)
+				result = response['text']
+
+				usage = self._usage(response, basePrompt, query, result)
+				span['attributes'].update(usage)
+
+			self._store(key, result, start)
+			self._record({'timeToFirstToken': None, 'total': time.perf_counter() - start, 'cached': False}, usage)
+		else:
+			self.metrics.record('llm', 0.0, deployment=self.deploymentName, cached=True)
+			self._record({'timeToFirstToken': None, 'total': 0.0, 'cached': True}, {})
 
 		# Update backlog
 		if updateBacklog:
-			self.backlog.append(result)
+			(backlog if backlog != None else self.backlog).append(result)
 
 		return result
-	
+
+	@property
+	def timing(self) -> dict:
+		"""
+		Seconds taken by the last prompt made in this thread or asyncio task: `{'timeToFirstToken': float, 'total': float, 'cached': bool}`
+		"""
+
+		return _LAST_PROMPT.get().get(id(self), ({}, {}))[0]
+
+	@property
+	def usage(self) -> dict:
+		"""
+		Tokens used by the last prompt made in this thread or asyncio task: `{'promptTokens': int, 'completionTokens': int}`
+		"""
+
+		return _LAST_PROMPT.get().get(id(self), ({}, {}))[1]
+
+	def promptStream(self, basePrompt: str, query: str, updateBacklog: bool = True, backlog: Backlog = None, **kwargs):
+		"""
+		Same as prompt(), but a generator yielding the response text as the AI writes it
+
+		Once the generator is exhausted, the full response is cached and added to the backlog, and .timing holds the
+		time to first token and total generation time in seconds (for the thread or task that iterated it).
+
+		Args:
+			basePrompt (str): System prompt
+			query (str): User prompt
+			updateBacklog (bool): If need to add record to backlog
+			backlog (Backlog): Backlog to add the record to instead of this instance's, e.g. a SmartSQL session's (Optional)
+			**kwargs: Any arguments needed to pass into .create() for AI
+		"""
+
+		# Check cache before prompting
+		key, result = self._lookup(basePrompt, query, kwargs)
+
+		if result != None:
+			self.metrics.record('llm', 0.0, deployment=self.deploymentName, cached=True)
+			self._record({'timeToFirstToken': 0.0, 'total': 0.0, 'cached': True}, {})
+			yield result
+
+		else:
+			start = time.perf_counter()
+			firstToken = None
+			pieces = []
+
+			# Prompt GPT, yielding tokens as they arrive
+			response = self._create(basePrompt, query, stream=True, **kwargs)
+
+			for piece in response['pieces']:
+				if firstToken == None:
+					firstToken = time.perf_counter() - start
+
+				pieces.append(piece)
+				yield piece
+
+			result = ''.join(pieces)
+
+			self._store(key, result, start)
+			total = time.perf_counter() - start
+			usage = self._usage(response, basePrompt, query, result)
+			self._record({'timeToFirstToken': firstToken, 'total': total, 'cached': False}, usage)
+
+			# Timed across yields, so recorded once finished rather than as an open span
+			self.metrics.record('llm', total, deployment=self.deploymentName, cached=False, timeToFirstToken=firstToken, **usage)
+
+		# Update backlog
+		if updateBacklog:
+			(backlog if backlog != None else self.backlog).append(result)
+
 	def clearBacklog(self) -> None:
 		"""
-		Clear backlog list
+		Clear backlog
 		"""
 
-		self.backlog = []
+		self.backlog.clear()
+
+
+	def _createBackend(self, APIkeys: dict[str], deployments: list[dict] = None) -> LLMBackend:
+		if deployments:
+			return BalancedBackend([AzureOpenAIBackend({**APIkeys, **deployment}) for deployment in deployments])
+
+		return AzureOpenAIBackend(APIkeys)
+
+	def _create(self, basePrompt: str, query: str, stream: bool = False, **kwargs) -> dict:
+		messages = self._messages(basePrompt, query)
+
+		if self.retry.timeout != None:
+			kwargs.setdefault('timeout', self.retry.timeout)
+
+		def send() -> dict:
+			# Hold back while the quota is used up
+			self.rateLimit.wait()
+
+			try:
+				if stream:
+					response = self.backend.stream(messages, **kwargs)
+				else:
+					response = self.backend.complete(messages, **kwargs)
+			except openaiErrors('RateLimitError') as e:
+				self.rateLimit.update(e.response.headers, throttled=True)
+				raise
+
+			self.rateLimit.update(response['headers'])
+
+			return response
+
+		# Streams are only retried until they start, and never hedged
+		return self.retry.call(send, hedge=not stream)
+
+	def _messages(self, basePrompt: str, query: str) -> list[dict]:
+		return [
+			{
+				"role": "system", 
+				"content": basePrompt,
+			},
+			{
+				"role": "user", 
+				"content": query
+			}
+		]
+
+	def _record(self, timing: dict, usage: dict) -> None:
+		# Replaced rather than changed, as other contexts may hold the same dictionary
+		_LAST_PROMPT.set({**_LAST_PROMPT.get(), id(self): (timing, usage)})
+
+	def _usage(self, response: dict, basePrompt: str, query: str, result: str) -> dict:
+		# Tokens reported by the backend, otherwise estimated
+		if response.get('usage'):
+			return dict(response['usage'])
+
+		return {'promptTokens': estimateTokens(basePrompt) + estimateTokens(query), 'completionTokens': estimateTokens(result), 'estimated': True}
+
+	def _lookup(self, basePrompt: str, query: str, kwargs: dict) -> tuple[str, str]:
+		# Cache key and cached response, if any
+		if not self.cache:
+			return None, None
+
+		key = self.cache.key(query, basePrompt, self.deploymentName, **kwargs)
+
+		return key, self.cache.get(key)
+
+	def _store(self, key: str, result: str, start: float) -> None:
+		if self.cache:
+			self.cache.put(key, result, time.perf_counter() - start)
+
+
+class AsyncPrompter(Prompter):
+	"""
+	Prompter using the backend's completeAsync() (the asynchronous Azure OpenAI client by default), so many prompts can wait on the AI at once from one event loop
+
+	Takes the same arguments as Prompter.
+	"""
+
+	async def prompt(self, basePrompt: str, query: str, updateBacklog: bool = True, backlog: Backlog = None, **kwargs) -> str:
+		"""
+		Helper method to prompt the query to the AI model. Returns result as a string.
+
+		Args:
+			basePrompt (str): System prompt
+			query (str): User prompt
+			updateBacklog (bool): If need to add record to backlog
+			backlog (Backlog): Backlog to add the record to instead of this instance's, e.g. a SmartSQL session's (Optional)
+			**kwargs: Any arguments needed to pass into .create() for AI
+		"""
+
+		import asyncio
+
+		# Check cache before prompting
+		key, result = self._lookup(basePrompt, query, kwargs)
+
+		if result == None:
+			start = time.perf_counter()
+			messages = self._messages(basePrompt, query)
+
+			if self.retry.timeout != None:
+				kwargs.setdefault('timeout', self.retry.timeout)
+
+			async def send() -> dict:
+				# Hold back while the quota is used up
+				await asyncio.sleep(self.rateLimit.delay())
+
+				try:
+					response = await self.backend.completeAsync(messages, **kwargs)
+				except openaiErrors('RateLimitError') as e:
+					self.rateLimit.update(e.response.headers, throttled=True)
+					raise
+
+				self.rateLimit.update(response['headers'])
+
+				return response
+
+			# Prompt GPT
+			with self.metrics.span('llm', deployment=self.deploymentName, cached=False) as span:
+				response = await self.retry.callAsync(send)
+				result = response['text']
+
+				usage = self._usage(response, basePrompt, query, result)
+				span['attributes'].update(usage)
+
+			self._store(key, result, start)
+			self._record({'timeToFirstToken': None, 'total': time.perf_counter() - start, 'cached': False}, usage)
+		else:
+			self.metrics.record('llm', 0.0, deployment=self.deploymentName, cached=True)
+			self._record({'timeToFirstToken': None, 'total': 0.0, 'cached': True}, {})
+
+		# Update backlog
+		if updateBacklog:
+			(backlog if backlog != None else self.backlog).append(result)
+
+		return result
+
+
+	def _createBackend(self, APIkeys: dict[str], deployments: list[dict] = None) -> LLMBackend:
+		if deployments:
+			return BalancedBackend([AzureOpenAIBackend({**APIkeys, **deployment}, asynchronous=True) for deployment in deployments])
+
+		return AzureOpenAIBackend(APIkeys, asynchronous=True)
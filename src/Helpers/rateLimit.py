@@ -0,0 +1,115 @@
+import re
+import threading
+import time
+
+
+class RateLimitGate:
+	def __init__(self) -> None:
+		"""
+		Holds back AI requests while Azure reports the deployment's quota is used up
+
+		Fed with the headers of every response (x-ratelimit-remaining-*, x-ratelimit-reset-*, retry-after), so every
+		thread sharing the Prompter pauses together instead of each hitting 429 errors.
+		"""
+
+		self._until = 0.0
+		self._lock = threading.Lock()
+
+		# Counters reported by stats()
+		self._throttled = 0
+		self._waits = 0
+		self._waited = 0.0
+
+
+	def wait(self) -> float:
+		"""
+		Block until requests are allowed again, returning the seconds waited
+		"""
+
+		delay = self.delay()
+
+		if delay > 0:
+			time.sleep(delay)
+
+			with self._lock:
+				self._waits += 1
+				self._waited += delay
+
+		return delay
+
+	def delay(self) -> float:
+		"""
+		Seconds until requests are allowed again
+		"""
+
+		return max(0.0, self._until - time.monotonic())
+
+	def update(self, headers, throttled: bool = False) -> None:
+		"""
+		Read rate limit headers from a response
+
+		Args:
+			headers: Response headers (case-insensitive mapping)
+			throttled (bool): Whether the response was a 429 rate limit error
+		"""
+
+		if headers == None:
+			headers = {}
+
+		pause = 0.0
+
+		# Explicit back off from a 429
+		retryAfter = headers.get('retry-after-ms')
+
+		if retryAfter != None:
+			pause = float(retryAfter) / 1000
+		elif headers.get('retry-after') != None:
+			pause = parseDuration(headers.get('retry-after'))
+
+		# Quota exhausted: wait for the matching window to reset
+		for kind in ('requests', 'tokens'):
+			remaining = headers.get(f'x-ratelimit-remaining-{kind}')
+
+			if remaining != None and remaining.strip() == '0':
+				pause = max(pause, parseDuration(headers.get(f'x-ratelimit-reset-{kind}', '1s')))
+
+		if throttled:
+			pause = max(pause, 1.0)
+
+		with self._lock:
+			if throttled:
+				self._throttled += 1
+
+			self._until = max(self._until, time.monotonic() + pause)
+
+	def stats(self) -> dict:
+		"""
+		Get counters of rate limiting
+		"""
+
+		with self._lock:
+			return {
+				'throttled': self._throttled,
+				'waits': self._waits,
+				'waitedSeconds': self._waited
+			}
+
+
+def parseDuration(value: str) -> float:
+	"""
+	Parse a header duration such as '20', '1.5s', '120ms' or '6m0s' into seconds
+
+	Args:
+		value (str): Header value
+	"""
+
+	value = str(value).strip()
+
+	try:
+		return float(value)
+	except ValueError:
+		pass
+
+	units = {'h': 3600, 'm': 60, 's': 1, 'ms': 0.001}
+
+	return sum(float(amount) * units[unit] for amount, unit in re.findall(r'([\d.]+)(ms|h|m|s)', value))
@@ -0,0 +1,235 @@
+import random
+import threading
+import time
+
+from .backends import openaiErrors
+from .metrics import Histogram
+from .rateLimit import parseDuration
+
+
+# openai errors worth trying again: throttling, timeouts, dropped connections and 5xx responses (as well as TimeoutError)
+RETRYABLE = ('RateLimitError', 'APITimeoutError', 'APIConnectionError', 'InternalServerError')
+
+
+class RetryPolicy:
+	def __init__(self, retries: int = 2, timeout: float = 60.0, backoff: float = 0.5, maxBackoff: float = 30.0, hedgeAfter: float = None, hedgePercentile: float = None, minSamples: int = 20, retryOn: tuple = None) -> None:
+		"""
+		How AI requests are timed out, retried and hedged
+
+		Failed attempts are retried after an exponential backoff with full jitter, waiting at least as long as any Retry-After
+		header asks. With hedging, a duplicate request is sent if the first has not answered after `hedgeAfter` seconds (or
+		the `hedgePercentile` of recent latencies, once `minSamples` are known) and whichever answers first is used.
+
+		Args:
+			retries (int): Attempts after the first
+			timeout (float): Seconds each attempt may take, passed to the backend as `timeout`. If None, the backend's default
+			backoff (float): Seconds of the first backoff, doubling each retry
+			maxBackoff (float): Longest backoff in seconds
+			hedgeAfter (float): Seconds before sending a duplicate request. Used until enough latencies are known for hedgePercentile (Optional)
+			hedgePercentile (float): Latency percentile, from 0 to 100, after which to send a duplicate request (Optional)
+			minSamples (int): Latencies needed before hedgePercentile is used
+			retryOn (tuple): Exception classes to retry. Defaults to TimeoutError and the openai errors in RETRYABLE
+		"""
+
+		self.retries = retries
+		self.timeout = timeout
+		self.backoff = backoff
+		self.maxBackoff = maxBackoff
+		self.hedgeAfter = hedgeAfter
+		self.hedgePercentile = hedgePercentile
+		self.minSamples = minSamples
+		self.retryOn = retryOn
+
+		self.latencies = Histogram()
+
+		# Counters reported by stats()
+		self._lock = threading.Lock()
+		self._counts = {'attempts': 0, 'retries': 0, 'timeouts': 0, 'hedges': 0, 'hedgeWins': 0}
+		self._executor = None
+
+
+	def call(self, send, hedge: bool = True):
+		"""
+		Call send() until it succeeds or retries run out, hedging slow attempts if enabled
+
+		Args:
+			send (callable): Makes one attempt, returning its result
+			hedge (bool): Whether the attempt may be duplicated (not for streams)
+		"""
+
+		for attempt in range(self.retries + 1):
+			try:
+				return self._hedged(send) if hedge else self._timed(send)
+			except self._retryable() as e:
+				self._failed(e)
+
+				if attempt == self.retries:
+					raise
+
+				time.sleep(self.delay(attempt, e))
+
+	async def callAsync(self, send):
+		"""
+		Asynchronous call(), for a coroutine function. Losing hedged attempts are cancelled
+
+		Args:
+			send (callable): Coroutine function making one attempt, returning its result
+		"""
+
+		import asyncio
+
+		for attempt in range(self.retries + 1):
+			try:
+				return await self._hedgedAsync(send)
+			except self._retryable() as e:
+				self._failed(e)
+
+				if attempt == self.retries:
+					raise
+
+				await asyncio.sleep(self.delay(attempt, e))
+
+	def delay(self, attempt: int, error: Exception = None) -> float:
+		"""
+		Seconds to wait before a retry: a random backoff up to `backoff * 2 ** attempt`, but no less than any Retry-After
+
+		Args:
+			attempt (int): Number of the failed attempt, from 0
+			error (Exception): Error of the failed attempt (Optional)
+		"""
+
+		delay = random.uniform(0, min(self.maxBackoff, self.backoff * 2 ** attempt))
+
+		headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+
+		if headers.get('retry-after-ms') != None:
+			delay = max(delay, float(headers['retry-after-ms']) / 1000)
+		elif headers.get('retry-after') != None:
+			delay = max(delay, parseDuration(headers['retry-after']))
+
+		return delay
+
+	def hedgeDelay(self) -> float | None:
+		"""
+		Seconds before sending a duplicate request, or None if not hedging
+		"""
+
+		if self.hedgePercentile != None and self.latencies.count >= self.minSamples:
+			return self.latencies.percentile(self.hedgePercentile)
+
+		return self.hedgeAfter
+
+	def stats(self) -> dict:
+		"""
+		Get counters of attempts, retries, timeouts, hedged requests and hedged requests that answered first
+		"""
+
+		with self._lock:
+			return dict(self._counts)
+
+
+	def _count(self, name: str) -> None:
+		with self._lock:
+			self._counts[name] += 1
+
+	def _retryable(self) -> tuple:
+		# Looked up when needed, so openai is not imported for it
+		return self.retryOn if self.retryOn != None else openaiErrors(*RETRYABLE) + (TimeoutError,)
+
+	def _failed(self, error: Exception) -> None:
+		if isinstance(error, openaiErrors('APITimeoutError') + (TimeoutError,)):
+			self._count('timeouts')
+
+		self._count('retries')
+
+	def _timed(self, send):
+		self._count('attempts')
+		start = time.perf_counter()
+
+		result = send()
+
+		with self._lock:
+			self.latencies.add(time.perf_counter() - start)
+
+		return result
+
+	def _hedged(self, send):
+		from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+		delay = self.hedgeDelay()
+
+		if delay == None:
+			return self._timed(send)
+
+		with self._lock:
+			if self._executor == None:
+				self._executor = ThreadPoolExecutor(thread_name_prefix='smartsql-hedge')
+
+		first = self._executor.submit(self._timed, send)
+
+		if wait([first], timeout=delay).done:
+			return first.result()
+
+		# Too slow, so race a duplicate. The loser cannot be stopped and finishes in the background
+		self._count('hedges')
+		hedge = self._executor.submit(self._timed, send)
+		pending = {first, hedge}
+
+		while pending:
+			done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+			for future in done:
+				if future.exception() == None:
+					if future is hedge:
+						self._count('hedgeWins')
+
+					return future.result()
+
+				error = future.exception()
+
+		raise error
+
+	async def _hedgedAsync(self, send):
+		import asyncio
+
+		delay = self.hedgeDelay()
+
+		async def timed():
+			self._count('attempts')
+			start = time.perf_counter()
+
+			result = await send()
+
+			with self._lock:
+				self.latencies.add(time.perf_counter() - start)
+
+			return result
+
+		if delay == None:
+			return await timed()
+
+		first = asyncio.ensure_future(timed())
+
+		if (await asyncio.wait({first}, timeout=delay))[0]:
+			return first.result()
+
+		self._count('hedges')
+		hedge = asyncio.ensure_future(timed())
+		pending = {first, hedge}
+
+		while pending:
+			done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+			for task in done:
+				if task.exception() == None:
+					if task is hedge:
+						self._count('hedgeWins')
+
+					for other in pending:
+						other.cancel()
+
+					return task.result()
+
+				error = task.exception()
+
+		raise error
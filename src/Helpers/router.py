@@ -0,0 +1,186 @@
+import re
+import threading
+import time
+
+from .backends import LLMBackend
+from .metrics import Histogram
+from .schemaIndex import tokenize
+
+
+# Words that tend to need aggregation, windowing or several joins to answer
+COMPLEX_KEYWORDS = ('average', 'avg', 'median', 'percent', 'percentage', 'ratio', 'rate', 'rank', 'top', 'bottom', 'cumulative', 'running', 'rolling', 'trend', 'growth', 'compare', 'versus', 'vs', 'each', 'per', 'group', 'breakdown', 'pivot', 'distinct', 'unique', 'most', 'least', 'highest', 'lowest', 'never', 'without', 'except', 'both', 'either', 'over time', 'year over year', 'month over month', 'previous', 'consecutive', 'duplicate')
+
+ROUTES = ('fast', 'strong')
+
+
+class ModelRouter(LLMBackend):
+	def __init__(self, fast: LLMBackend, strong: LLMBackend, threshold: int = 3, wordsPerPoint: int = 15, keywords: tuple[str] = COMPLEX_KEYWORDS, escalate: bool = True) -> None:
+		"""
+		Sends simple requests to a small, fast model and harder ones to a larger model
+
+		Each request gets a complexity score from cheap local signals: a point for each table beyond the first that the
+		request names, a point per `wordsPerPoint` words of the request and a point per complex keyword found (such as
+		'average', 'per' or 'rank'). Requests scoring under `threshold` take the 'fast' route, the rest the 'strong' route.
+		SmartSQL asks the strong model again when SQL from the fast model fails to run.
+
+		Prompts sent without a route (such as cost guard rewrites) take the strong route.
+
+		Args:
+			fast (LLMBackend): Model for simple requests
+			strong (LLMBackend): Model for complex requests, and for fast ones that failed
+			threshold (int): Lowest score sent to the strong model
+			wordsPerPoint (int): Words of the request adding one point
+			keywords (tuple[str]): Words or phrases adding one point each
+			escalate (bool): Whether failed SQL from the fast model is generated again by the strong model
+		"""
+
+		self.routes = {'fast': fast, 'strong': strong}
+		self.threshold = threshold
+		self.wordsPerPoint = wordsPerPoint
+		self.keywords = keywords
+		self.escalate = escalate
+
+		# Cache keys also hold the route, so both models' answers can be cached side by side
+		self.name = f"{fast.name}/{strong.name}"
+
+		self._pattern = re.compile(r'\b(' + '|'.join(re.escape(keyword) for keyword in keywords) + r')\b', re.IGNORECASE)
+
+		# Per route counters, guarded by the lock
+		self._lock = threading.Lock()
+		self._latencies = {route: Histogram() for route in ROUTES}
+		self._counts = {route: {'requests': 0, 'successes': 0, 'failures': 0, 'escalations': 0} for route in ROUTES}
+
+
+	def score(self, query: str, tables: list[str] = None) -> int:
+		"""
+		Complexity score of a request
+
+		Args:
+			query (str): Natural language prompt of what the user wants the model to do
+			tables (list[str]): Names of the tables the request may use, counted if the request names them (Optional)
+		"""
+
+		terms = set(tokenize(query))
+		named = sum(1 for table in tables or [] if terms.issuperset(tokenize(table)))
+
+		score = max(0, named - 1)
+		score += len(query.split()) // self.wordsPerPoint
+		score += len({match.lower() for match in self._pattern.findall(query)})
+
+		return score
+
+	def classify(self, query: str, tables: list[str] = None) -> str:
+		"""
+		Route a request takes, 'fast' or 'strong'
+
+		Args:
+			query (str): Natural language prompt of what the user wants the model to do
+			tables (list[str]): Names of the tables the request may use, counted if the request names them (Optional)
+		"""
+
+		return 'fast' if self.score(query, tables) < self.threshold else 'strong'
+
+	def complete(self, messages: list[dict], route: str = None, **kwargs) -> dict:
+		route = self._route(route)
+		start = time.perf_counter()
+
+		response = self.routes[route].complete(messages, **kwargs)
+
+		self._answered(route, start)
+
+		return response
+
+	def stream(self, messages: list[dict], route: str = None, **kwargs) -> dict:
+		route = self._route(route)
+		start = time.perf_counter()
+
+		response = self.routes[route].stream(messages, **kwargs)
+
+		# Timed until every piece has arrived
+		def pieces(source=response['pieces']):
+			yield from source
+			self._answered(route, start)
+
+		return {**response, 'pieces': pieces()}
+
+	async def completeAsync(self, messages: list[dict], route: str = None, **kwargs) -> dict:
+		route = self._route(route)
+		start = time.perf_counter()
+
+		response = await self.routes[route].completeAsync(messages, **kwargs)
+
+		self._answered(route, start)
+
+		return response
+
+	def warmup(self) -> None:
+		for backend in self.routes.values():
+			backend.warmup()
+
+	def close(self) -> None:
+		for backend in self.routes.values():
+			backend.close()
+
+	async def closeAsync(self) -> None:
+		for backend in self.routes.values():
+			await backend.closeAsync()
+
+	def succeeded(self, route: str) -> None:
+		"""
+		Record that SQL from a route ran
+
+		Args:
+			route (str): Route the SQL came from
+		"""
+
+		with self._lock:
+			self._counts[route]['successes'] += 1
+
+	def failed(self, route: str) -> str | None:
+		"""
+		Record that SQL from a route failed to run, returning the route to try next (or None to give up)
+
+		Args:
+			route (str): Route the SQL came from
+		"""
+
+		with self._lock:
+			self._counts[route]['failures'] += 1
+
+			if route != 'fast' or not self.escalate:
+				return None
+
+			self._counts[route]['escalations'] += 1
+
+		return 'strong'
+
+	def stats(self) -> dict:
+		"""
+		Get each route's requests, SQL that ran, SQL that failed, escalations to the strong model, success rate and reply time summary in seconds
+		"""
+
+		with self._lock:
+			stats = {}
+
+			for route in ROUTES:
+				counts = self._counts[route]
+				finished = counts['successes'] + counts['failures']
+
+				stats[route] = {**counts, 'successRate': counts['successes'] / finished if finished else None, 'latency': self._latencies[route].summary()}
+
+			return stats
+
+
+	def _route(self, route: str) -> str:
+		if route == None:
+			return 'strong'
+
+		if route not in self.routes:
+			raise ValueError(f"Unknown route '{route}', expected one of {', '.join(ROUTES)}")
+
+		return route
+
+	def _answered(self, route: str, start: float) -> None:
+		with self._lock:
+			self._latencies[route].add(time.perf_counter() - start)
+			self._counts[route]['requests'] += 1
@@ -0,0 +1,276 @@
+import itertools
+import re
+from collections import namedtuple
+
+from .joinGraph import REFERENCE
+
+
+# Every catalog gets its own version, so caches can key on it
+_VERSIONS = itertools.count(1)
+
+# Keys of the settings layout, anything else is kept in a record's 'extra'
+TABLE_KEYS = frozenset(('Name', 'Description', 'Layout'))
+COLUMN_KEYS = frozenset(('Name', 'Type', 'Description', 'Properties'))
+PROPERTY_KEYS = frozenset(('isPrimaryKey', 'Foreign_Reference', 'Constraints'))
+
+
+class ColumnRecord(namedtuple('ColumnRecord', ('name', 'type', 'description', 'isPrimaryKey', 'foreignReference', 'constraints', 'extra'))):
+	"""
+	One column of a SchemaCatalog table. Immutable, with 'extra' holding any keys outside the usual layout (or None)
+	"""
+
+	__slots__ = ()
+
+	@classmethod
+	def fromDict(cls, column: dict) -> 'ColumnRecord':
+		"""
+		Build from an entry of a table's 'Layout' in the settings layout
+
+		Args:
+			column (dict): Column dictionary
+		"""
+
+		properties = column.get('Properties', {})
+		extra = None
+
+		# Keys outside the usual layout, kept so nothing is lost going back to a dictionary
+		if not COLUMN_KEYS.issuperset(column) or not PROPERTY_KEYS.issuperset(properties):
+			extra = {key: value for key, value in column.items() if key not in COLUMN_KEYS}
+			extraProperties = {key: value for key, value in properties.items() if key not in PROPERTY_KEYS}
+
+			if extraProperties:
+				extra['Properties'] = extraProperties
+
+		return cls(column['Name'], column.get('Type'), column.get('Description'), properties.get('isPrimaryKey', False), properties.get('Foreign_Reference'), tuple(properties.get('Constraints', ())), extra or None)
+
+	def toDict(self) -> dict:
+		"""
+		Get the column in the settings layout
+		"""
+
+		extra = dict(self.extra or {})
+		column = {'Name': self.name}
+
+		if self.type != None:
+			column['Type'] = self.type
+
+		if self.description != None:
+			column['Description'] = self.description
+
+		properties = {'isPrimaryKey': self.isPrimaryKey}
+
+		if self.foreignReference != None:
+			properties['Foreign_Reference'] = self.foreignReference
+
+		properties['Constraints'] = list(self.constraints)
+		column['Properties'] = {**properties, **extra.pop('Properties', {})}
+
+		return {**column, **extra}
+
+
+class TableRecord(namedtuple('TableRecord', ('name', 'description', 'columns', 'extra'))):
+	"""
+	One table of a SchemaCatalog. Immutable, with 'columns' a tuple of ColumnRecord and 'extra' as for ColumnRecord
+	"""
+
+	__slots__ = ()
+
+	@classmethod
+	def fromDict(cls, table: dict) -> 'TableRecord':
+		"""
+		Build from an entry of 'Tables' in the settings layout
+
+		Args:
+			table (dict): Table dictionary
+		"""
+
+		columns = tuple(ColumnRecord.fromDict(column) for column in table.get('Layout', []))
+		extra = {key: value for key, value in table.items() if key not in TABLE_KEYS} if not TABLE_KEYS.issuperset(table) else None
+
+		return cls(table['Name'], table.get('Description'), columns, extra)
+
+	def column(self, name: str) -> ColumnRecord | None:
+		"""
+		Get a column by name (case insensitive), or None if there is none
+
+		Args:
+			name (str): Name of column
+		"""
+
+		name = name.lower()
+
+		return next((column for column in self.columns if column.name.lower() == name), None)
+
+	def toDict(self) -> dict:
+		"""
+		Get the table in the settings layout
+		"""
+
+		table = {'Name': self.name}
+
+		if self.description != None:
+			table['Description'] = self.description
+
+		table['Layout'] = [column.toDict() for column in self.columns]
+
+		return {**table, **(self.extra or {})}
+
+
+class SchemaCatalog:
+	__slots__ = ('name', 'description', 'flavor', 'tables', 'version', 'extra', '_tables', '_names', '_columns', '_references', '_referencedBy')
+
+	def __init__(self, settings: dict) -> None:
+		"""
+		Immutable, indexed view of a settings dictionary, built once so lookups by table, column or foreign key take constant time
+
+		Tables and columns are compact, immutable records (named tuples with empty `__slots__`). Lookups by name are case
+		insensitive. Each catalog has its own `version`, so caches can key on it. `.toSettings()` gives back the settings
+		layout, e.g. for exportSettings().
+
+		Args:
+			settings (dict): Settings dictionary
+		"""
+
+		tables = tuple(TableRecord.fromDict(table) for table in settings['Tables'])
+		byName = {table.name.lower(): table for table in tables}
+
+		# Which tables have each column
+		columns = {}
+
+		for table in tables:
+			for column in table.columns:
+				columns.setdefault(column.name.lower(), []).append(table.name)
+
+		# Foreign keys, as (column, referenced table) by table, and (table, column) by referenced table
+		references = {}
+		referencedBy = {}
+
+		for table in tables:
+			for column in table.columns:
+				for target in _referencedTables(column, byName):
+					if target != table.name:
+						references.setdefault(table.name, []).append((column.name, target))
+						referencedBy.setdefault(target, []).append((table.name, column.name))
+
+		extra = {key: value for key, value in settings.items() if key not in ('Server_Name', 'Server_Description', 'SQL_Flavor', 'Tables')}
+
+		values = {
+			'name': settings.get('Server_Name'),
+			'description': settings.get('Server_Description'),
+			'flavor': settings.get('SQL_Flavor'),
+			'tables': tables,
+			'version': next(_VERSIONS),
+			'extra': extra or None,
+			'_tables': byName,
+			'_names': tuple(table.name for table in tables),
+			'_columns': {name: tuple(names) for name, names in columns.items()},
+			'_references': {name: tuple(pairs) for name, pairs in references.items()},
+			'_referencedBy': {name: tuple(pairs) for name, pairs in referencedBy.items()}
+		}
+
+		for name, value in values.items():
+			object.__setattr__(self, name, value)
+
+
+	def table(self, name: str) -> TableRecord:
+		"""
+		Get a table by name (case insensitive). Raises a KeyError if there is none
+
+		Args:
+			name (str): Name of table
+		"""
+
+		table = self._tables.get(name.lower())
+
+		if table == None:
+			raise KeyError(f"No table named '{name}'")
+
+		return table
+
+	def names(self) -> tuple[str]:
+		"""
+		Names of every table, in settings order
+		"""
+
+		return self._names
+
+	def tablesWithColumn(self, column: str) -> tuple[str]:
+		"""
+		Names of the tables that have a column (case insensitive)
+
+		Args:
+			column (str): Name of column
+		"""
+
+		return self._columns.get(column.lower(), ())
+
+	def references(self, table: str) -> tuple[tuple[str, str]]:
+		"""
+		Foreign keys of a table, as (column, referenced table) pairs
+
+		Args:
+			table (str): Name of table
+		"""
+
+		return self._references.get(self.table(table).name, ())
+
+	def referencedBy(self, table: str) -> tuple[tuple[str, str]]:
+		"""
+		Foreign keys referencing a table, as (table, column) pairs
+
+		Args:
+			table (str): Name of table
+		"""
+
+		return self._referencedBy.get(self.table(table).name, ())
+
+	def toSettings(self) -> dict:
+		"""
+		Get the catalog in the settings layout, as a new dictionary
+		"""
+
+		return {
+			'Server_Name': self.name,
+			'Server_Description': self.description,
+			'SQL_Flavor': self.flavor,
+			'Tables': [table.toDict() for table in self.tables],
+			**(self.extra or {})
+		}
+
+	def __setattr__(self, name: str, value) -> None:
+		raise AttributeError("SchemaCatalog is immutable")
+
+	def __delattr__(self, name: str) -> None:
+		raise AttributeError("SchemaCatalog is immutable")
+
+	def __contains__(self, name: str) -> bool:
+		return isinstance(name, str) and name.lower() in self._tables
+
+	def __iter__(self):
+		return iter(self.tables)
+
+	def __len__(self) -> int:
+		return len(self.tables)
+
+
+def _referencedTables(column: ColumnRecord, tables: dict) -> list[str]:
+	# Names of the tables a column references, resolved as JoinGraph does
+	references = [match.group(1) for constraint in column.constraints for match in REFERENCE.finditer(constraint)]
+
+	if column.foreignReference:
+		references.append(re.split(r'[(\s]', column.foreignReference.strip())[0])
+
+	targets = []
+
+	for reference in references:
+		parts = reference.replace('"', '').split('.')
+		target = tables.get(parts[-1].lower())
+
+		if target == None and len(parts) > 1:
+			# "TABLE.COLUMN" style reference
+			target = tables.get(parts[-2].lower())
+
+		if target != None:
+			targets.append(target.name)
+
+	return targets
@@ -0,0 +1,129 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+
+# Words that say nothing about which table a request needs
+STOPWORDS = {
+	'a', 'all', 'an', 'and', 'are', 'as', 'at', 'by', 'each', 'every', 'for', 'from', 'get', 'give', 'has', 'have',
+	'how', 'i', 'in', 'is', 'it', 'list', 'me', 'many', 'much', 'my', 'of', 'on', 'or', 'our', 'show', 'that', 'the',
+	'their', 'them', 'there', 'this', 'to', 'was', 'we', 'were', 'what', 'when', 'where', 'which', 'who', 'with'
+}
+
+
+def tokenize(text: str) -> list[str]:
+	"""
+	Split text or identifiers (snake_case, camelCase, UPPER_CASE) into lowercase search terms
+
+	Args:
+		text (str): Text to split
+	"""
+
+	terms = []
+
+	for word in re.findall(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+', text or ''):
+		word = word.lower()
+
+		if word in STOPWORDS:
+			continue
+
+		# Crude plural stemming so 'orders' matches 'ORDER_ID'
+		if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+			word = word[:-1]
+
+		terms.append(word)
+
+	return terms
+
+
+class SchemaIndex:
+	def __init__(self, settings: dict, k1: float = 1.5, b: float = 0.75) -> None:
+		"""
+		BM25 inverted index over the tables of a settings dictionary, used to find the tables relevant to a request
+
+		Table names weigh the most, then column names, then descriptions.
+
+		Args:
+			settings (dict): Settings dictionary
+			k1 (float): BM25 term frequency saturation
+			b (float): BM25 document length normalization
+		"""
+
+		self.k1 = k1
+		self.b = b
+
+		names = []
+		lengths = []
+		postings = defaultdict(list) # term -> [(table index, term frequency)]
+
+		for table in settings['Tables']:
+			terms = tokenize(table['Name']) * 3 + tokenize(table.get('Description', ''))
+
+			for column in table.get('Layout', []):
+				terms += tokenize(column['Name']) * 2 + tokenize(column.get('Description', ''))
+
+			for term, frequency in Counter(terms).items():
+				postings[term].append((len(names), frequency))
+
+			names.append(table['Name'])
+			lengths.append(len(terms))
+
+		self._load(names, lengths, postings)
+
+	@classmethod
+	def fromPostings(cls, names: list[str], lengths: list[int], postings: dict, k1: float = 1.5, b: float = 0.75) -> 'SchemaIndex':
+		"""
+		Rebuild an index from the names, lengths and postings of another, e.g. as stored by compileSettings(), without the settings
+
+		Args:
+			names (list[str]): Name of each table
+			lengths (list[int]): Number of terms of each table
+			postings (dict): (table index, term frequency) pairs of each term
+			k1 (float): BM25 term frequency saturation
+			b (float): BM25 document length normalization
+		"""
+
+		index = cls.__new__(cls)
+		index.k1 = k1
+		index.b = b
+		index._load(names, lengths, postings)
+
+		return index
+
+
+	def search(self, query: str, topK: int = 10) -> list[tuple[str, float]]:
+		"""
+		Rank tables by relevance to the query, returning up to topK (table name, score) pairs with a positive score
+
+		Args:
+			query (str): Natural language request
+			topK (int): Maximum number of tables to return
+		"""
+
+		scores = defaultdict(float)
+
+		for term in set(tokenize(query)):
+			idf = self.idf.get(term)
+
+			if idf == None:
+				continue
+
+			for doc, frequency in self.postings[term]:
+				norm = self.k1 * (1 - self.b + self.b * self.lengths[doc] / self.averageLength)
+				scores[doc] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+		ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:topK]
+
+		return [(self.names[doc], score) for doc, score in ranked]
+
+
+	def _load(self, names: list[str], lengths: list[int], postings: dict) -> None:
+		self.names = names
+		self.lengths = lengths
+		self.postings = postings
+
+		self.averageLength = sum(lengths) / len(lengths) if lengths else 0.0
+
+		# Inverse document frequency per term
+		count = len(names)
+		self.idf = {term: math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5)) for term, docs in postings.items()}
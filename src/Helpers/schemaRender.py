@@ -0,0 +1,137 @@
+import json
+
+from .compiledSettings import CompiledSettings
+from .tokens import estimateTokens
+
+
+class SchemaRenderer:
+	def __init__(self, settings: dict | CompiledSettings, style: str = 'compact', previous: 'SchemaRenderer' = None) -> None:
+		"""
+		Renders the tables of a settings dictionary for prompts, caching each table's text and token count
+
+		The 'compact' style describes each table in a few DDL-like lines, which costs far fewer tokens than indented JSON:
+
+		```
+		TABLE ORDERS -- Orders placed
+		  ORDER_ID NUMBER PRIMARY KEY NOT NULL
+		  CUSTOMER_ID NUMBER FOREIGN KEY REFERENCES CUSTOMERS(CUSTOMER_ID) -- Who placed it
+		```
+
+		A table is rendered the first time it is asked for. With compiled settings, that is also when it is decoded.
+
+		Args:
+			settings (dict | CompiledSettings): Settings dictionary or compiled settings
+			style (str): 'compact' or 'json' (the original indented JSON layout)
+			previous (SchemaRenderer): Renderer of earlier settings whose text is reused for table dictionaries that are unchanged (Optional)
+		"""
+
+		if style not in ('compact', 'json'):
+			raise ValueError("Only 'compact' and 'json' schema styles available at the moment.")
+
+		self.settings = settings
+		self.style = style
+
+		# Tells the AI how to read the compact layout
+		self.legend = "Each table is written as 'TABLE name -- description' followed by one indented 'column type constraints -- description' line per column.\n" if style == 'compact' else ''
+
+		# Table dictionaries by name. None for compiled settings, which decode a table when it is first rendered
+		self.tables = {table['Name']: table for table in settings['Tables']} if isinstance(settings, dict) else None
+		self.names = tuple(self.tables) if self.tables != None else settings.names()
+		self.fragments = {}
+		self.tokenCounts = {}
+
+		# Reuse text already rendered for tables that are the very same dictionary as before
+		if previous != None and previous.style == style and previous.tables != None and self.tables != None:
+			for name, fragment in list(previous.fragments.items()):
+				if previous.tables.get(name) is self.tables.get(name, False):
+					self.tokenCounts[name] = previous.tokenCounts[name]
+					self.fragments[name] = fragment
+
+		self._full = None
+
+
+	def render(self, tables: list[str]) -> str:
+		"""
+		Get the cached text for the given tables
+
+		Args:
+			tables (list[str]): Names of tables
+		"""
+
+		return '\n\n'.join(self.fragment(table) for table in tables)
+
+	def renderAll(self) -> str:
+		"""
+		Get the cached text for the full database
+		"""
+
+		if self._full == None:
+			if self.style == 'json':
+				self._full = json.dumps(self.settings if self.tables != None else self.settings.toSettings(), indent='\t')
+			else:
+				self._full = self.render(self.names)
+
+		return self._full
+
+	def fragment(self, name: str) -> str:
+		"""
+		Get the text for one table, rendering it on first use. Raises a KeyError if there is no such table
+
+		Args:
+			name (str): Name of table, as written in settings
+		"""
+
+		fragment = self.fragments.get(name)
+
+		if fragment == None:
+			table = self.tables[name] if self.tables != None else self.settings.toSettings([name])['Tables'][0]
+			fragment = self._renderTable(table)
+
+			# Count first, so a fragment is never seen without its count
+			self.tokenCounts[name] = estimateTokens(fragment)
+			self.fragments[name] = fragment
+
+		return fragment
+
+	def tokens(self, tables: list[str] = None) -> int:
+		"""
+		Estimated tokens of the text for the given tables
+
+		Args:
+			tables (list[str]): Names of tables. If None, the full database
+		"""
+
+		tables = self.names if tables == None else tables
+
+		for table in tables:
+			self.fragment(table)
+
+		return sum(self.tokenCounts[table] for table in tables)
+
+
+	def _renderTable(self, table: dict) -> str:
+		if self.style == 'json':
+			return json.dumps(table, indent='\t')
+
+		lines = [self._withDescription(f"TABLE {table['Name']}", table.get('Description'))]
+
+		for column in table.get('Layout', []):
+			properties = column.get('Properties', {})
+			constraints = list(properties.get('Constraints', []))
+
+			if properties.get('isPrimaryKey'):
+				constraints.insert(0, 'PRIMARY KEY')
+
+			# Oracle lists NOT NULL columns a second time as system CHECK constraints
+			if 'NOT NULL' in constraints:
+				constraints = [constraint for constraint in constraints if not (constraint.startswith('CHECK') and constraint.rstrip(')').endswith('IS NOT NULL'))]
+
+			if properties.get('Foreign_Reference'):
+				constraints.append(f"REFERENCES {properties['Foreign_Reference']}")
+
+			lines.append(self._withDescription(f"  {' '.join([column['Name'], str(column.get('Type', ''))] + constraints)}", column.get('Description')))
+
+		return '\n'.join(lines)
+
+	def _withDescription(self, line: str, description: str) -> str:
+		return f"{line} -- {description}" if description else line
@@ -0,0 +1,207 @@
+import re
+import threading
+from collections import OrderedDict
+
+
+# Literals in a request: quoted text, dates and numbers
+REQUEST_LITERAL = re.compile(r"(?<!\w)'([^']*)'(?!\w)|\"([^\"]*)\"|(?<![\w.-])(\d{4}-\d{2}-\d{2}|\d+(?:\.\d+)?)(?![\w.])")
+
+# Literals in SQL: quoted text and numbers. Quoted identifiers are matched only so they are skipped
+SQL_LITERAL = re.compile(r"\"(?:[^\"]|\"\")*\"|'((?:[^']|'')*)'|(?<![\w.:$])(\d+(?:\.\d+)?)(?![\w.])")
+
+# Literals that cannot become bind variables: typed literals (DATE '2024-01-01') and column positions (ORDER BY 2)
+UNBINDABLE = re.compile(r"\b(DATE|TIME|TIMESTAMP|INTERVAL)\s*$|\b(ORDER|GROUP)\s+BY\s+([\w.\"]+(\s+(ASC|DESC))?\s*,\s*)*$", re.IGNORECASE)
+
+# Placeholder of each bind variable style, by parameter number
+PLACEHOLDERS = {
+	'named': lambda i: f":p{i}", # Oracle and SQLite
+	'pyformat': lambda i: f"%(p{i})s", # psycopg2
+	'numeric': lambda i: f"${i + 1}" # asyncpg
+}
+
+
+class TemplateCache:
+	def __init__(self, maxTemplates: int = 1000) -> None:
+		"""
+		Reuses generated SQL for requests that differ only in their literals, without asking the AI
+
+		Once SQL generated for a request has run, the literals of the request (numbers, dates and quoted text) are looked
+		for in the SQL. If each is found once, the SQL is kept as a template with bind variables in their place. A later
+		request with the same wording but other literals fills the template in, so "orders for customer 1042" and
+		"orders for customer 877" cost one AI request between them. Only queries (SELECT/WITH) are kept.
+
+		Args:
+			maxTemplates (int): Maximum number of templates kept, least recently used are removed first
+		"""
+
+		self.maxTemplates = maxTemplates
+
+		self._templates = OrderedDict() # (shape, context) -> (parts, slots, latency)
+		self._lock = threading.Lock()
+
+		# Counters reported by stats()
+		self._hits = 0
+		self._misses = 0
+		self._savedSeconds = 0.0
+
+
+	def match(self, query: str, context = None, style: str = 'named') -> tuple[str, dict | list] | None:
+		"""
+		Get SQL and bind variables for a request from a stored template, or None on a miss
+
+		Args:
+			query (str): Natural language prompt of what the user wants the model to do
+			context: Anything else the SQL depends on, such as the tables and backlog version (must be hashable)
+			style (str): Bind variable style: 'named' (:p0, for Oracle and SQLite), 'pyformat' (%(p0)s, for psycopg2) or 'numeric' ($1, for asyncpg)
+		"""
+
+		shape, values = _shape(query)
+
+		with self._lock:
+			template = self._templates.get((shape, context)) if values else None
+
+			try:
+				# Text where the template had a number does not fit
+				rendered = _render(template[0], template[1], values, style) if template != None else None
+			except ValueError:
+				rendered = None
+
+			if rendered == None:
+				self._misses += 1
+				return None
+
+			self._templates.move_to_end((shape, context))
+			self._hits += 1
+			self._savedSeconds += template[2]
+
+		return rendered
+
+	def learn(self, query: str, context, sql: str, latency: float = 0.0) -> bool:
+		"""
+		Store the SQL of a request as a template, if its literals are each found once in the SQL. Returns whether it was stored
+
+		Args:
+			query (str): Natural language prompt of what the user wants the model to do
+			context: Anything else the SQL depends on, as for match()
+			sql (str): SQL generated for the request, which ran successfully
+			latency (float): Seconds the AI took to generate it, counted as saved on every later hit
+		"""
+
+		shape, values = _shape(query)
+
+		# Nothing to fill in, or no telling which of two equal literals is which
+		if not values or len(set(values)) != len(values):
+			return False
+
+		sql = sql.strip().rstrip(';')
+
+		if not sql.upper().startswith(('SELECT', 'WITH')) or ';' in sql:
+			return False
+
+		parts, slots, start = [], [], 0
+
+		for literal in SQL_LITERAL.finditer(sql):
+			quoted, number = literal.group(1), literal.group(2)
+			value = quoted.replace("''", "'") if quoted != None else number
+
+			if value == None or value not in values:
+				continue
+
+			if UNBINDABLE.search(sql, 0, literal.start()):
+				return False
+
+			parts.append(sql[start:literal.start()])
+			slots.append((values.index(value), quoted != None))
+			start = literal.end()
+
+		parts.append(sql[start:])
+
+		# Each literal must be replaced exactly once. One left out would keep its old value, and one found twice means some
+		# other constant in the SQL equals it (e.g. region_id = 1 AND active = 1), which must not change with the request
+		if sorted(index for index, quoted in slots) != list(range(len(values))):
+			return False
+
+		with self._lock:
+			self._templates[(shape, context)] = (tuple(parts), tuple(slots), latency)
+			self._templates.move_to_end((shape, context))
+
+			while len(self._templates) > self.maxTemplates:
+				self._templates.popitem(last=False)
+
+		return True
+
+	def forget(self, query: str, context = None) -> None:
+		"""
+		Remove the template a request matches, e.g. after its SQL failed to run
+
+		Args:
+			query (str): Natural language prompt of what the user wants the model to do
+			context: Anything else the SQL depends on, as for match()
+		"""
+
+		with self._lock:
+			self._templates.pop((_shape(query)[0], context), None)
+
+	def clear(self) -> None:
+		"""
+		Remove every template
+		"""
+
+		with self._lock:
+			self._templates.clear()
+
+	def stats(self) -> dict:
+		"""
+		Get hit/miss counters and the AI latency saved by hits
+		"""
+
+		with self._lock:
+			total = self._hits + self._misses
+
+			return {
+				'hits': self._hits,
+				'misses': self._misses,
+				'hitRate': self._hits / total if total else 0.0,
+				'savedSeconds': self._savedSeconds,
+				'templates': len(self._templates)
+			}
+
+
+def _shape(query: str) -> tuple[str, list[str]]:
+	# Request with its literals replaced by their kind, normalized as for ResponseCache keys, and the literals in order
+	values = []
+
+	def replace(literal) -> str:
+		if literal.group(3) == None:
+			values.append(literal.group(1) if literal.group(1) != None else literal.group(2))
+			return '{text}'
+
+		values.append(literal.group(3))
+
+		return '{date}' if '-' in literal.group(3) else '{number}'
+
+	shape = REQUEST_LITERAL.sub(replace, query)
+
+	return re.sub(r'\s+', ' ', shape).strip().rstrip('?.!').lower(), values
+
+def _render(parts: tuple[str], slots: tuple[tuple], values: list[str], style: str) -> tuple[str, dict | list]:
+	# Fill a template in with bind variables
+	placeholder = PLACEHOLDERS[style]
+	sql = parts[0].replace('%', '%%') if style == 'pyformat' else parts[0]
+	params = []
+
+	for i, (index, quoted) in enumerate(slots):
+		value = values[index]
+
+		if not quoted:
+			value = float(value) if '.' in value else int(value)
+
+		params.append(value)
+
+		part = parts[i + 1].replace('%', '%%') if style == 'pyformat' else parts[i + 1]
+		sql += placeholder(i) + part
+
+	if style == 'numeric':
+		return sql, params
+
+	return sql, {f"p{i}": value for i, value in enumerate(params)}
@@ -0,0 +1,27 @@
+# Encoder loaded on first use, False if tiktoken is not installed
+_ENCODER = None
+
+
+def estimateTokens(text: str) -> int:
+	"""
+	Estimate how many tokens the AI model will count for some text
+
+	Uses tiktoken if it is installed, otherwise roughly 4 characters per token.
+
+	Args:
+		text (str): Text to count
+	"""
+
+	global _ENCODER
+
+	if _ENCODER == None:
+		try:
+			import tiktoken
+			_ENCODER = tiktoken.get_encoding('o200k_base')
+		except Exception:
+			_ENCODER = False
+
+	if _ENCODER:
+		return len(_ENCODER.encode(text, disallowed_special=()))
+
+	return (len(text) + 3) // 4
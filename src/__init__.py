@@ -1,28 +1,55 @@
 import os
-import json
+import threading
+import time
 from collections import defaultdict
-from dotenv import load_dotenv
 
-from Helpers import Prompter, Database
-from src.settingsManager import findTable
+from Helpers import Prompter, AsyncPrompter, Database, AsyncDatabase, ResponseCache, SchemaIndex, SchemaCatalog, CompiledSettings, JoinGraph, SchemaRenderer, Backlog, CostGuard, describePlan, LLMBackend, ModelRouter, openaiErrors, Metrics, RetryPolicy, TemplateCache, estimateTokens
+
+
+# Statements whose plan can be checked with EXPLAIN
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'MERGE')
+
+# What describes the schema to the AI, rebuilt when a backlog changes tables
+SCHEMA_VIEWS = ('schema', 'catalog', 'index', 'joins', 'renderer')
 
 
 class SmartSQL:
-	def __init__(self, settings: dict, flavor: str, envPath: str = 'env_data.env', confirmExecute: bool = True, **kwargs) -> None:
+	# Classes used to talk to the AI and database
+	_prompter = Prompter
+	_database = Database
+
+	def __init__(self, settings: dict | CompiledSettings, flavor: str, envPath: str = 'env_data.env', confirmExecute: bool = True, pooled: bool = False, poolOptions: dict = None, arraysize: int = 1000, cache: ResponseCache = None, topK: int = 10, tokenBudget: int = None, expandJoins: bool = True, schemaStyle: str = 'compact', backlogTokens: int = 2000, costGuard: CostGuard = None, maxRows: int = None, backend: LLMBackend = None, metrics: Metrics = None, retry: RetryPolicy = None, deployments: list[dict] = None, templates: TemplateCache = None, **kwargs) -> None:
 		"""
 		Create an instance of the SmartSQL class to create and run queries
 		
 		Either create a 'env_data.env' (or whatever environment file specified) file with environment variables or pass as an argument to this function
   
 		Args:
-			settings (dict): A dictionary corresponding to the structure of settings.json. See the README or settingsManager.py for more information.
-			flavor (str): SQL flavor. Currently only 'oracle' or 'postgres' available
+			settings (dict | CompiledSettings): A dictionary corresponding to the structure of settings.json, or compiled settings from settingsManager.loadSettings(), whose tables are only decoded once rendered into a prompt. See the README or settingsManager.py for more information.
+			flavor (str): SQL flavor. Currently only 'oracle', 'postgres' or 'sqlite' (a local file, e.g. for tests and benchmarks) available
 			envPath (str): Path to the .env file storing the connection string and API key(Optional)
 			confirmExecute (bool): Will essentially decide if need to output information and ask for confirmation before executing SQL queries.
+			pooled (bool): Whether to reuse database connections from a pool shared by every SmartSQL instance in the process
+			poolOptions (dict): Pool configuration (minSize, maxSize, pingInterval, idleTimeout, acquireTimeout). Only used when the shared pool is first created
+			arraysize (int): Rows fetched per round trip when streaming results
+			cache (ResponseCache): Cache of generated SQL to check before prompting the AI (Optional)
+			topK (int): When no tables are given to .query(), only send the topK tables most relevant to the request. If None, always send the full database
+			tokenBudget (int): Maximum estimated tokens of table layouts sent when tables are picked automatically (Optional)
+			expandJoins (bool): Whether to add the bridge tables needed to join the selected tables through foreign keys
+			schemaStyle (str): How tables are described to the AI - 'compact' (one line per column) or 'json' (indented settings JSON)
+			backlogTokens (int): Maximum estimated tokens of backlog commands sent to the AI. Table changes do not count, they are applied to the schema sent instead
+			costGuard (CostGuard): Limits on the estimated plan of generated SQL, checked with EXPLAIN before executing (Optional)
+			maxRows (int): Most rows a query returns. If given, results are ResultPage lists that can fetch the next page without the AI (Optional)
+			backend (LLMBackend): What to send prompts to, e.g. a FakeBackend for tests and benchmarks, or a ModelRouter to pick a model by complexity. Defaults to the Azure OpenAI deployment in the environment
+			metrics (Metrics): Where to record the time and tokens of each stage of a query. Defaults to a new Metrics, see .metrics.stats()
+			retry (RetryPolicy): Timeout, retries with backoff and hedging of AI requests. Defaults to 2 retries with a 60 second timeout
+			deployments (list[dict]): Several Azure OpenAI deployments of the same model to spread prompts across, each a dictionary of AZURE_OPENAI_* keys. Missing keys are taken from the environment (Optional)
+			templates (TemplateCache): Templates of earlier SQL, reused without the AI for requests differing only in literals (Optional)
 		"""
 
 		kwargs = defaultdict(str, kwargs)
 
+		from dotenv import load_dotenv
 		load_dotenv(envPath)
 
 		# Fetch all keys required
@@ -39,80 +66,1007 @@ class SmartSQL:
 			keys.extend(["DB_NAME", "DB_HOST", "DB_PORT"])
 		elif flavor == 'oracle':
 			keys.extend(["DB_DSN"])
+		elif flavor == 'sqlite':
+			keys.extend(["DB_PATH"])
 
 		# Generate key dictionary
 		apiKeys = {key: os.getenv(key, kwargs[key]) for key in keys}
 
-		# Set up connections to AI and database
-		self.ai = Prompter(apiKeys)
-		self.db = Database(apiKeys, flavor)
+		# Set up connections to AI and database, recording into the same metrics
+		self.metrics = metrics if metrics != None else Metrics()
+		self.backlog = Backlog(settings, backlogTokens)
+		self.ai = self._prompter(apiKeys, cache, self.backlog, backend, self.metrics, retry, deployments)
+		self.db = self._database(apiKeys, flavor, pooled, self.metrics, **(poolOptions or {}))
 
 		# Set up tables
-		self.settings = settings	
+		self.settings = settings
+		self.schemaStyle = schemaStyle
+		self.renderer = None
+		self._baseSchema = self._buildSchema(settings)
+		self._loadSchema(settings)
+		self.promptTokens = 0
+		self.promptTables = None
 
 		# Set other attributes
 		self.debug = confirmExecute
-		self.SQLflavor = settings['SQL_Flavor']
-		self.name = settings['Server_Name']
-		self.description = settings['Server_Description']
+		self.arraysize = arraysize
+		self.topK = topK
+		self.tokenBudget = tokenBudget
+		self.expandJoins = expandJoins
+		self.costGuard = costGuard
+		self.maxRows = maxRows
+		self.templates = templates
+
+		# Compiled settings give their server fields without decoding any table
+		server = settings if isinstance(settings, dict) else settings.toSettings([])
 
+		self.SQLflavor = server['SQL_Flavor']
+		self.name = server['Server_Name']
+		self.description = server['Server_Description']
 
 
-	def query(self, query: str, table: list[str] = None, withBacklog: bool = True, confirmExecute: bool = None) -> list:
+
+	def query(self, query: str, table: list[str] = None, withBacklog: bool = True, confirmExecute: bool = None, stream: bool = False, onToken: callable = None, maxRows: int = None, keyset: str = None, resultFormat: str = 'rows') -> list:
 		"""
 		Given query and table will execute database
 
 		Args:
 			query (str): Natural language prompt of what the user wants the model to do
-			table (list[str]): References to keys of the tableLayout dictionary so the model can understand which tables to reference. If None, default passes all
+			table (list[str]): References to keys of the tableLayout dictionary so the model can understand which tables to reference. If None, the most relevant tables are picked (all for schemas within topK)
 			withBacklog (bool): If needs to maintain history of past changes
 			confirmExecute (bool): Whether to override original confirmExecute attribute
+			stream (bool): If true, return an iterator fetching rows in batches of `arraysize` instead of a list, holding the connection until exhausted or closed
+			onToken (callable): If given, the SQL is streamed from the AI and this is called with each piece of text as it arrives (e.g. to print it)
+			maxRows (int): Whether to override original maxRows attribute
+			keyset (str): Result column to page by instead of offset when capped at maxRows (Optional)
+			resultFormat (str): 'rows' (list of tuples), or 'numpy' / 'arrow' for a ColumnarResult holding each column as a NumPy array / in a pyarrow.Table
+		"""
+
+		if resultFormat not in ('rows', 'numpy', 'arrow'):
+			raise ValueError("Only 'rows', 'numpy' and 'arrow' result formats available at the moment.")
+
+		with self.metrics.span('query', stream=stream, resultFormat=resultFormat):
+			if maxRows == None:
+				maxRows = self.maxRows
+
+			# Reuse the SQL of an earlier request differing only in literals, without the AI
+			context = self._templateContext(table, withBacklog)
+			match = self.templates.match(query, context, self._bindStyle()) if self.templates != None else None
+
+			if match != None:
+				sql, params = match
+
+				try:
+					plan, violations = self._checkCost(None, query, sql, params, backlog=False)[1:]
+				except Exception:
+					# Over cost limits or no longer valid, so ask the AI instead (checking what it writes in turn)
+					self.templates.forget(query, context)
+					match = None
+
+			if match != None:
+				if onToken != None:
+					onToken(sql)
+
+				# If in confirmExecute mode or over a cost limit, ask before immediately executing code
+				if (self.debug and confirmExecute == None) or confirmExecute or violations:
+					if onToken == None:
+						print(sql)
+					print(f"\nBind variables: {params}")
+					if plan != None:
+						print(describePlan(plan))
+					if violations:
+						print(f"Over cost limits: {'; '.join(violations)}")
+					with self.metrics.span('confirm'):
+						answer = input("\nExecute? [Y/N] ")
+					if 'y' not in answer.lower():
+						return
+
+				try:
+					return self._execute(sql, params, stream, maxRows, keyset, resultFormat)
+				except Exception:
+					# Ask the AI instead
+					self.templates.forget(query, context)
+
+			with self.metrics.span('buildPrompt') as span:
+				basePrompt = self._buildPrompt(query, table, withBacklog)
+				span['attributes']['schemaTokens'] = self.promptTokens
+
+			# Pick a model by complexity if routing, asking the stronger one again if SQL from the faster one fails
+			route = self._route(query)
+
+			while True:
+				options = {'route': route} if route != None else {}
+
+				# Return SQL prompt from AI, streaming it to onToken if given
+				start = time.perf_counter()
+
+				if onToken != None:
+					pieces = []
+
+					for piece in self.ai.promptStream(basePrompt, query, backlog=self.backlog, **options):
+						onToken(piece)
+						pieces.append(piece)
+
+					sql = ''.join(pieces)
+				else:
+					sql = self.ai.prompt(basePrompt, query, backlog=self.backlog, **options)
+
+				latency = time.perf_counter() - start
+
+				# Check the estimated plan, possibly asking the AI for a cheaper version. SQL the database cannot explain or that is
+				# over a limit fails the route as if it had been executed
+				try:
+					checked, plan, violations = self._checkCost(basePrompt, query, sql)
+				except Exception:
+					route = self._escalate(route)
+
+					if route == None:
+						self.backlog.pop() # Remove record from being included in backlog
+						raise
+
+					continue
+
+				# Rewritten SQL was not streamed, so show it below
+				shown = onToken != None and checked == sql
+				sql = checked
+
+				# If in confirmExecute mode or over a cost limit, ask before immediately executing code
+				if (self.debug and confirmExecute == None) or confirmExecute or violations:
+					# Already shown if streamed
+					if not shown:
+						print(sql)
+					if plan != None:
+						print(f"\n{describePlan(plan)}")
+					if violations:
+						print(f"Over cost limits: {'; '.join(violations)}")
+					with self.metrics.span('confirm'):
+						answer = input("\nExecute? [Y/N] ")
+					if 'y' not in answer.lower():
+						self.backlog.pop() # Remove record from being included in backlog
+						return
+
+				try:
+					result = self._execute(sql, None, stream, maxRows, keyset, resultFormat)
+				except Exception:
+					route = self._escalate(route)
+
+					if route == None:
+						raise
+
+					continue
+
+				if route != None:
+					self.ai.backend.succeeded(route)
+
+				if self.templates != None:
+					self.templates.learn(query, context, sql, latency)
+
+				return result
+
+	def queryMany(self, items: list, withBacklog: bool = True, llmConcurrency: int = 4, dbConcurrency: int = 4, ordered: bool = True, retries: int = 3) -> list[dict]:
+		"""
+		Run many queries at once, generating and executing SQL concurrently with separate limits
+
+		Never asks for confirmation and does not add the generated SQL to the backlog, so SQL over the cost guard's limits is
+		rejected unless rewritten (a 'confirm' guard rejects). A failing item does not stop the others,
+		its error is reported in its result instead. Requests wait while Azure reports the quota is used up, and an item
+		that hits a rate limit error is retried up to `retries` times.
+
+		Each result is a dictionary: `{'index': int, 'query': str, 'sql': str, 'params': dict, 'result': list, 'error': Exception}`,
+		where 'params' holds the bind variables of SQL filled in from a template (None otherwise).
+
+		Args:
+			items (list): Queries, either strings or (query, table) pairs where table is as for .query()
+			withBacklog (bool): If needs to include history of past changes in prompts
+			llmConcurrency (int): Maximum requests to the AI at once
+			dbConcurrency (int): Maximum statements running on the database at once
+			ordered (bool): If true, return a list of results in input order. Otherwise return an iterator yielding results as they complete
+			retries (int): Times to retry an item that hit the AI rate limit
+		"""
+
+		from concurrent.futures import ThreadPoolExecutor, as_completed
+
+		items = [(item, None) if isinstance(item, str) else tuple(item) for item in items]
+		llmSlots = threading.Semaphore(llmConcurrency)
+		dbSlots = threading.Semaphore(dbConcurrency)
+
+		def run(index: int, query: str, table: list[str]) -> dict:
+			result = {'index': index, 'query': query, 'sql': None, 'params': None, 'result': None, 'error': None}
+
+			try:
+				# Reuse the SQL of an earlier request differing only in literals, without the AI
+				context = self._templateContext(table, withBacklog)
+				match = self.templates.match(query, context, self._bindStyle()) if self.templates != None else None
+
+				if match != None:
+					try:
+						with dbSlots:
+							self._checkCost(None, query, *match, confirm=False, backlog=False)
+							result['result'] = self.db.execute(*match, maxRows=self.maxRows) or []
+
+						result['sql'], result['params'] = match
+
+						return result
+					except Exception:
+						self.templates.forget(query, context)
+
+				route = self._route(query, table if table != None else self.catalog.names())
+
+				while True:
+					options = {'route': route} if route != None else {}
+
+					# Generate SQL
+					basePrompt = self._buildPrompt(query, table, withBacklog)
+
+					for attempt in range(retries + 1):
+						try:
+							with llmSlots:
+								start = time.perf_counter()
+								result['sql'] = self.ai.prompt(basePrompt, query, updateBacklog=False, **options)
+								latency = time.perf_counter() - start
+							break
+						except openaiErrors('RateLimitError'):
+							if attempt == retries:
+								raise
+
+					# Check the estimated plan (nobody to confirm with, so over a limit is rejected unless rewritten) and execute SQL,
+					# generating it again with the stronger model if routed to the faster one and failing
+					try:
+						with dbSlots:
+							result['sql'] = self._checkCost(basePrompt, query, result['sql'], confirm=False, backlog=False)[0]
+							result['result'] = self.db.execute(result['sql'], maxRows=self.maxRows) or []
+					except Exception:
+						route = self._escalate(route, backlog=False)
+
+						if route == None:
+							raise
+
+						continue
+
+					if route != None:
+						self.ai.backend.succeeded(route)
+
+					if self.templates != None:
+						self.templates.learn(query, context, result['sql'], latency)
+
+					break
+
+			except Exception as e:
+				result['error'] = e
+
+			return result
+
+		def completed():
+			with ThreadPoolExecutor(max_workers=llmConcurrency + dbConcurrency) as executor:
+				futures = [executor.submit(run, index, query, table) for index, (query, table) in enumerate(items)]
+
+				for future in as_completed(futures):
+					yield future.result()
+
+		if not ordered:
+			return completed()
+
+		return sorted(completed(), key=lambda result: result['index'])
+
+	def explain(self, sql: str) -> dict:
+		"""
+		Get the estimated plan of SQL code without running it. See Database.explain()
+
+		Args:
+			sql (str): SQL code to explain
+		"""
+
+		return self.db.explain(sql)
+
+	def warmup(self) -> threading.Thread:
+		"""
+		Create the AI client, open database connections and load the tokenizer in the background, so the first query does
+		not wait on them. Returns the started thread, join() it to wait
+
+		Nothing is raised here: anything that fails is tried again, and raised, by the first query needing it.
+		"""
+
+		def run():
+			with self.metrics.span('warmup'):
+				for step in (self.ai.backend.warmup, self.db.warmup, lambda: estimateTokens('')):
+					try:
+						step()
+					except Exception:
+						pass
+
+		thread = threading.Thread(target=run, name='smartsql-warmup', daemon=True)
+		thread.start()
+
+		return thread
+
+	def session(self, confirmExecute: bool = None, backlogTokens: int = None) -> 'Session':
+		"""
+		Start a session: one user's backlog and confirmExecute setting, sharing this instance's AI client, database
+		connections, caches and schema. See Session
+
+		Args:
+			confirmExecute (bool): Whether to ask for confirmation before executing SQL. Defaults to this instance's
+			backlogTokens (int): Maximum estimated tokens of backlog commands sent to the AI. Defaults to this instance's
+		"""
+
+		return self._session(self, confirmExecute, backlogTokens)
+
+	def updateSettings(self, newSettings: dict | CompiledSettings) -> None:
+		"""
+		Updates settings and clears backlog, response cache and templates
+
+		Args:
+			newSettings (dict | CompiledSettings): New settings/server configuration to replace old one
+		"""
+
+		# Built before swapping in, so sessions reading the schema meanwhile keep the old one rather than none
+		schema = self._buildSchema(newSettings)
+
+		# Updating settings meaning backlog and cached responses are no longer accurate
+		self.settings, self._baseSchema = newSettings, schema
+		self.backlog.reset(newSettings)
+		self._loadSchema(newSettings)
+
+		if self.ai.cache:
+			self.ai.cache.clear()
+
+		if self.templates != None:
+			self.templates.clear()
+
+
+	def _checkCost(self, basePrompt: str, query: str, sql: str, params: dict | list = None, confirm: bool = True, backlog: bool = True) -> tuple[str, dict, list[str]]:
+		"""
+		Explain SQL and apply the cost guard's action, returning the SQL to run, its plan and the limits it is over
+
+		Violations are only returned for the 'confirm' action where the caller can ask, otherwise SQL over a limit raises a
+		RuntimeError, left in the backlog for the caller to remove. Without a cost guard, or for SQL that cannot be explained,
+		the plan is None.
+
+		Args:
+			basePrompt (str): System prompt the SQL was generated with. None for SQL not from the AI (e.g. from a template), which is never rewritten
+			query (str): Natural language prompt of what the user wants the model to do
+			sql (str): SQL to check
+			params (dict | list): Bind variables for the statement (Optional)
+			confirm (bool): Whether the caller can ask before executing. If not, the 'confirm' action rejects instead
+			backlog (bool): Whether the SQL was added to the backlog, so rewritten SQL should replace it there
+		"""
+
+		if not self._guarded(sql):
+			return sql, None, []
+
+		plan = self.db.explain(sql, params)
+		violations = self.costGuard.check(plan)
+
+		# Show the AI the plan it produced and ask for a cheaper statement, replacing the earlier one in the backlog
+		if self.costGuard.action == 'rewrite' and basePrompt != None:
+			for attempt in range(self.costGuard.maxRewrites):
+				if not violations:
+					break
+
+				sql = self._replace(self.ai.prompt(self._rewritePrompt(basePrompt, sql, plan, violations), query, updateBacklog=False), backlog)
+				plan = self.db.explain(sql)
+				violations = self.costGuard.check(plan)
+
+		return sql, plan, self._overLimits(sql, violations, confirm)
+
+	def _guarded(self, sql: str) -> bool:
+		# Whether SQL is checked by the cost guard (a single statement that can be explained)
+		return self.costGuard != None and sql.lstrip().upper().startswith(EXPLAINABLE) and ';' not in sql.strip().rstrip(';')
+
+	def _rewritePrompt(self, basePrompt: str, sql: str, plan: dict, violations: list[str]) -> str:
+		# System prompt asking the AI for a cheaper version of SQL over cost limits
+		return f"{basePrompt}\n\nA previous answer to this request was:\n{sql}\n\nIts estimated execution plan is too expensive ({'; '.join(violations)}):\n{plan['plan']}\n\nWrite SQL with the same result that avoids these problems, for example by adding missing join conditions or filtering on indexed columns."
+
+	def _replace(self, sql: str, backlog: bool) -> str:
+		# Put rewritten SQL in the backlog in place of the SQL it replaces, once it has been generated
+		if backlog:
+			self.backlog.pop()
+			self.backlog.append(sql)
+
+		return sql
+
+	def _overLimits(self, sql: str, violations: list[str], confirm: bool) -> list[str]:
+		# Violations left for the caller to confirm, raising if they cannot be
+		if violations and (self.costGuard.action != 'confirm' or not confirm):
+			raise RuntimeError(f"Generated SQL is over cost limits ({'; '.join(violations)}):\n{sql}")
+
+		return violations
+
+	def _execute(self, sql: str, params: dict | list, stream: bool, maxRows: int, keyset: str, resultFormat: str):
+		"""
+		Execute SQL for .query() in the result format asked for, capped at maxRows unless streamed
+
+		Args:
+			sql (str): SQL code to run
+			params (dict | list): Bind variables for the statement (Optional)
+			stream (bool): If true, return an iterator fetching rows in batches of `arraysize`
+			maxRows (int): Most rows to return (Optional)
+			keyset (str): Result column to page by instead of offset when capped at maxRows (Optional)
+			resultFormat (str): 'rows', 'numpy' or 'arrow'
+		"""
+
+		if resultFormat != 'rows':
+			return self.db.columnar(sql, params, backend=resultFormat, arraysize=self.arraysize, maxRows=maxRows)
+
+		if maxRows != None and not stream:
+			return self.db.page(sql, params, maxRows=maxRows, keyset=keyset)
+
+		result = self.db.execute(sql, params, stream=stream, arraysize=self.arraysize)
+
+		# If no result, return empty list
+		if result == None:
+			return []
+
+		return result
+
+	def _templateContext(self, table: list[str] = None, withBacklog: bool = True) -> tuple:
+		"""
+		What SQL generated for a request depends on besides the request itself, so templates are only reused where it matches
+
+		Args:
+			table (list[str]): Tables asked for, as for .query()
+			withBacklog (bool): If the backlog is included in prompts
+		"""
+
+		backlog = (self.backlog.version, tuple(self.backlog)) if withBacklog else None
+
+		return (tuple(table) if table != None else None, backlog)
+
+	def _bindStyle(self) -> str:
+		# Bind variables of the database driver, see TemplateCache.match()
+		return 'pyformat' if self.db.flavor == 'postgres' else 'named'
+
+	def _route(self, query: str, tables: list[str] = None) -> str | None:
+		"""
+		Route the AI backend should take for a request if it is a ModelRouter, otherwise None
+
+		Args:
+			query (str): Natural language prompt of what the user wants the model to do
+			tables (list[str]): Names of the tables the request may use. Defaults to those described by the last prompt built
+		"""
+
+		if not isinstance(self.ai.backend, ModelRouter):
+			return None
+
+		return self.ai.backend.classify(query, tables if tables != None else self.promptTables)
+
+	def _escalate(self, route: str | None, backlog: bool = True) -> str | None:
+		"""
+		Record that SQL from a route failed to run, returning the route to generate it again with (or None to give up)
+
+		Args:
+			route (str): Route the SQL came from, None if not routing
+			backlog (bool): Whether the failed SQL was added to the backlog, so should be removed before trying again
+		"""
+
+		if route == None:
+			return None
+
+		route = self.ai.backend.failed(route)
+
+		if route != None and backlog:
+			self.backlog.pop()
+
+		return route
+
+	def _loadSchema(self, settings: dict | CompiledSettings) -> None:
+		"""
+		Describe settings to the AI from now on, building the views for them unless they are the settings as given
+
+		Args:
+			settings (dict | CompiledSettings): Settings to describe to the AI
+		"""
+
+		# Settings as given are described by the views built for them, so going back to them needs no rebuild
+		if self._baseSchema['schema'] is settings:
+			self.__dict__.update(self._baseSchema)
+		else:
+			self.__dict__.update(self._buildSchema(settings))
+
+	def _buildSchema(self, settings: dict | CompiledSettings) -> dict:
+		"""
+		Build the catalog, table index, join graph and rendered tables used for prompts, by name (see SCHEMA_VIEWS)
+
+		Compiled settings are their own catalog and hold the terms of their table index, so only the tables rendered into
+		prompts are ever decoded.
+
+		Args:
+			settings (dict | CompiledSettings): Settings to describe to the AI
+		"""
+
+		if not isinstance(settings, dict):
+			return {
+				'schema': settings,
+				'catalog': settings,
+				'index': settings.searchIndex(),
+				'joins': JoinGraph.fromCatalog(settings),
+				'renderer': SchemaRenderer(settings, self.schemaStyle, self.renderer)
+			}
+
+		return {
+			'schema': settings,
+			'catalog': SchemaCatalog(settings),
+			'index': SchemaIndex(settings),
+			'joins': JoinGraph(settings),
+			'renderer': SchemaRenderer(settings, self.schemaStyle, self.renderer)
+		}
+
+	def _buildPrompt(self, query: str, table: list[str] = None, withBacklog: bool = True) -> str:
+		"""
+		Build the system prompt for a request
+
+		Args:
+			query (str): Natural language prompt of what the user wants the model to do
+			table (list[str]): Tables to describe. If None, the most relevant tables are picked (or all, see topK)
+			withBacklog (bool): If needs to include history of past changes
 		"""
 
 		# Base explanation to AI for prompt
 		serverExplanation = f"My database {self.name} is {self.description}. I am using {self.SQLflavor}. Help give solely SQL code to complete the query from the user. Do not output anything other than SQL code and do NOT put it in a code block and do NOT add comments. Just raw text.\n"
 
+		# Describe the schema with backlog table changes applied, if any
+		schema = self.backlog.settings if withBacklog and self.backlog.settings != None else self.settings
+
+		if schema is not self.schema:
+			self._loadSchema(schema)
+
+		# If table description not provided, pick the tables most relevant to the query
+		autoSelected = table == None
+
+		if autoSelected:
+			table = self._selectTables(query)
+		else:
+			# Names as written in settings, raising a KeyError for unknown tables
+			table = [self.catalog.table(name).name for name in table]
+
 		# Set conditional part of prompt
 		if table != None:
-			tables = [findTable(self.settings, i) for i in table]
-			basePrompt = f"Make sure to connect, if necessary for the task, to the table(s) named {', '.join(table)}. The following is the layout/description for each table:\n{'\n\n'.join(json.dumps(i, indent='\t') for i in tables)}"
+			# Add tables needed to join the selected ones
+			tables = self.joins.connect(table) if self.expandJoins else table
+			layouts = self.renderer.render(tables)
 
-		# If table description not provided, give all tables/full structure and let AI decide which to use/connect to
+			if autoSelected:
+				basePrompt = f"The following is the layout/description for the tables of the database most relevant to the request:\n{self.renderer.legend}"
+			else:
+				bridges = f" The table(s) {', '.join(tables[len(table):])} connect them." if len(tables) > len(table) else ''
+				basePrompt = f"Make sure to connect, if necessary for the task, to the table(s) named {', '.join(table)}.{bridges} The following is the layout/description for each table:\n{self.renderer.legend}"
+
+		# Otherwise give all tables/full structure and let AI decide which to use/connect to
 		else:
-			basePrompt = f"The following is the structure of the full database:\n{json.dumps(self.settings, indent='\t')}"
+			tables = None
+			layouts = self.renderer.renderAll()
+			basePrompt = f"The following is the structure of the full database:\n{self.renderer.legend}"
 
 		# Check if need to include command history
+		backlog = ''
+
 		if withBacklog:
-			if len(self.ai.backlog) > 0:
-				basePrompt += f"\n\nPlease note that the following commands have been executed to the database description aforementioned, meaning you need to consider the following changes/commands to have taken effect before writing your SQL code:\n{'\n'.join(self.ai.backlog)}"
-
-		# Return SQL prompt from AI
-		result = self.ai.prompt(serverExplanation + basePrompt, query)
-
-		# If in confirmExecute mode, ask before immediately executing code
-		if (self.debug and confirmExecute == None) or confirmExecute:
-			print(result)
-			if 'y' not in input("\nExecute? [Y/N] ").lower():
-				self.ai.backlog.pop() # Remove record from being included in backlog
-				return
-		
-		# Execute SQL code and return value/list/result
-		result = self.db.execute(result)
+			if len(self.backlog) > 0:
+				commands = '\n'.join(self.backlog)
+				backlog = f"\n\nPlease note that the following commands have been executed to the database description aforementioned, meaning you need to consider the following changes/commands to have taken effect before writing your SQL code:\n{commands}"
 
-		# If no result, return empty list
-		if result == None:
-			return []
-		
-		return result
+		# Layout token counts are cached, so only count the rest
+		self.promptTokens = estimateTokens(serverExplanation + basePrompt + backlog) + self.renderer.tokens(tables)
+		self.promptTables = tables if tables != None else self.catalog.names()
+
+		return serverExplanation + basePrompt + layouts + backlog
 
-	def updateSettings(self, newSettings: dict) -> None:
+	def _selectTables(self, query: str) -> list[str] | None:
+		"""
+		Pick the tables most relevant to the query within topK and tokenBudget, or None to send the full database
+
+		Args:
+			query (str): Natural language prompt of what the user wants the model to do
 		"""
-		Updates settings and clears backlog
+
+		# Small schemas are sent whole
+		if self.topK == None or len(self.catalog) <= self.topK:
+			return None
+
+		ranked = self.index.search(query, self.topK)
+
+		# Nothing matched, so let the AI see everything
+		if not ranked:
+			return None
+
+		selected = []
+		used = 0
+
+		for name, score in ranked:
+			tokens = self.renderer.tokens([name])
+
+			if selected and self.tokenBudget != None and used + tokens > self.tokenBudget:
+				break
+
+			selected.append(name)
+			used += tokens
+
+		return selected
+
+
+class AsyncSmartSQL(SmartSQL):
+	"""
+	Asynchronous version of SmartSQL, so one event loop can serve many requests while they wait on the AI or database
+
+	Takes the same arguments as SmartSQL and keeps the same settings and backlog. Uses AsyncAzureOpenAI, python-oracledb's
+	async connections for 'oracle' and asyncpg for 'postgres'.
+	"""
+
+	_prompter = AsyncPrompter
+	_database = AsyncDatabase
+
+	async def query(self, query: str, table: list[str] = None, withBacklog: bool = True, confirmExecute: bool = None, stream: bool = False, maxRows: int = None) -> list:
+		"""
+		Given query and table will execute database
+
+		Args:
+			query (str): Natural language prompt of what the user wants the model to do
+			table (list[str]): References to keys of the tableLayout dictionary so the model can understand which tables to reference. If None, the most relevant tables are picked (all for schemas within topK)
+			withBacklog (bool): If needs to maintain history of past changes
+			confirmExecute (bool): Whether to override original confirmExecute attribute
+			stream (bool): If true, return an async generator fetching rows in batches of `arraysize` instead of a list
+			maxRows (int): Whether to override original maxRows attribute. Results capped at maxRows are ResultPage lists without a next page
+		"""
+
+		import asyncio
+
+		with self.metrics.span('query', stream=stream, resultFormat='rows'):
+			if maxRows == None:
+				maxRows = self.maxRows
+
+			# Reuse the SQL of an earlier request differing only in literals, without the AI
+			context = self._templateContext(table, withBacklog)
+			match = self.templates.match(query, context, self._bindStyle()) if self.templates != None else None
+
+			if match != None:
+				sql, params = match
+
+				try:
+					plan, violations = (await self._checkCost(None, query, sql, params, backlog=False))[1:]
+				except Exception:
+					# Over cost limits or no longer valid, so ask the AI instead (checking what it writes in turn)
+					self.templates.forget(query, context)
+					match = None
+
+			if match != None:
+				# If in confirmExecute mode or over a cost limit, ask before immediately executing code
+				if (self.debug and confirmExecute == None) or confirmExecute or violations:
+					print(f"{sql}\n\nBind variables: {params}")
+					if plan != None:
+						print(describePlan(plan))
+					if violations:
+						print(f"Over cost limits: {'; '.join(violations)}")
+					with self.metrics.span('confirm'):
+						answer = await asyncio.to_thread(input, "\nExecute? [Y/N] ")
+					if 'y' not in answer.lower():
+						return
+
+				if stream:
+					return self.db.stream(sql, params, arraysize=self.arraysize)
+
+				try:
+					return await self.db.execute(sql, params, maxRows=maxRows)
+				except Exception:
+					# Ask the AI instead
+					self.templates.forget(query, context)
+
+			with self.metrics.span('buildPrompt') as span:
+				basePrompt = self._buildPrompt(query, table, withBacklog)
+				span['attributes']['schemaTokens'] = self.promptTokens
+
+			# Pick a model by complexity if routing, asking the stronger one again if SQL from the faster one fails
+			route = self._route(query)
+
+			while True:
+				options = {'route': route} if route != None else {}
+
+				# Return SQL prompt from AI
+				start = time.perf_counter()
+				sql = await self.ai.prompt(basePrompt, query, backlog=self.backlog, **options)
+				latency = time.perf_counter() - start
+
+				# Check the estimated plan, possibly asking the AI for a cheaper version. SQL the database cannot explain or that is
+				# over a limit fails the route as if it had been executed
+				try:
+					sql, plan, violations = await self._checkCost(basePrompt, query, sql)
+				except Exception:
+					route = self._escalate(route)
+
+					if route == None:
+						self.backlog.pop() # Remove record from being included in backlog
+						raise
+
+					continue
+
+				# If in confirmExecute mode or over a cost limit, ask before immediately executing code (without blocking the event loop)
+				if (self.debug and confirmExecute == None) or confirmExecute or violations:
+					print(sql)
+					if plan != None:
+						print(f"\n{describePlan(plan)}")
+					if violations:
+						print(f"Over cost limits: {'; '.join(violations)}")
+					with self.metrics.span('confirm'):
+						answer = await asyncio.to_thread(input, "\nExecute? [Y/N] ")
+					if 'y' not in answer.lower():
+						self.backlog.pop() # Remove record from being included in backlog
+						return
+
+				# Execute SQL code and return value/list/result
+				if stream:
+					return self.db.stream(sql, arraysize=self.arraysize)
+
+				try:
+					result = await self.db.execute(sql, maxRows=maxRows)
+				except Exception:
+					route = self._escalate(route)
+
+					if route == None:
+						raise
+
+					continue
+
+				if route != None:
+					self.ai.backend.succeeded(route)
+
+				if self.templates != None:
+					self.templates.learn(query, context, sql, latency)
+
+				# If no result, return empty list
+				if result == None:
+					return []
+
+				return result
+
+	def queryMany(self, items: list, withBacklog: bool = True, llmConcurrency: int = 4, dbConcurrency: int = 4, ordered: bool = True, retries: int = 3):
+		"""
+		Asynchronous version of SmartSQL.queryMany(), running every item as a task on the event loop
+
+		Await it for a list of results in input order (`await mySmartSQL.queryMany(items)`), or with ordered=False iterate
+		over it to get results as they complete (`async for result in mySmartSQL.queryMany(items, ordered=False)`).
+		Results are as for SmartSQL.queryMany().
 
 		Args:
-			newSettings (dict): New settings/server configuration to replace old one
+			items (list): Queries, either strings or (query, table) pairs where table is as for .query()
+			withBacklog (bool): If needs to include history of past changes in prompts
+			llmConcurrency (int): Maximum requests to the AI at once
+			dbConcurrency (int): Maximum statements running on the database at once
+			ordered (bool): If true, return a coroutine giving a list of results in input order. Otherwise return an async iterator yielding results as they complete
+			retries (int): Times to retry an item that hit the AI rate limit
 		"""
 
-		# Updating settings meaning backlog is no longer accurate
-		self.settings = newSettings
-		self.ai.clearBacklog()
+		import asyncio
+
+		items = [(item, None) if isinstance(item, str) else tuple(item) for item in items]
+
+		async def run(index: int, query: str, table: list[str], llmSlots: asyncio.Semaphore, dbSlots: asyncio.Semaphore) -> dict:
+			result = {'index': index, 'query': query, 'sql': None, 'params': None, 'result': None, 'error': None}
+
+			try:
+				# Reuse the SQL of an earlier request differing only in literals, without the AI
+				context = self._templateContext(table, withBacklog)
+				match = self.templates.match(query, context, self._bindStyle()) if self.templates != None else None
+
+				if match != None:
+					try:
+						async with dbSlots:
+							await self._checkCost(None, query, *match, confirm=False, backlog=False)
+							result['result'] = await self.db.execute(*match, maxRows=self.maxRows)
+
+						result['sql'], result['params'] = match
+
+						return result
+					except Exception:
+						self.templates.forget(query, context)
+
+				route = self._route(query, table if table != None else self.catalog.names())
+
+				while True:
+					options = {'route': route} if route != None else {}
+
+					# Generate SQL
+					basePrompt = self._buildPrompt(query, table, withBacklog)
+
+					for attempt in range(retries + 1):
+						try:
+							async with llmSlots:
+								start = time.perf_counter()
+								result['sql'] = await self.ai.prompt(basePrompt, query, updateBacklog=False, **options)
+								latency = time.perf_counter() - start
+							break
+						except openaiErrors('RateLimitError'):
+							if attempt == retries:
+								raise
+
+					# Check the estimated plan (nobody to confirm with, so over a limit is rejected unless rewritten) and execute SQL,
+					# generating it again with the stronger model if routed to the faster one and failing
+					try:
+						async with dbSlots:
+							result['sql'] = (await self._checkCost(basePrompt, query, result['sql'], confirm=False, backlog=False))[0]
+							result['result'] = await self.db.execute(result['sql'], maxRows=self.maxRows)
+					except Exception:
+						route = self._escalate(route, backlog=False)
+
+						if route == None:
+							raise
+
+						continue
+
+					if route != None:
+						self.ai.backend.succeeded(route)
+
+					if self.templates != None:
+						self.templates.learn(query, context, result['sql'], latency)
+
+					break
+
+			except Exception as e:
+				result['error'] = e
+
+			return result
+
+		def tasks() -> list:
+			# Semaphores made on the running event loop
+			llmSlots = asyncio.Semaphore(llmConcurrency)
+			dbSlots = asyncio.Semaphore(dbConcurrency)
+
+			return [run(index, query, table, llmSlots, dbSlots) for index, (query, table) in enumerate(items)]
+
+		async def completed():
+			for future in asyncio.as_completed(tasks()):
+				yield await future
+
+		async def gathered() -> list[dict]:
+			return list(await asyncio.gather(*tasks()))
+
+		if not ordered:
+			return completed()
+
+		return gathered()
+
+	async def _checkCost(self, basePrompt: str, query: str, sql: str, params: dict | list = None, confirm: bool = True, backlog: bool = True) -> tuple[str, dict, list[str]]:
+		# Asynchronous version of SmartSQL._checkCost()
+		if not self._guarded(sql):
+			return sql, None, []
+
+		plan = await self.db.explain(sql, params)
+		violations = self.costGuard.check(plan)
+
+		if self.costGuard.action == 'rewrite' and basePrompt != None:
+			for attempt in range(self.costGuard.maxRewrites):
+				if not violations:
+					break
+
+				sql = self._replace(await self.ai.prompt(self._rewritePrompt(basePrompt, sql, plan, violations), query, updateBacklog=False), backlog)
+				plan = await self.db.explain(sql)
+				violations = self.costGuard.check(plan)
+
+		return sql, plan, self._overLimits(sql, violations, confirm)
+
+	def _bindStyle(self) -> str:
+		# asyncpg only takes positional bind variables
+		return 'numeric' if self.db.flavor == 'postgres' else 'named'
+
+	async def warmup(self) -> None:
+		"""
+		Create the AI client, the database pool for this event loop (or import the driver if not pooled) and load the
+		tokenizer ahead of the first query. Run it as a task to warm up in the background: `asyncio.create_task(mySmartSQL.warmup())`
+
+		Nothing is raised here, as for SmartSQL.warmup().
+		"""
+
+		import asyncio
+
+		with self.metrics.span('warmup'):
+			try:
+				self.ai.backend.warmup()
+			except Exception:
+				pass
+
+			await asyncio.gather(self.db.warmup(), asyncio.to_thread(estimateTokens, ''), return_exceptions=True)
+
+	async def close(self) -> None:
+		"""
+		Close the shared database pool and AI backend
+		"""
+
+		await self.db.close()
+		await self.ai.backend.closeAsync()
+
+
+class Session(SmartSQL):
+	"""
+	One user's view of a SmartSQL instance (its engine), made with `.session()`
+
+	A session holds its own backlog, confirmExecute setting and prompt size, and takes everything else from the engine:
+	the AI client and response cache, database connections, templates, metrics and the schema described to the AI, which
+	are safe to use from many threads at once. Making one copies nothing, so one engine can serve thousands of users
+	concurrently, a session each. The schema is only rebuilt for a session whose backlog changes tables.
+
+	A session itself is meant for one user at a time, as the engine is when queried directly.
+	"""
+
+	def __init__(self, engine: SmartSQL, confirmExecute: bool = None, backlogTokens: int = None) -> None:
+		"""
+		Start a session of engine, usually through engine.session()
+
+		Args:
+			engine (SmartSQL): Instance to share the AI client, database connections, caches and schema of
+			confirmExecute (bool): Whether to ask for confirmation before executing SQL. Defaults to the engine's
+			backlogTokens (int): Maximum estimated tokens of backlog commands sent to the AI. Defaults to the engine's
+		"""
+
+		self.engine = engine
+		self.backlog = Backlog(engine.settings, backlogTokens if backlogTokens != None else engine.backlog.tokenBudget)
+		self.debug = confirmExecute if confirmExecute != None else engine.debug
+		self.promptTokens = 0
+		self.promptTables = None
+
+	def __getattr__(self, name: str):
+		# Only reached for what the session does not hold itself. The schema is the engine's as given, without the engine's own backlog
+		engine = self.__dict__.get('engine')
+
+		if engine == None or name.startswith('__'):
+			raise AttributeError(name)
+
+		if name in SCHEMA_VIEWS:
+			return engine._baseSchema[name]
+
+		# Read with the views, which updateSettings() swaps in at once, so settings and views always match
+		if name == 'settings':
+			return engine._baseSchema['schema']
+
+		return getattr(engine, name)
+
+
+	def session(self, confirmExecute: bool = None, backlogTokens: int = None) -> 'Session':
+		return self.engine.session(confirmExecute, backlogTokens)
+
+	def updateSettings(self, newSettings: dict | CompiledSettings) -> None:
+		"""
+		Updates the engine's settings for every session, clearing the response cache and templates. Each session's backlog
+		is cleared the next time it is used
+
+		Args:
+			newSettings (dict | CompiledSettings): New settings/server configuration to replace old one
+		"""
+
+		self.engine.updateSettings(newSettings)
+
+
+	def _templateContext(self, table: list[str] = None, withBacklog: bool = True) -> tuple:
+		self._sync()
+
+		return super()._templateContext(table, withBacklog)
+
+	def _buildPrompt(self, query: str, table: list[str] = None, withBacklog: bool = True) -> str:
+		self._sync()
+
+		return super()._buildPrompt(query, table, withBacklog)
+
+	def _loadSchema(self, settings: dict | CompiledSettings) -> None:
+		# Back to the engine's schema, so drop the session's own
+		if settings is self.settings:
+			for name in SCHEMA_VIEWS:
+				self.__dict__.pop(name, None)
+
+			return
+
+		super()._loadSchema(settings)
+
+	def _sync(self) -> None:
+		# Settings were updated through the engine since, so the backlog no longer applies
+		settings = self.settings
+
+		if self.backlog.baseSettings is not settings:
+			self.backlog.reset(settings)
+
+
+class AsyncSession(Session, AsyncSmartSQL):
+	"""
+	Session of an AsyncSmartSQL, see Session
+	"""
+
+
+# Classes of the sessions each engine starts
+SmartSQL._session = Session
+AsyncSmartSQL._session = AsyncSession
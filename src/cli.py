@@ -103,12 +103,13 @@ exp = SmartSQL(
     settings, 
     preferences['SQL_FLAVOR'], 
     envPath=preferences['ENV_PATH'], 
-    confirmExecute=True
+    confirmExecute=True,
+    maxRows=1000
 )
 
 # For validation
-allTables = settingsManager.getAllTables(settings)
-print(f"\nFound {len(allTables)} tables in settings")
+schemaCatalog = settingsManager.catalog(settings)
+print(f"\nFound {len(schemaCatalog)} tables in settings")
 
 # Query loop
 print("\nStarting query interface. Type 'exit' to quit at any time.")
@@ -124,13 +125,13 @@ while True:
         specify_tables = get_user_input("Specify tables? [Y/N]:", options=['y', 'n'])
         
         if specify_tables.lower() == 'y':
-            print(f"Available tables: {', '.join(allTables)}")
+            print(f"Available tables: {', '.join(schemaCatalog.names())}")
             table_input = input("Enter tables (comma separated): ").strip()
             selected_tables = [t.strip() for t in table_input.split(',') if t.strip()]
             
-            # Validate tables
-            valid_tables = [t for t in selected_tables if t in allTables]
-            invalid_tables = [t for t in selected_tables if t not in allTables]
+            # Validate tables, using the names as written in settings
+            valid_tables = [schemaCatalog.table(t).name for t in selected_tables if t in schemaCatalog]
+            invalid_tables = [t for t in selected_tables if t not in schemaCatalog]
             
             if invalid_tables:
                 print(f"Warning: Ignoring invalid tables: {', '.join(invalid_tables)}")
@@ -141,13 +142,21 @@ while True:
             else:
                 print("No valid tables selected. Using all available tables.")
         
-        # Execute query
-        print("\nProcessing query...")
-        result = exp.query(query, tables)
+        # Execute query, printing the SQL as it is generated
+        print("\nProcessing query...\n")
+        result = exp.query(query, tables, onToken=lambda token: print(token, end='', flush=True))
         
         # Output result
         if result:
             print(f"\nResult:\n{result}")
+
+            # Results are capped, so offer the following pages without asking the AI again
+            while result and result.truncated:
+                if get_user_input("More rows available. Show next page? [Y/N]:", options=['y', 'n']).lower() != 'y':
+                    break
+                result = result.next()
+                if result:
+                    print(f"\nResult:\n{result}")
         else:
             print("\nNo results returned")
             
@@ -1,19 +1,30 @@
 import json
 import os
-from dotenv import load_dotenv
+import threading
+from collections import OrderedDict
 
-from src.Helpers import Database, Prompter
+from src.Helpers import Database, Prompter, SchemaCatalog, CompiledSettings
+
+
+# Name indexes of the 'Tables' lists findTable() was last given, by list identity: id -> (list, length, exact names, lowercase names)
+_TABLE_INDEXES = OrderedDict()
+_TABLE_INDEXES_LOCK = threading.Lock()
+_TABLE_INDEXES_SIZE = 8
 
 
 # Export
-def exportSettings(settings: dict, exportPath: str = "./settings.json") -> None:
+def exportSettings(settings: dict | SchemaCatalog | CompiledSettings, exportPath: str = "./settings.json") -> None:
     """
     Export settings to JSON file as a dictionary
 
     Args:
+        settings (dict | SchemaCatalog | CompiledSettings): Settings dictionary, catalog or compiled settings
         exportPath (str): Path to export JSON file to
     """
 
+    if not isinstance(settings, dict):
+        settings = settings.toSettings()
+
     # Open and export
     with open(exportPath, 'w+') as file:
         json.dump(settings, file, indent='\t')
@@ -27,28 +38,41 @@ def settingsFromDBPath(flavor: str, envPath: str = 'env_data.env') -> dict:
     Note descriptions will be set as an empty string, and will have to be manually explained.
 
     Args:
-        flavor (str): SQL flavor. Currently only 'oracle' or 'postgres' available
+        flavor (str): SQL flavor. Currently only 'oracle', 'postgres' or 'sqlite' available
+        envPath (str): Environment variables .env file path to process connection string
+    """
+
+    # Process
+    return settingsFromDB(flavor, _connectionFromEnv(flavor, envPath))
+
+
+def _connectionFromEnv(flavor: str, envPath: str) -> dict[str]:
+    """
+    Build the connection dictionary for the flavor from a .env file
+
+    Args:
+        flavor (str): SQL flavor. Currently only 'oracle', 'postgres' or 'sqlite' available
         envPath (str): Environment variables .env file path to process connection string
     """
 
     # Load environment variables
+    from dotenv import load_dotenv
     load_dotenv(envPath)
 
-    # Process
-    return settingsFromDB(
-        flavor,
-        {
-            "DB_USER": os.getenv('DB_USER'),
-            "DB_PASSWORD": os.getenv('DB_PASSWORD'),
-            "DB_NAME": os.getenv('DB_NAME'),
-            "DB_HOST": os.getenv('DB_HOST'),
-            "DB_PORT": os.getenv('DB_PORT'),
-        } if flavor == 'postgres' else {
-            "DB_USER": os.getenv('DB_USER'),
-            "DB_PASSWORD": os.getenv('DB_PASSWORD'),
-            "DB_DSN": os.getenv('DB_DSN'),
-        }
-    )
+    if flavor == 'sqlite':
+        return {"DB_PATH": os.getenv('DB_PATH')}
+
+    return {
+        "DB_USER": os.getenv('DB_USER'),
+        "DB_PASSWORD": os.getenv('DB_PASSWORD'),
+        "DB_NAME": os.getenv('DB_NAME'),
+        "DB_HOST": os.getenv('DB_HOST'),
+        "DB_PORT": os.getenv('DB_PORT'),
+    } if flavor == 'postgres' else {
+        "DB_USER": os.getenv('DB_USER'),
+        "DB_PASSWORD": os.getenv('DB_PASSWORD'),
+        "DB_DSN": os.getenv('DB_DSN'),
+    }
 
 # NOTE: Might have to modify this if using other database provider
 def settingsFromDB(flavor: str, connection: dict[str]) -> dict:
@@ -56,7 +80,7 @@ def settingsFromDB(flavor: str, connection: dict[str]) -> dict:
     Generate database schema with detailed constraint information including CHECK conditions.
     
     Args:
-        flavor (str): Database flavor - 'oracle' or 'postgres'
+        flavor (str): Database flavor - 'oracle', 'postgres' or 'sqlite'
         connection (dict): Connection parameters
         
     Returns:
@@ -101,179 +125,17 @@ def settingsFromDB(flavor: str, connection: dict[str]) -> dict:
         }
     """
     db = Database(connection, flavor)
-    tables = []
 
     try:
-        if flavor.lower() == 'oracle':
-            # Get all user tables
-            tableNames = [row[0] for row in db.execute("SELECT table_name FROM user_tables;")]
-            
-            for tableName in tableNames:
-                table = {'Name': tableName, 'Description': ''}
-                layout = []
-                
-                # Get all columns
-                columns = db.execute(f"""
-                    SELECT column_name, data_type, nullable 
-                    FROM user_tab_columns 
-                    WHERE table_name = '{tableName}'
-                    ORDER BY column_id;
-                """)
-                
-                # Get primary key
-                pk_result = db.execute(f"""
-                    SELECT cols.column_name 
-                    FROM user_constraints cons
-                    JOIN user_cons_columns cols ON cons.constraint_name = cols.constraint_name
-                    WHERE cons.table_name = '{tableName}'
-                    AND cons.constraint_type = 'P';
-                """)
-                pk_columns = [row[0] for row in pk_result]
-                
-                # Get all constraints for the table
-                constraints = db.execute(f"""
-                    SELECT c.constraint_name, c.constraint_type, c.search_condition, 
-                           cols.column_name, c.r_constraint_name
-                    FROM user_constraints c
-                    LEFT JOIN user_cons_columns cols ON c.constraint_name = cols.constraint_name
-                    WHERE c.table_name = '{tableName}'
-                    ORDER BY c.constraint_name;
-                """)
-                
-                # Organize constraints by column
-                constraint_map = {col[0]: [] for col in columns}
-                for const in constraints:
-                    const_name, const_type, condition, col_name, r_constraint = const
-                    
-                    if const_type == 'P':
-                        continue  # Already handled with pk_columns
-                    elif const_type == 'R':  # Foreign key
-                        ref_table_result = db.execute(f"""
-                            SELECT table_name 
-                            FROM user_constraints 
-                            WHERE constraint_name = '{r_constraint}';
-                        """)
-                        if ref_table_result:
-                            ref_table = ref_table_result[0][0]
-                            constraint_map[col_name].append(
-                                f"FOREIGN KEY REFERENCES {ref_table}({col_name})"
-                            )
-                    elif const_type == 'U':  # Unique
-                        constraint_map[col_name].append("UNIQUE")
-                    elif const_type == 'C':  # Check
-                        if condition:
-                            constraint_map[col_name].append(f"CHECK ({condition})")
-                    elif const_type == 'O':  # Read only
-                        constraint_map[col_name].append("READ ONLY")
-                
-                # Build column structures
-                for col_name, data_type, nullable in columns:
-                    struct = {
-                        'Name': col_name,
-                        'Type': data_type,
-                        'Description': '',
-                        'Properties': {
-                            'isPrimaryKey': col_name in pk_columns,
-                            'Foreign_Reference': '',
-                            'Constraints': constraint_map.get(col_name, [])
-                        }
-                    }
-                    
-                    # Add NOT NULL if applicable
-                    if nullable == 'N':
-                        struct['Properties']['Constraints'].append("NOT NULL")
-                    
-                    layout.append(struct)
-                
-                table['Layout'] = layout
-                tables.append(table)
-
-        elif flavor.lower() == 'postgres':
-            # Get all user tables
-            tableNames = [row[0] for row in db.execute("""
-                SELECT table_name 
-                FROM information_schema.tables 
-                WHERE table_schema NOT IN ('pg_catalog', 'information_schema')
-                AND table_type = 'BASE TABLE';
-            """)]
-            
-            for tableName in tableNames:
-                table = {'Name': tableName, 'Description': ''}
-                layout = []
-                
-                # Get all columns with nullability
-                columns = db.execute(f"""
-                    SELECT column_name, data_type, is_nullable 
-                    FROM information_schema.columns 
-                    WHERE table_name = '{tableName}'
-                    ORDER BY ordinal_position;
-                """)
-                
-                # Get primary key
-                pk_result = db.execute(f"""
-                    SELECT a.attname
-                    FROM pg_index i
-                    JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
-                    WHERE i.indrelid = '{tableName}'::regclass
-                    AND i.indisprimary;
-                """)
-                pk_columns = [row[0] for row in pk_result]
-                
-                # Get all constraints for the table
-                constraints = db.execute(f"""
-                    SELECT con.conname, con.contype, pg_get_constraintdef(con.oid),
-                           a.attname, confrelid::regclass
-                    FROM pg_constraint con
-                    JOIN pg_class cl ON cl.oid = con.conrelid
-                    LEFT JOIN pg_attribute a ON a.attnum = ANY(con.conkey) AND a.attrelid = con.conrelid
-                    WHERE cl.relname = '{tableName}'
-                    ORDER BY con.conname;
-                """)
-                
-                # Organize constraints by column
-                constraint_map = {col[0]: [] for col in columns}
-                for const in constraints:
-                    const_name, const_type, const_def, col_name, ref_table = const
-                    
-                    if const_type == 'p':
-                        continue  # Primary key already handled
-                    elif const_type == 'f':  # Foreign key
-                        if col_name:
-                            constraint_map[col_name].append(
-                                f"FOREIGN KEY {const_def.split('FOREIGN KEY')[1]}"
-                            )
-                    elif const_type == 'u':  # Unique
-                        if col_name:
-                            constraint_map[col_name].append("UNIQUE")
-                    elif const_type == 'c':  # Check
-                        if col_name:
-                            constraint_map[col_name].append(const_def)
-                
-                # Build column structures
-                for col_name, data_type, is_nullable in columns:
-                    struct = {
-                        'Name': col_name,
-                        'Type': data_type,
-                        'Description': '',
-                        'Properties': {
-                            'isPrimaryKey': col_name in pk_columns,
-                            'Foreign_Reference': '',
-                            'Constraints': constraint_map.get(col_name, [])
-                        }
-                    }
-                    
-                    # Add NOT NULL if applicable
-                    if is_nullable == 'NO':
-                        struct['Properties']['Constraints'].append("NOT NULL")
-                    
-                    layout.append(struct)
-                
-                table['Layout'] = layout
-                tables.append(table)
-
-        else:
+        if flavor.lower() not in CATALOG_QUERIES:
             raise ValueError(f"Unsupported SQL flavor: {flavor}")
 
+        # Introspect every table over a single connection
+        with db.connection() as conn:
+            cursor = conn.cursor()
+            tables = _introspect(cursor, flavor.lower())
+            cursor.close()
+
     except Exception as e:
         raise RuntimeError(f"Error generating schema: {str(e)}")
 
@@ -285,6 +147,368 @@ def settingsFromDB(flavor: str, connection: dict[str]) -> dict:
     }
 
 
+# Set-based catalog queries, each fetching every table at once. {filter} narrows them to a subset of tables
+CATALOG_QUERIES = {
+    'oracle': {
+        'tables': ("""
+            SELECT table_name
+            FROM user_tables
+            WHERE 1 = 1 {filter}
+            ORDER BY table_name
+        """, 'table_name'),
+        'columns': ("""
+            SELECT table_name, column_name, data_type, nullable
+            FROM user_tab_columns
+            WHERE 1 = 1 {filter}
+            ORDER BY table_name, column_id
+        """, 'table_name'),
+        'constraints': ("""
+            SELECT c.table_name, c.constraint_type, c.search_condition,
+                   cols.column_name, ref.table_name, ref_cols.column_name
+            FROM user_constraints c
+            LEFT JOIN user_cons_columns cols ON c.constraint_name = cols.constraint_name
+            LEFT JOIN user_constraints ref ON ref.constraint_name = c.r_constraint_name
+            LEFT JOIN user_cons_columns ref_cols ON ref_cols.constraint_name = c.r_constraint_name
+                                                AND ref_cols.position = cols.position
+            WHERE 1 = 1 {filter}
+            ORDER BY c.table_name, c.constraint_name
+        """, 'c.table_name')
+    },
+    'postgres': {
+        'tables': ("""
+            SELECT table_name
+            FROM information_schema.tables
+            WHERE table_schema NOT IN ('pg_catalog', 'information_schema')
+            AND table_type = 'BASE TABLE' {filter}
+            ORDER BY table_name
+        """, 'table_name'),
+        'columns': ("""
+            SELECT table_name, column_name, data_type, is_nullable
+            FROM information_schema.columns
+            WHERE table_schema NOT IN ('pg_catalog', 'information_schema') {filter}
+            ORDER BY table_name, ordinal_position
+        """, 'table_name'),
+        'constraints': ("""
+            SELECT cl.relname, con.contype, pg_get_constraintdef(con.oid),
+                   a.attname, con.confrelid::regclass, NULL
+            FROM pg_constraint con
+            JOIN pg_class cl ON cl.oid = con.conrelid
+            JOIN pg_namespace n ON n.oid = cl.relnamespace
+            LEFT JOIN pg_attribute a ON a.attnum = ANY(con.conkey) AND a.attrelid = con.conrelid
+            WHERE n.nspname NOT IN ('pg_catalog', 'information_schema') {filter}
+            ORDER BY cl.relname, con.conname
+        """, 'cl.relname')
+    },
+    # Uses Oracle's constraint codes and nullable flags so both are read the same way
+    'sqlite': {
+        'tables': ("""
+            SELECT name
+            FROM sqlite_master
+            WHERE type = 'table' AND name NOT LIKE 'sqlite_%' {filter}
+            ORDER BY name
+        """, 'name'),
+        'columns': ("""
+            SELECT m.name, p.name, p.type, CASE WHEN p."notnull" THEN 'N' ELSE 'Y' END
+            FROM sqlite_master m
+            JOIN pragma_table_info(m.name) p
+            WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%' {filter}
+            ORDER BY m.name, p.cid
+        """, 'm.name'),
+        'constraints': ("""
+            SELECT m.name, 'P', NULL, p.name, NULL, NULL
+            FROM sqlite_master m
+            JOIN pragma_table_info(m.name) p
+            WHERE m.type = 'table' AND p.pk > 0 {filter}
+            UNION ALL
+            SELECT m.name, 'R', NULL, f."from", f."table", f."to"
+            FROM sqlite_master m
+            JOIN pragma_foreign_key_list(m.name) f
+            WHERE m.type = 'table' {filter}
+            UNION ALL
+            SELECT m.name, 'U', NULL, i.name, NULL, NULL
+            FROM sqlite_master m
+            JOIN pragma_index_list(m.name) l
+            JOIN pragma_index_info(l.name) i
+            WHERE m.type = 'table' AND l.origin = 'u' {filter}
+        """, 'm.name')
+    }
+}
+
+
+def _catalogQuery(cursor, flavor: str, name: str, tableNames: list[str] = None) -> list:
+    """
+    Run one of CATALOG_QUERIES, optionally restricted to tableNames through bind variables
+
+    Args:
+        cursor: Open cursor to run the query on
+        flavor (str): Database flavor - 'oracle', 'postgres' or 'sqlite'
+        name (str): Key of the query in CATALOG_QUERIES
+        tableNames (list[str]): Only return rows for these tables. If None, return rows for all tables
+    """
+
+    sql, column = CATALOG_QUERIES[flavor][name]
+
+    if tableNames == None:
+        cursor.execute(sql.format(filter=''))
+        return cursor.fetchall()
+
+    if flavor == 'postgres':
+        cursor.execute(sql.format(filter=f"AND {column} = ANY(%(tables)s)"), {'tables': list(tableNames)})
+        return cursor.fetchall()
+
+    # Oracle allows at most 1000 expressions in an IN list (named binds work the same on SQLite)
+    rows = []
+    tableNames = list(tableNames)
+
+    for start in range(0, len(tableNames), 1000):
+        chunk = tableNames[start:start + 1000]
+        binds = ', '.join(f":t{i}" for i in range(len(chunk)))
+
+        cursor.execute(sql.format(filter=f"AND {column} IN ({binds})"), {f"t{i}": tableName for i, tableName in enumerate(chunk)})
+        rows.extend(cursor.fetchall())
+
+    return rows
+
+
+def _introspect(cursor, flavor: str, tableNames: list[str] = None) -> list[dict]:
+    """
+    Build the settings 'Tables' entries with a handful of catalog queries, assembling them in memory
+
+    Args:
+        cursor: Open cursor to run the catalog queries on
+        flavor (str): Database flavor - 'oracle', 'postgres' or 'sqlite'
+        tableNames (list[str]): Only introspect these tables. If None, introspect all user tables
+    """
+
+    if tableNames != None and len(tableNames) == 0:
+        return []
+
+    # Fetch catalog rows in large batches
+    cursor.arraysize = 1000
+
+    tableNames = [row[0] for row in _catalogQuery(cursor, flavor, 'tables', tableNames)]
+
+    columns = {tableName: [] for tableName in tableNames}
+    for tableName, col_name, data_type, nullable in _catalogQuery(cursor, flavor, 'columns', tableNames):
+        if tableName in columns:
+            columns[tableName].append((col_name, data_type, nullable))
+
+    # Organize constraints by table and column
+    pk_columns = {tableName: set() for tableName in tableNames}
+    constraint_map = {tableName: {col[0]: [] for col in columns[tableName]} for tableName in tableNames}
+
+    for tableName, const_type, const_def, col_name, ref_table, ref_column in _catalogQuery(cursor, flavor, 'constraints', tableNames):
+        if tableName not in constraint_map or col_name not in constraint_map[tableName]:
+            continue
+
+        column_constraints = constraint_map[tableName][col_name]
+
+        if flavor in ('oracle', 'sqlite'):
+            if const_type == 'P':
+                pk_columns[tableName].add(col_name)
+            elif const_type == 'R':  # Foreign key
+                if ref_table:
+                    column_constraints.append(f"FOREIGN KEY REFERENCES {ref_table}({ref_column or col_name})")
+            elif const_type == 'U':  # Unique
+                column_constraints.append("UNIQUE")
+            elif const_type == 'C':  # Check
+                if const_def:
+                    column_constraints.append(f"CHECK ({const_def})")
+            elif const_type == 'O':  # Read only
+                column_constraints.append("READ ONLY")
+
+        else:
+            if const_type == 'p':
+                pk_columns[tableName].add(col_name)
+            elif const_type == 'f':  # Foreign key
+                column_constraints.append(f"FOREIGN KEY {const_def.split('FOREIGN KEY')[1]}")
+            elif const_type == 'u':  # Unique
+                column_constraints.append("UNIQUE")
+            elif const_type == 'c':  # Check
+                column_constraints.append(const_def)
+
+    # Build table structures
+    tables = []
+    notNull = 'NO' if flavor == 'postgres' else 'N'
+
+    for tableName in tableNames:
+        layout = []
+
+        for col_name, data_type, nullable in columns[tableName]:
+            struct = {
+                'Name': col_name,
+                'Type': data_type,
+                'Description': '',
+                'Properties': {
+                    'isPrimaryKey': col_name in pk_columns[tableName],
+                    'Foreign_Reference': '',
+                    'Constraints': constraint_map[tableName][col_name]
+                }
+            }
+
+            # Add NOT NULL if applicable
+            if nullable == notNull:
+                struct['Properties']['Constraints'].append("NOT NULL")
+
+            layout.append(struct)
+
+        tables.append({'Name': tableName, 'Description': '', 'Layout': layout})
+
+    return tables
+
+
+# Incremental refresh
+def refreshSettingsFromDBPath(flavor: str, settingsPath: str = "./settings.json", envPath: str = 'env_data.env', snapshotPath: str = None) -> dict:
+    """
+    Incrementally refresh an exported settings JSON from the database, see refreshSettingsFromDB
+
+    Args:
+        flavor (str): SQL flavor. Currently only 'oracle', 'postgres' or 'sqlite' available
+        settingsPath (str): Path of settings/JSON file to refresh (created if missing)
+        envPath (str): Environment variables .env file path to process connection string
+        snapshotPath (str): Path of the schema snapshot. Defaults to the settings path with a '.snapshot.json' extension
+    """
+
+    return refreshSettingsFromDB(flavor, _connectionFromEnv(flavor, envPath), settingsPath, snapshotPath)
+
+
+# NOTE: Might have to modify this if using other database provider
+def refreshSettingsFromDB(flavor: str, connection: dict[str], settingsPath: str = "./settings.json", snapshotPath: str = None) -> dict:
+    """
+    Incrementally refresh an exported settings JSON from the database
+
+    A snapshot of per-table DDL fingerprints is kept next to the settings. Only tables whose fingerprint changed
+    (or which are new) are re-introspected, dropped tables are removed, and every existing description is kept.
+    The result is written back with exportSettings.
+
+    Args:
+        flavor (str): Database flavor - 'oracle', 'postgres' or 'sqlite'
+        connection (dict): Connection parameters
+        settingsPath (str): Path of settings/JSON file to refresh (created if missing)
+        snapshotPath (str): Path of the schema snapshot. Defaults to the settings path with a '.snapshot.json' extension
+    """
+
+    if snapshotPath == None:
+        snapshotPath = os.path.splitext(settingsPath)[0] + '.snapshot.json'
+
+    # Load previous state, if any
+    oldSettings = parseSettings(settingsPath) if os.path.exists(settingsPath) else None
+    oldFingerprints = {}
+
+    if oldSettings != None and os.path.exists(snapshotPath):
+        with open(snapshotPath, 'r') as file:
+            snapshot = json.load(file)
+
+        if snapshot.get('SQL_Flavor') == flavor.lower():
+            oldFingerprints = snapshot['Fingerprints']
+
+    oldTables = {table['Name']: table for table in oldSettings['Tables']} if oldSettings != None else {}
+
+    db = Database(connection, flavor)
+
+    try:
+        if flavor.lower() not in FINGERPRINT_QUERIES:
+            raise ValueError(f"Unsupported SQL flavor: {flavor}")
+
+        with db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.arraysize = 1000
+
+            # Fingerprint every table in one query and re-introspect only what changed
+            cursor.execute(FINGERPRINT_QUERIES[flavor.lower()])
+            fingerprints = {tableName: str(fingerprint) for tableName, fingerprint in cursor.fetchall()}
+
+            changed = [tableName for tableName, fingerprint in fingerprints.items() if tableName not in oldTables or oldFingerprints.get(tableName) != fingerprint]
+            fresh = {table['Name']: table for table in _introspect(cursor, flavor.lower(), changed)}
+
+            cursor.close()
+
+    except Exception as e:
+        raise RuntimeError(f"Error refreshing schema: {str(e)}")
+
+    # Keep existing table order, then append new tables
+    tables = [fresh.get(tableName, table) for tableName, table in oldTables.items() if tableName in fingerprints]
+    tables.extend(table for tableName, table in fresh.items() if tableName not in oldTables)
+
+    settings = {
+        'Server_Name': oldSettings['Server_Name'] if oldSettings else '',
+        'Server_Description': oldSettings['Server_Description'] if oldSettings else '',
+        'SQL_Flavor': oldSettings['SQL_Flavor'] if oldSettings else flavor.capitalize(),
+        'Tables': tables
+    }
+
+    if oldSettings != None:
+        settings = mergeDescriptions(oldSettings, settings)
+
+    # Save settings and snapshot for next refresh
+    exportSettings(settings, settingsPath)
+
+    with open(snapshotPath, 'w+') as file:
+        json.dump({'SQL_Flavor': flavor.lower(), 'Fingerprints': {table['Name']: fingerprints[table['Name']] for table in tables}}, file, indent='\t')
+
+    return settings
+
+
+# Per-table DDL fingerprints, changing whenever a table's columns or constraints change
+FINGERPRINT_QUERIES = {
+    'oracle': """
+        SELECT object_name, TO_CHAR(last_ddl_time, 'YYYY-MM-DD HH24:MI:SS')
+        FROM user_objects
+        WHERE object_type = 'TABLE'
+        AND object_name NOT LIKE 'BIN$%'
+    """,
+    'postgres': """
+        SELECT cl.relname, md5(concat_ws('|',
+            (SELECT string_agg(a.attname || ' ' || format_type(a.atttypid, a.atttypmod) || ' ' || a.attnotnull::text, ',' ORDER BY a.attnum)
+             FROM pg_attribute a
+             WHERE a.attrelid = cl.oid AND a.attnum > 0 AND NOT a.attisdropped),
+            (SELECT string_agg(con.conname || ' ' || pg_get_constraintdef(con.oid), ',' ORDER BY con.conname)
+             FROM pg_constraint con
+             WHERE con.conrelid = cl.oid)
+        ))
+        FROM pg_class cl
+        JOIN pg_namespace n ON n.oid = cl.relnamespace
+        WHERE cl.relkind IN ('r', 'p')
+        AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+    """,
+    'sqlite': """
+        SELECT name, sql
+        FROM sqlite_master
+        WHERE type = 'table' AND name NOT LIKE 'sqlite_%'
+    """
+}
+
+
+# Keep hand-written descriptions
+def mergeDescriptions(oldSettings: dict, newSettings: dict) -> dict:
+    """
+    Copy table and column descriptions from old settings into new settings wherever the new ones are empty
+
+    Args:
+        oldSettings (dict): Settings dictionary with descriptions to keep
+        newSettings (dict): Settings dictionary to fill in (modified in place and returned)
+    """
+
+    oldTables = {table['Name']: table for table in oldSettings['Tables']}
+
+    for table in newSettings['Tables']:
+        oldTable = oldTables.get(table['Name'])
+
+        if oldTable == None:
+            continue
+
+        if not table.get('Description'):
+            table['Description'] = oldTable.get('Description', '')
+
+        oldColumns = {column['Name']: column for column in oldTable.get('Layout', [])}
+
+        for column in table.get('Layout', []):
+            if not column.get('Description') and column['Name'] in oldColumns:
+                column['Description'] = oldColumns[column['Name']].get('Description', '')
+
+    return newSettings
+
+
 # AI Settings
 def settingsWithAIPath(details: str, envPath: str) -> dict:
     """
@@ -295,6 +519,7 @@ def settingsWithAIPath(details: str, envPath: str) -> dict:
     """
 
     # Load environment variables
+    from dotenv import load_dotenv
     load_dotenv(envPath)
 
     # Process
@@ -338,35 +563,123 @@ def parseSettings(settingsPath: str) -> dict:
         settingsPath (str): Path of settings/JSON file
     """
 
-    with open(settingsPath, 'r+') as file:
-        return json.loads('\n'.join(file.readlines()))
+    with open(settingsPath, 'r') as file:
+        return json.load(file)
+
+
+# Compiled settings
+def loadSettings(settingsPath: str, compiledPath: str = None) -> CompiledSettings:
+    """
+    Open settings through their compiled, memory-mapped form, (re)compiling it first if the JSON changed
+
+    Only the table index is read up front, tables are decoded as they are asked for. Use .toSettings() for a settings
+    dictionary, optionally with only some tables.
+
+    Args:
+        settingsPath (str): Path of settings/JSON file
+        compiledPath (str): Path of the compiled file. Defaults to the settings path with a '.compiled' extension
+    """
+
+    return CompiledSettings(settingsPath, compiledPath)
+
+
+# Indexed view of settings
+def catalog(settings: dict | SchemaCatalog | CompiledSettings) -> SchemaCatalog | CompiledSettings:
+    """
+    Build a SchemaCatalog of settings, for many lookups of the same settings. Catalogs and compiled settings are returned
+    as they are
+
+    The catalog is a snapshot: build a new one after changing the settings dictionary.
+
+    Args:
+        settings (dict | SchemaCatalog | CompiledSettings): Settings dictionary, catalog or compiled settings
+    """
+
+    if not isinstance(settings, dict):
+        return settings
+
+    return SchemaCatalog(settings)
 
 
 # Find table from name
-def findTable(settings: dict, tableName: str) -> dict:
+def findTable(settings: dict | SchemaCatalog | CompiledSettings, tableName: str) -> dict:
     """
-    Find table in settings given tableName, returning table dictionary
+    Find table in settings given tableName, returning table dictionary. Raises a KeyError if there is none
+
+    Names are matched exactly if possible, otherwise case insensitively. For a settings dictionary, the table dictionary
+    in it is returned, so changes to it change the settings. Catalogs and compiled settings give a copy.
+
+    Lookups in a settings dictionary go through an index of its table names, built on first use and checked against the
+    table found, so changes made to the settings in place are still seen. Only missing tables, and the first lookup after
+    tables are added, removed, renamed or moved, cost a scan.
 
     Args:
-        settings (dict): Settings dictionary
+        settings (dict | SchemaCatalog | CompiledSettings): Settings dictionary, catalog or compiled settings
         tableName (str): Name of table
     """
 
-    table = [i for i in settings['Tables'] if i['Name'] == tableName][0]
+    if not isinstance(settings, dict):
+        return settings.table(tableName).toDict()
+
+    tables = settings['Tables']
+
+    for rebuild in (False, True):
+        exact, lowered = _tableIndex(tables, rebuild)
+
+        # Checked against the table found, as tables may have been renamed or moved since the index was built
+        index = exact.get(tableName)
+
+        if index != None and tables[index]['Name'] == tableName:
+            return tables[index]
+
+        index = lowered.get(tableName.lower())
+
+        if index != None and tables[index]['Name'].lower() == tableName.lower():
+            return tables[index]
 
-    return table
+    raise KeyError(f"No table named '{tableName}'")
+
+
+def _tableIndex(tables: list[dict], rebuild: bool) -> tuple[dict, dict]:
+    # Exact and lowercase name indexes of a 'Tables' list, cached by its identity. The first table of a name wins, as a scan would
+    with _TABLE_INDEXES_LOCK:
+        entry = _TABLE_INDEXES.get(id(tables))
+
+        # Rebuilt once tables are added or removed, so a table added with the exact name is not missed for a case insensitive match
+        if entry != None and entry[0] is tables and entry[1] == len(tables) and not rebuild:
+            _TABLE_INDEXES.move_to_end(id(tables))
+            return entry[2], entry[3]
+
+    exact, lowered = {}, {}
+
+    for index, table in enumerate(tables):
+        exact.setdefault(table['Name'], index)
+        lowered.setdefault(table['Name'].lower(), index)
+
+    with _TABLE_INDEXES_LOCK:
+        # The list is held, so its id cannot be reused by another list while cached
+        _TABLE_INDEXES[id(tables)] = (tables, len(tables), exact, lowered)
+        _TABLE_INDEXES.move_to_end(id(tables))
+
+        while len(_TABLE_INDEXES) > _TABLE_INDEXES_SIZE:
+            _TABLE_INDEXES.popitem(last=False)
+
+    return exact, lowered
 
 
 # Get all tables
-def getAllTables(settings: dict) -> list[str]:
+def getAllTables(settings: dict | SchemaCatalog | CompiledSettings) -> list[str]:
     """
     Get a list of all tables available
 
     Args:
-        settings (dict): Settings dictionary
+        settings (dict | SchemaCatalog | CompiledSettings): Settings dictionary, catalog or compiled settings
     """
 
-    return [i['Name'] for i in settings['Tables']]
+    if not isinstance(settings, dict):
+        return list(settings.names())
+
+    return [table['Name'] for table in settings['Tables']]
 
 
 # EXAMPLE SETTINGS/TEMPLATE
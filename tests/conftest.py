@@ -0,0 +1,83 @@
+import copy
+import os
+import sqlite3
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'src')]
+
+from src import SmartSQL
+
+
+# Placeholder keys, nothing is sent to Azure when a backend is given
+KEYS = {
+	'AZURE_OPENAI_API_KEY': 'key',
+	'AZURE_OPENAI_API_VERSION': '2024-06-01',
+	'AZURE_OPENAI_ENDPOINT': 'https://example.openai.azure.com',
+	'AZURE_OPENAI_DEPLOYMENT_NAME': 'deployment',
+	'DB_USER': 'user',
+	'DB_PASSWORD': 'password'
+}
+
+CUSTOMERS = 5
+ORDERS = 23
+
+
+def column(name: str, type: str, description: str = '', isPrimaryKey: bool = False, constraints: list[str] = None) -> dict:
+	return {'Name': name, 'Type': type, 'Description': description, 'Properties': {'isPrimaryKey': isPrimaryKey, 'Foreign_Reference': '', 'Constraints': constraints or []}}
+
+SETTINGS = {
+	'Server_Name': 'Shop',
+	'Server_Description': 'a small shop',
+	'SQL_Flavor': 'SQLite',
+	'Tables': [
+		{
+			'Name': 'CUSTOMERS',
+			'Description': 'People who buy',
+			'Layout': [
+				column('CUSTOMER_ID', 'INTEGER', isPrimaryKey=True),
+				column('NAME', 'TEXT', 'Full name'),
+				column('REGION', 'INTEGER')
+			]
+		},
+		{
+			'Name': 'ORDERS',
+			'Description': 'Orders placed',
+			'Layout': [
+				column('ORDER_ID', 'INTEGER', isPrimaryKey=True),
+				column('CUSTOMER_ID', 'INTEGER', constraints=['FOREIGN KEY REFERENCES CUSTOMERS(CUSTOMER_ID)']),
+				column('TOTAL', 'REAL')
+			]
+		}
+	]
+}
+
+
+@pytest.fixture
+def settings() -> dict:
+	return copy.deepcopy(SETTINGS)
+
+@pytest.fixture
+def databasePath(tmp_path) -> str:
+	# SQLite file holding the tables of SETTINGS
+	path = str(tmp_path / 'shop.db')
+	connection = sqlite3.connect(path)
+
+	connection.execute("CREATE TABLE CUSTOMERS (CUSTOMER_ID INTEGER PRIMARY KEY, NAME TEXT, REGION INTEGER)")
+	connection.execute("CREATE TABLE ORDERS (ORDER_ID INTEGER PRIMARY KEY, CUSTOMER_ID INTEGER REFERENCES CUSTOMERS(CUSTOMER_ID), TOTAL REAL)")
+	connection.executemany("INSERT INTO CUSTOMERS VALUES (?, ?, ?)", [(i, f"Customer {i}", i % 2) for i in range(CUSTOMERS)])
+	connection.executemany("INSERT INTO ORDERS VALUES (?, ?, ?)", [(i, i % CUSTOMERS, i * 1.5) for i in range(ORDERS)])
+	connection.commit()
+	connection.close()
+
+	return path
+
+@pytest.fixture
+def makeSmartSQL(settings, databasePath):
+	# SmartSQL on the SQLite file, taking any other SmartSQL arguments
+	def make(**options) -> SmartSQL:
+		return SmartSQL(options.pop('settings', settings), 'sqlite', confirmExecute=False, DB_PATH=databasePath, **KEYS, **options)
+
+	return make
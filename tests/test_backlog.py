@@ -0,0 +1,204 @@
+import copy
+
+import pytest
+
+from Helpers.backlog import Backlog
+from Helpers.tokens import estimateTokens
+
+
+def table(backlog: Backlog, name: str) -> dict:
+	return next(table for table in backlog.settings['Tables'] if table['Name'] == name)
+
+def columns(backlog: Backlog, name: str) -> dict:
+	return {column['Name']: (column['Type'], column['Properties']['isPrimaryKey'], column['Properties']['Constraints']) for column in table(backlog, name)['Layout']}
+
+def names(backlog: Backlog) -> list[str]:
+	return [table['Name'] for table in backlog.settings['Tables']]
+
+def testDropsDataStatements(settings):
+	backlog = Backlog(settings)
+	backlog.append("SELECT * FROM CUSTOMERS; INSERT INTO CUSTOMERS VALUES (9, 'Lee', 1); COMMIT")
+
+	assert list(backlog) == []
+	assert backlog.settings is settings
+
+def testCreateTable(settings):
+	backlog = Backlog(settings)
+	backlog.append("""
+		CREATE TABLE IF NOT EXISTS shop."PRODUCTS" (
+			PRODUCT_ID NUMBER(10),
+			NAME VARCHAR2(50) UNIQUE NOT NULL,
+			PRICE NUMBER(8, 2) CHECK (PRICE > (0)),
+			CUSTOMER_ID NUMBER REFERENCES CUSTOMERS,
+			CONSTRAINT PRODUCTS_PK PRIMARY KEY (PRODUCT_ID)
+		)
+	""")
+
+	assert list(backlog) == []
+	assert names(backlog) == ['CUSTOMERS', 'ORDERS', 'PRODUCTS']
+	assert columns(backlog, 'PRODUCTS') == {
+		'PRODUCT_ID': ('NUMBER(10)', True, ['NOT NULL']),
+		'NAME': ('VARCHAR2(50)', False, ['UNIQUE', 'NOT NULL']),
+		'PRICE': ('NUMBER(8, 2)', False, ['CHECK (PRICE > (0))']),
+		'CUSTOMER_ID': ('NUMBER', False, ['FOREIGN KEY REFERENCES CUSTOMERS(CUSTOMER_ID)'])
+	}
+
+def testCreateTableReplacesExisting(settings):
+	backlog = Backlog(settings)
+	backlog.append("CREATE TABLE customers (ID INTEGER PRIMARY KEY)")
+
+	assert names(backlog) == ['customers', 'ORDERS']
+	assert columns(backlog, 'customers') == {'ID': ('INTEGER', True, ['NOT NULL'])}
+
+def testAlterAdd(settings):
+	backlog = Backlog(settings)
+	backlog.append("ALTER TABLE CUSTOMERS ADD EMAIL VARCHAR(100) NOT NULL")
+	backlog.append("ALTER TABLE CUSTOMERS ADD COLUMN IF NOT EXISTS PHONE TEXT, ADD (CITY TEXT, ZIP CHAR(5))")
+	backlog.append("ALTER TABLE ORDERS ADD CONSTRAINT ORDERS_FK FOREIGN KEY (CUSTOMER_ID) REFERENCES CUSTOMERS (CUSTOMER_ID)")
+
+	assert list(backlog) == []
+	assert list(columns(backlog, 'CUSTOMERS')) == ['CUSTOMER_ID', 'NAME', 'REGION', 'EMAIL', 'PHONE', 'CITY', 'ZIP']
+	assert columns(backlog, 'CUSTOMERS')['EMAIL'] == ('VARCHAR(100)', False, ['NOT NULL'])
+	assert columns(backlog, 'CUSTOMERS')['ZIP'] == ('CHAR(5)', False, [])
+	assert columns(backlog, 'ORDERS')['CUSTOMER_ID'][2] == ['FOREIGN KEY REFERENCES CUSTOMERS(CUSTOMER_ID)'] * 2
+
+def testAlterDrop(settings):
+	backlog = Backlog(settings)
+	backlog.append("ALTER TABLE CUSTOMERS DROP COLUMN region")
+	backlog.append("ALTER TABLE ORDERS DROP (TOTAL, \"CUSTOMER_ID\")")
+
+	assert list(columns(backlog, 'CUSTOMERS')) == ['CUSTOMER_ID', 'NAME']
+	assert list(columns(backlog, 'ORDERS')) == ['ORDER_ID']
+
+def testAlterModify(settings):
+	backlog = Backlog(settings)
+	backlog.append("ALTER TABLE CUSTOMERS MODIFY NAME VARCHAR2(200) NOT NULL")
+	backlog.append("ALTER TABLE CUSTOMERS MODIFY (NAME NULL, REGION NUMBER(3) UNIQUE)")
+
+	assert columns(backlog, 'CUSTOMERS')['NAME'] == ('VARCHAR2(200)', False, [])
+	assert columns(backlog, 'CUSTOMERS')['REGION'] == ('NUMBER(3)', False, ['UNIQUE'])
+
+def testAlterColumn(settings):
+	backlog = Backlog(settings)
+	backlog.append("ALTER TABLE ORDERS ALTER COLUMN TOTAL SET DATA TYPE NUMERIC(10, 2) USING TOTAL::NUMERIC, ALTER TOTAL SET NOT NULL")
+
+	assert columns(backlog, 'ORDERS')['TOTAL'] == ('NUMERIC(10, 2)', False, ['NOT NULL'])
+
+	backlog.append("ALTER TABLE ORDERS ALTER COLUMN TOTAL DROP NOT NULL, ALTER COLUMN TOTAL SET DEFAULT 0")
+
+	assert columns(backlog, 'ORDERS')['TOTAL'] == ('NUMERIC(10, 2)', False, [])
+
+def testRename(settings):
+	backlog = Backlog(settings)
+	backlog.append("ALTER TABLE CUSTOMERS RENAME COLUMN NAME TO FULL_NAME")
+	backlog.append("ALTER TABLE CUSTOMERS RENAME TO CLIENTS")
+	backlog.append("RENAME ORDERS TO PURCHASES")
+
+	assert list(backlog) == []
+	assert names(backlog) == ['CLIENTS', 'PURCHASES']
+	assert list(columns(backlog, 'CLIENTS')) == ['CUSTOMER_ID', 'FULL_NAME', 'REGION']
+
+def testDropTable(settings):
+	backlog = Backlog(settings)
+	backlog.append("DROP TABLE IF EXISTS orders CASCADE")
+	backlog.append("DROP TABLE MISSING")
+
+	assert list(backlog) == []
+	assert names(backlog) == ['CUSTOMERS']
+
+def testFoldingLeavesBaseSettings(settings):
+	original = copy.deepcopy(settings)
+	backlog = Backlog(settings)
+	backlog.append("ALTER TABLE CUSTOMERS ADD EMAIL TEXT; ALTER TABLE CUSTOMERS RENAME COLUMN NAME TO FULL_NAME; DROP TABLE ORDERS")
+
+	assert settings == original
+	assert backlog.baseSettings is settings
+
+def testUnknownStatementsKeptVerbatim(settings):
+	backlog = Backlog(settings)
+	statements = [
+		"CREATE INDEX IDX_ORDERS ON ORDERS (CUSTOMER_ID)",
+		"ALTER TABLE MISSING ADD EMAIL TEXT",
+		"ALTER TABLE CUSTOMERS RENAME COLUMN MISSING TO OTHER",
+		"CREATE VIEW BIG_ORDERS AS SELECT * FROM ORDERS WHERE TOTAL > 10"
+	]
+
+	backlog.append(';\n'.join(statements + ["ALTER TABLE CUSTOMERS ADD EMAIL TEXT"]))
+
+	assert list(backlog) == statements
+	assert 'EMAIL' in columns(backlog, 'CUSTOMERS')
+
+def testWithoutSettingsKeepsText():
+	backlog = Backlog()
+	backlog.append("CREATE TABLE PRODUCTS (PRODUCT_ID INTEGER); SELECT 1")
+
+	assert list(backlog) == ['CREATE TABLE PRODUCTS (PRODUCT_ID INTEGER)']
+	assert backlog.settings == None
+
+def testPlSqlBlockKeptWhole(settings):
+	backlog = Backlog(settings)
+	block = "BEGIN\n  EXECUTE IMMEDIATE 'DROP TABLE ORDERS';\nEND;"
+	backlog.append(block)
+
+	assert list(backlog) == [block]
+	assert names(backlog) == ['CUSTOMERS', 'ORDERS']
+
+def testPopAfterFold(settings):
+	backlog = Backlog(settings)
+	backlog.append("CREATE INDEX IDX_NAME ON CUSTOMERS (NAME)")
+
+	folded, version = backlog.settings, backlog.version
+	backlog.append("ALTER TABLE CUSTOMERS ADD EMAIL TEXT; CREATE INDEX IDX_EMAIL ON CUSTOMERS (EMAIL)")
+
+	assert backlog.version != version
+	assert backlog.pop() == 'CREATE INDEX IDX_EMAIL ON CUSTOMERS (EMAIL)'
+	assert backlog.settings is folded
+	assert backlog.version == version
+	assert list(backlog) == ['CREATE INDEX IDX_NAME ON CUSTOMERS (NAME)']
+
+	backlog.append("DROP TABLE ORDERS")
+	dropped = backlog.version
+	backlog.pop()
+
+	# Versions are never reused after a pop
+	backlog.append("DROP TABLE CUSTOMERS")
+
+	assert backlog.version not in (version, dropped)
+
+def testPopEmpty(settings):
+	backlog = Backlog(settings)
+
+	with pytest.raises(IndexError):
+		backlog.pop()
+
+def testClear(settings):
+	backlog = Backlog(settings)
+	backlog.append("DROP TABLE ORDERS; CREATE INDEX IDX_NAME ON CUSTOMERS (NAME)")
+	backlog.clear()
+
+	assert backlog.settings is settings
+	assert list(backlog) == []
+
+def testBudgetEviction():
+	backlog = Backlog(tokenBudget=100)
+	statements = [f"CREATE INDEX IDX_ORDERS_{i} ON ORDERS (CUSTOMER_ID, ORDER_ID, TOTAL) TABLESPACE USERS COMPRESS" for i in range(40)]
+
+	for statement in statements:
+		backlog.append(statement)
+
+		assert estimateTokens('\n'.join(backlog.summary + backlog.entries)) <= backlog.tokenBudget
+
+	# Newest kept whole, older ones summarized by their head, oldest dropped
+	text = list(backlog)
+
+	assert text[-1] == statements[-1]
+	assert text[0].startswith('-- Earlier changes (details omitted): ')
+	assert text[0].endswith('; CREATE INDEX IDX_ORDERS_38 ON ORDERS')
+	assert 'IDX_ORDERS_0 ' not in text[0]
+	assert len(backlog) == 2
+
+def testBudgetSummarizesStatementOverBudget():
+	backlog = Backlog(tokenBudget=10)
+	backlog.append("CREATE INDEX IDX_ORDERS ON ORDERS (CUSTOMER_ID, ORDER_ID, TOTAL) TABLESPACE USERS COMPRESS PARALLEL 4")
+
+	assert list(backlog) == ['-- Earlier changes (details omitted): CREATE INDEX IDX_ORDERS ON ORDERS']
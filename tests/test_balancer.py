@@ -0,0 +1,51 @@
+import gc
+
+from Helpers import BalancedBackend, FakeBackend
+
+
+MESSAGES = [{'role': 'system', 'content': 'schema'}, {'role': 'user', 'content': 'customer names'}]
+
+
+def outstanding(balancer: BalancedBackend) -> list[int]:
+	return [deployment['outstanding'] for deployment in balancer.stats()]
+
+def testStreamReleasedWhenRead():
+	balancer = BalancedBackend([FakeBackend(name='a'), FakeBackend(name='b')])
+	response = balancer.stream(MESSAGES)
+
+	assert sum(outstanding(balancer)) == 1
+	assert ''.join(response['pieces']) == 'SELECT 1'
+	assert outstanding(balancer) == [0, 0]
+
+def testStreamReleasedWhenClosed():
+	balancer = BalancedBackend([FakeBackend(name='a')])
+	response = balancer.stream(MESSAGES)
+	response['pieces'].close()
+
+	assert outstanding(balancer) == [0]
+
+def testStreamReleasedWhenDropped():
+	balancer = BalancedBackend([FakeBackend(name='a')])
+
+	# Never iterated
+	balancer.stream(MESSAGES)
+	gc.collect()
+
+	# Dropped after the first piece
+	response = balancer.stream(MESSAGES)
+	next(response['pieces'])
+	del response
+	gc.collect()
+
+	assert outstanding(balancer) == [0]
+
+def testStreamReleasedOnce():
+	balancer = BalancedBackend([FakeBackend(name='a')])
+	response = balancer.stream(MESSAGES)
+
+	list(response['pieces'])
+	response['pieces'].close()
+	del response
+	gc.collect()
+
+	assert outstanding(balancer) == [0]
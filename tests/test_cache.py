@@ -0,0 +1,15 @@
+from Helpers.cache import ResponseCache
+
+
+def key(query: str) -> str:
+	return ResponseCache.key(query, 'system prompt', 'deployment')
+
+def testKeyNormalizesWhitespaceAndPunctuation():
+	assert key('  customers   named Alice?') == key('customers named Alice')
+
+def testKeyKeepsCase():
+	cache = ResponseCache()
+	cache.put(key('customers named Alice'), "SELECT * FROM CUSTOMERS WHERE NAME = 'Alice'")
+
+	assert cache.get(key('customers named alice')) == None
+	assert cache.get(key('customers named Alice')) == "SELECT * FROM CUSTOMERS WHERE NAME = 'Alice'"
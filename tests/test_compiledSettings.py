@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from Helpers import CompiledSettings, FakeBackend, SchemaCatalog, SchemaIndex
+
+
+@pytest.fixture
+def compiled(settings, tmp_path):
+	path = str(tmp_path / 'settings.json')
+
+	with open(path, 'w') as file:
+		json.dump(settings, file)
+
+	compiled = CompiledSettings(path)
+	yield compiled
+	compiled.close()
+
+
+def testLookupsWithoutDecoding(compiled, settings):
+	catalog = SchemaCatalog(settings)
+
+	assert compiled.tablesWithColumn('customer_id') == catalog.tablesWithColumn('customer_id') == ('CUSTOMERS', 'ORDERS')
+	assert compiled.references('orders') == catalog.references('orders') == (('CUSTOMER_ID', 'CUSTOMERS'),)
+	assert compiled.referencedBy('CUSTOMERS') == catalog.referencedBy('CUSTOMERS')
+	assert compiled.searchIndex().search('orders placed') == SchemaIndex(settings).search('orders placed')
+	assert compiled._records == {}
+
+	with pytest.raises(KeyError):
+		compiled.references('MISSING')
+
+def testSmartSQLDecodesRenderedTablesOnly(makeSmartSQL, compiled):
+	smartSQL = makeSmartSQL(settings=compiled, topK=1, expandJoins=False)
+
+	assert smartSQL.catalog is compiled and smartSQL.renderer.fragments == {}
+
+	smartSQL._buildPrompt('orders placed')
+
+	assert smartSQL.promptTables == ['ORDERS'] and list(smartSQL.renderer.fragments) == ['ORDERS']
+
+def testSmartSQLPromptsMatchDictionary(makeSmartSQL, compiled, settings):
+	fromCompiled = makeSmartSQL(settings=compiled, topK=1)
+	fromDictionary = makeSmartSQL(settings=settings, topK=1)
+
+	for query, table in (('orders placed', None), ('who buys', ['customers']), ('anything', ['ORDERS', 'CUSTOMERS'])):
+		assert fromCompiled._buildPrompt(query, table) == fromDictionary._buildPrompt(query, table)
+		assert fromCompiled.promptTokens == fromDictionary.promptTokens
+
+	# Full database
+	assert makeSmartSQL(settings=compiled)._buildPrompt('anything') == makeSmartSQL(settings=settings)._buildPrompt('anything')
+	assert makeSmartSQL(settings=compiled, schemaStyle='json')._buildPrompt('anything') == makeSmartSQL(settings=settings, schemaStyle='json')._buildPrompt('anything')
+
+def testBacklogFoldsIntoCompiledSettings(makeSmartSQL, compiled):
+	smartSQL = makeSmartSQL(settings=compiled, backend=FakeBackend({'add email': 'ALTER TABLE CUSTOMERS ADD EMAIL TEXT'}))
+
+	smartSQL.query('add email')
+
+	assert isinstance(smartSQL.backlog.settings, dict)
+	assert 'EMAIL' in smartSQL._buildPrompt('customer emails', ['CUSTOMERS'])
+
+	smartSQL.backlog.pop()
+
+	assert smartSQL.backlog.settings is compiled
+	assert 'EMAIL' not in smartSQL._buildPrompt('customer emails', ['CUSTOMERS']) and smartSQL.catalog is compiled
+
+def testUpdateSettingsToCompiled(makeSmartSQL, compiled):
+	smartSQL = makeSmartSQL()
+	session = smartSQL.session()
+
+	smartSQL.updateSettings(compiled)
+
+	assert smartSQL.catalog is compiled and smartSQL.settings is compiled
+	assert session._buildPrompt('orders placed', ['ORDERS']) == smartSQL._buildPrompt('orders placed', ['ORDERS'])
+	assert session.backlog.settings is compiled
@@ -0,0 +1,123 @@
+import pytest
+
+from Helpers import CostGuard, FakeBackend
+from Helpers.database import _oraclePlan, _postgresPlan
+
+
+CARTESIAN = 'SELECT NAME, TOTAL FROM CUSTOMERS, ORDERS'
+JOINED = 'SELECT NAME, TOTAL FROM CUSTOMERS c JOIN ORDERS o ON o.CUSTOMER_ID = c.CUSTOMER_ID'
+
+
+class Replies(FakeBackend):
+	# Gives each reply in turn, repeating the last
+	def __init__(self, *replies: str) -> None:
+		super().__init__()
+		self.replies = replies
+
+	def _response(self, messages: list[dict]) -> dict:
+		self.default = self.replies[min(self.calls, len(self.replies) - 1)]
+
+		return super()._response(messages)
+
+
+def scan(type: str, relation: str = None, **fields) -> dict:
+	return {'Node Type': type, **({'Relation Name': relation} if relation else {}), **fields}
+
+def testPostgresPlan():
+	plan = _postgresPlan(scan('Nested Loop', **{'Total Cost': 250.5, 'Plan Rows': 40, 'Plans': [
+		scan('Seq Scan', 'orders'),
+		scan('Memoize', **{'Plans': [scan('Index Scan', 'customers', **{'Index Cond': '(customer_id = orders.customer_id)'})]})
+	]}))
+
+	assert (plan['cost'], plan['rows'], plan['fullScans'], plan['cartesian']) == (250.5, 40, ['orders'], False)
+	assert plan['plan'].splitlines()[1] == '  Seq Scan on orders (cost=None rows=None)'
+
+def testPostgresPlanCartesian():
+	nested = scan('Nested Loop', **{'Plans': [scan('Seq Scan', 'orders'), scan('Materialize', **{'Plans': [scan('Seq Scan', 'customers')]})]})
+
+	assert _postgresPlan(nested)['cartesian']
+	assert not _postgresPlan({**nested, 'Join Filter': '(orders.total > customers.region)'})['cartesian']
+	assert _postgresPlan(nested)['fullScans'] == ['orders', 'customers']
+
+def testOraclePlan():
+	plan = _oraclePlan([
+		(0, 'SELECT STATEMENT', None, None, 90, 115),
+		(1, 'MERGE JOIN', 'CARTESIAN', None, 90, 115),
+		(2, 'TABLE ACCESS', 'FULL', 'CUSTOMERS', 3, 5),
+		(2, 'TABLE ACCESS', 'STORAGE FULL', 'ORDERS', 17, 23),
+		(2, 'INDEX', 'UNIQUE SCAN', 'ORDERS_PK', 1, 1)
+	])
+
+	assert (plan['cost'], plan['rows'], plan['fullScans'], plan['cartesian']) == (90, 115, ['CUSTOMERS', 'ORDERS'], True)
+	assert plan['plan'].splitlines()[1] == '  MERGE JOIN CARTESIAN (cost=90 rows=115)'
+
+def testCheck():
+	plan = {'cost': 120, 'rows': 5000, 'fullScans': ['Orders'], 'cartesian': True, 'plan': ''}
+
+	assert CostGuard(maxCost=100, maxRows=5000, allowCartesian=True).check(plan) == ['estimated cost 120 is over 100']
+	assert CostGuard(noFullScan=['ORDERS']).check(plan) == ['full scan of Orders', 'cartesian join (join without a join condition)']
+	assert CostGuard(noFullScan=['*'], allowCartesian=True).check({**plan, 'cost': None, 'rows': None}) == ['full scan of Orders']
+
+def testSqlitePlan(makeSmartSQL):
+	smartSQL = makeSmartSQL()
+
+	assert smartSQL.db.explain(CARTESIAN)['cartesian']
+
+	# Named by alias in the plan
+	plan = smartSQL.db.explain(JOINED)
+	assert (plan['fullScans'], plan['cartesian']) == (['ORDERS'], False)
+
+	assert smartSQL.db.explain('SELECT NAME FROM CUSTOMERS WHERE CUSTOMER_ID = 3')['fullScans'] == []
+
+def testRejectsFullScan(makeSmartSQL):
+	guard = CostGuard(noFullScan=['orders'], action='reject')
+
+	with pytest.raises(RuntimeError, match='full scan of ORDERS'):
+		makeSmartSQL(backend=FakeBackend(default='SELECT TOTAL FROM ORDERS o WHERE o.TOTAL > 3'), costGuard=guard).query('big orders')
+
+	smartSQL = makeSmartSQL(backend=FakeBackend(default='SELECT TOTAL FROM ORDERS WHERE ORDER_ID = 4'), costGuard=guard)
+
+	assert smartSQL.query('order 4')[0] == (6.0,)
+
+def testRejectsCartesian(makeSmartSQL):
+	smartSQL = makeSmartSQL(backend=FakeBackend(default=CARTESIAN), costGuard=CostGuard(action='reject'))
+
+	with pytest.raises(RuntimeError, match='cartesian join'):
+		smartSQL.query('names and totals')
+
+	assert list(smartSQL.backlog) == []
+
+	smartSQL = makeSmartSQL(backend=FakeBackend(default=CARTESIAN), costGuard=CostGuard(allowCartesian=True, action='reject'))
+
+	assert len(smartSQL.query('names and totals')) == 5 * 23
+
+def testConfirmAsksEvenWithoutConfirmExecute(makeSmartSQL, monkeypatch):
+	asked = []
+	monkeypatch.setattr('builtins.input', lambda prompt: asked.append(prompt) or 'n')
+
+	smartSQL = makeSmartSQL(backend=FakeBackend(default=CARTESIAN), costGuard=CostGuard(action='confirm'))
+
+	assert smartSQL.query('names and totals') == None
+	assert len(asked) == 1
+
+	# Within limits, so not asked
+	makeSmartSQL(backend=FakeBackend(default=JOINED), costGuard=CostGuard(action='confirm')).query('names and totals')
+
+	assert len(asked) == 1
+
+def testRewrite(makeSmartSQL):
+	backend = Replies(CARTESIAN, JOINED)
+	smartSQL = makeSmartSQL(backend=backend, costGuard=CostGuard(action='rewrite'))
+
+	assert len(smartSQL.query('names and totals')) == 23
+	assert backend.calls == 2
+
+def testRewriteGivesUpAfterMaxRewrites(makeSmartSQL):
+	backend = Replies(CARTESIAN)
+	smartSQL = makeSmartSQL(backend=backend, costGuard=CostGuard(action='rewrite', maxRewrites=3))
+
+	with pytest.raises(RuntimeError, match='over cost limits'):
+		smartSQL.query('names and totals')
+
+	assert backend.calls == 4
+	assert list(smartSQL.backlog) == []
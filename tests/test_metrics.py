@@ -0,0 +1,50 @@
+import pytest
+
+from Helpers.metrics import OpenTelemetryExporter
+
+trace = pytest.importorskip('opentelemetry.trace')
+
+
+class Tracer:
+	# Records (name, parent name) of every span started
+	def __init__(self) -> None:
+		self.started = []
+
+	def start_span(self, name: str, context=None, start_time: int = None, attributes: dict = None) -> 'Span':
+		parent = trace.get_current_span(context) if context != None else None
+		self.started.append((name, parent.name if isinstance(parent, Span) else None))
+
+		return Span(name)
+
+class Span(trace.NonRecordingSpan):
+	def __init__(self, name: str) -> None:
+		super().__init__(trace.INVALID_SPAN_CONTEXT)
+		self.name = name
+
+	def end(self, end_time: int = None) -> None:
+		pass
+
+
+def span(id: int, parent: int, name: str) -> dict:
+	return {'id': id, 'parent': parent, 'name': name, 'attributes': {}, 'start': id, 'seconds': 0.0}
+
+def testExportsTreeWhenRootFinishes():
+	tracer = Tracer()
+	exporter = OpenTelemetryExporter(tracer)
+
+	# Two requests in flight, children finishing before their parents
+	exporter.export(span(3, 2, 'execute'))
+	exporter.export(span(5, 4, 'prompt'))
+	exporter.export(span(2, 1, 'query'))
+
+	assert tracer.started == []
+
+	exporter.export(span(1, None, 'request'))
+
+	assert tracer.started == [('smartsql.request', None), ('smartsql.query', 'smartsql.request'), ('smartsql.execute', 'smartsql.query')]
+	assert exporter._children == {4: [span(5, 4, 'prompt')]}
+
+	exporter.export(span(4, None, 'request'))
+
+	assert tracer.started[3:] == [('smartsql.request', None), ('smartsql.prompt', 'smartsql.request')]
+	assert exporter._children == {}
@@ -0,0 +1,114 @@
+from conftest import ORDERS
+from Helpers import FakeBackend
+from Helpers.database import Database
+
+
+def pages(page) -> list[list]:
+	# Rows of each page, following .next() to the end
+	found = []
+
+	while page != None:
+		found.append(list(page))
+		page = page.next()
+
+	return found
+
+def testOffsetPaging(databasePath):
+	db = Database({'DB_PATH': databasePath}, 'sqlite')
+	found = pages(db.page('SELECT ORDER_ID FROM ORDERS ORDER BY ORDER_ID;', maxRows=5))
+
+	assert [len(page) for page in found] == [5, 5, 5, 5, 3]
+	assert [row[0] for page in found for row in page] == list(range(ORDERS))
+
+def testOffsetPagingReportsPosition(databasePath):
+	db = Database({'DB_PATH': databasePath}, 'sqlite')
+	first = db.page('SELECT ORDER_ID FROM ORDERS ORDER BY ORDER_ID', maxRows=10)
+	second = first.next()
+	third = second.next()
+
+	assert (first.offset, second.offset, third.offset) == (0, 10, 20)
+	assert (first.truncated, second.truncated, third.truncated) == (True, True, False)
+	assert third.next() == None
+	assert first.columns == ['ORDER_ID']
+
+def testExactMultipleHasNoEmptyPage(databasePath):
+	db = Database({'DB_PATH': databasePath}, 'sqlite')
+	found = pages(db.page('SELECT ORDER_ID FROM ORDERS WHERE ORDER_ID < 20 ORDER BY ORDER_ID', maxRows=5))
+
+	assert [len(page) for page in found] == [5, 5, 5, 5]
+
+def testKeysetPaging(databasePath):
+	db = Database({'DB_PATH': databasePath}, 'sqlite')
+
+	# Rows come back ordered by the keyset, whatever the query's own order
+	found = pages(db.page('SELECT ORDER_ID, TOTAL FROM ORDERS ORDER BY TOTAL DESC', maxRows=4, keyset='ORDER_ID'))
+	keys = [row[0] for page in found for row in page]
+
+	assert [len(page) for page in found] == [4, 4, 4, 4, 4, 3]
+	assert keys == list(range(ORDERS))
+
+def testKeysetPagingWithBindVariables(databasePath):
+	db = Database({'DB_PATH': databasePath}, 'sqlite')
+	found = pages(db.page('SELECT o.ORDER_ID FROM ORDERS o WHERE o.CUSTOMER_ID = :customer', {'customer': 1}, maxRows=2, keyset='o.ORDER_ID'))
+
+	assert [row[0] for page in found for row in page] == [1, 6, 11, 16, 21]
+
+def testQueryPages(makeSmartSQL):
+	smartSQL = makeSmartSQL(backend=FakeBackend(default='SELECT ORDER_ID FROM ORDERS'))
+	found = pages(smartSQL.query('orders', maxRows=10, keyset='ORDER_ID'))
+
+	assert [row[0] for page in found for row in page] == list(range(ORDERS))
+
+
+class OracleConnection:
+	# Stands in for an Oracle connection, recording the statements run and returning the first rows of `rows`
+	def __init__(self, rows: list[tuple]) -> None:
+		self.rows = rows
+		self.statements = []
+
+	def cursor(self) -> 'OracleConnection':
+		return self
+
+	def execute(self, statement: str, params: dict = None) -> None:
+		self.statements.append((statement, params))
+		self.description = [('ORDER_ID',)]
+
+	def fetchmany(self, count: int) -> list[tuple]:
+		return self.rows[:count]
+
+	def close(self) -> None:
+		pass
+
+def oracle(rows: list[tuple]) -> tuple[Database, OracleConnection]:
+	db = Database({}, 'oracle')
+	connection = OracleConnection(rows)
+	db.connect = lambda: connection
+
+	return db, connection
+
+def testOraclePagingLimitsQueryItself():
+	db, connection = oracle([(i,) for i in range(6)])
+	page = db.page('SELECT * FROM ORDERS o JOIN CUSTOMERS c ON c.CUSTOMER_ID = o.CUSTOMER_ID', maxRows=5)
+
+	assert connection.statements[-1][0] == 'SELECT * FROM ORDERS o JOIN CUSTOMERS c ON c.CUSTOMER_ID = o.CUSTOMER_ID OFFSET 0 ROWS FETCH NEXT 6 ROWS ONLY'
+	assert page.truncated
+
+	page.next()
+
+	assert connection.statements[-1][0].endswith(' OFFSET 5 ROWS FETCH NEXT 6 ROWS ONLY')
+
+def testOraclePagingKeepsOwnRowLimit():
+	for code in ('SELECT ORDER_ID FROM ORDERS ORDER BY TOTAL DESC FETCH FIRST 8 ROWS ONLY', 'SELECT ORDER_ID FROM ORDERS OFFSET 2 ROWS'):
+		db, connection = oracle([(i,) for i in range(8)])
+		page = db.page(code, maxRows=5)
+
+		# Run as it is, stopping at the cap without a next page
+		assert connection.statements == [(code, None)]
+		assert (len(page), page.truncated, page.next()) == (5, True, None)
+
+def testOracleKeysetPagingWrapsQuery():
+	db, connection = oracle([(i,) for i in range(6)])
+	page = db.page('SELECT ORDER_ID FROM ORDERS FETCH FIRST 100 ROWS ONLY', maxRows=5, keyset='ORDER_ID')
+	page.next()
+
+	assert connection.statements[-1] == ('SELECT * FROM (SELECT ORDER_ID FROM ORDERS FETCH FIRST 100 ROWS ONLY) smartsql_page WHERE ORDER_ID > :smartsql_after ORDER BY ORDER_ID OFFSET 0 ROWS FETCH NEXT 6 ROWS ONLY', {'smartsql_after': 4})
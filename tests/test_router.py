@@ -0,0 +1,40 @@
+import pytest
+
+from Helpers import CostGuard, FakeBackend, ModelRouter
+
+
+def router(fastSQL: str) -> ModelRouter:
+	return ModelRouter(FakeBackend(default=fastSQL, name='fast'), FakeBackend(default='SELECT NAME FROM CUSTOMERS ORDER BY CUSTOMER_ID', name='strong'))
+
+def testEscalatesWhenSQLFails(makeSmartSQL):
+	smartSQL = makeSmartSQL(backend=router('SELECT NAME FROM MISSING_TABLE'))
+
+	assert smartSQL.query('customer names')[0] == ('Customer 0',)
+
+	stats = smartSQL.ai.backend.stats()
+	assert (stats['fast']['failures'], stats['fast']['escalations'], stats['strong']['successes']) == (1, 1, 1)
+
+def testEscalatesWhenSQLCannotBeExplained(makeSmartSQL):
+	smartSQL = makeSmartSQL(backend=router('SELECT NAME FROM MISSING_TABLE'), costGuard=CostGuard(action='reject'))
+
+	assert smartSQL.query('customer names')[0] == ('Customer 0',)
+
+	stats = smartSQL.ai.backend.stats()
+	assert (stats['fast']['failures'], stats['fast']['escalations'], stats['strong']['successes']) == (1, 1, 1)
+
+def testEscalatesWhenOverCostLimits(makeSmartSQL):
+	# The fast model scans ORDERS, which the guard forbids
+	guard = CostGuard(noFullScan=['ORDERS'], action='reject')
+	smartSQL = makeSmartSQL(backend=router('SELECT COUNT(*) FROM ORDERS'), costGuard=guard)
+
+	assert smartSQL.query('customer names')[0] == ('Customer 0',)
+	assert smartSQL.ai.backend.stats()['fast']['escalations'] == 1
+
+def testRaisesOnceStrongModelFails(makeSmartSQL):
+	smartSQL = makeSmartSQL(backend=ModelRouter(FakeBackend(default='SELECT * FROM MISSING_A'), FakeBackend(default='SELECT * FROM MISSING_B')), costGuard=CostGuard(action='reject'))
+
+	with pytest.raises(Exception):
+		smartSQL.query('customer names')
+
+	stats = smartSQL.ai.backend.stats()
+	assert (stats['fast']['failures'], stats['strong']['failures']) == (1, 1)
@@ -0,0 +1,94 @@
+import copy
+import threading
+
+from Helpers import FakeBackend
+from Helpers.tokens import estimateTokens
+
+
+REPLIES = {
+	'add email': 'ALTER TABLE CUSTOMERS ADD EMAIL TEXT',
+	'names': 'SELECT NAME FROM CUSTOMERS ORDER BY CUSTOMER_ID',
+	'totals': 'SELECT ORDER_ID, CUSTOMER_ID, TOTAL FROM ORDERS ORDER BY ORDER_ID'
+}
+
+
+def layout(smartSQL, table: str) -> list[str]:
+	# Column names of a table as described to the AI
+	return [column.name for column in smartSQL.catalog.table(table).columns]
+
+def testSessionsKeepOwnBacklog(makeSmartSQL):
+	engine = makeSmartSQL(backend=FakeBackend(REPLIES))
+	first, second = engine.session(), engine.session()
+
+	first.query('add email')
+
+	assert len(first.backlog._undo) == 1 and first.backlog.settings is not engine.settings
+	assert second.backlog.settings is engine.settings and engine.backlog.settings is engine.settings
+
+	# Only the first session describes the new column
+	assert 'EMAIL' in first._buildPrompt('customer emails', ['CUSTOMERS'])
+	assert 'EMAIL' not in second._buildPrompt('customer emails', ['CUSTOMERS'])
+	assert 'EMAIL' not in engine._buildPrompt('customer emails', ['CUSTOMERS'])
+
+	assert layout(first, 'CUSTOMERS')[-1] == 'EMAIL'
+	assert second.catalog is engine._baseSchema['catalog']
+
+def testSessionOptions(makeSmartSQL):
+	engine = makeSmartSQL(backend=FakeBackend(REPLIES))
+	session = engine.session(confirmExecute=True, backlogTokens=10)
+
+	assert (session.debug, session.backlog.tokenBudget) == (True, 10)
+	assert (engine.debug, engine.backlog.tokenBudget) != (True, 10)
+
+	# Everything else is the engine's
+	assert session.ai is engine.ai and session.db is engine.db and session.session().engine is engine
+
+def testUpdateSettingsReachesEverySession(makeSmartSQL, settings):
+	engine = makeSmartSQL(backend=FakeBackend(REPLIES))
+	first, second = engine.session(), engine.session()
+	first.query('add email')
+
+	newSettings = copy.deepcopy(settings)
+	newSettings['Tables'][0]['Layout'].append({'Name': 'PHONE', 'Type': 'TEXT', 'Description': '', 'Properties': {'isPrimaryKey': False, 'Foreign_Reference': '', 'Constraints': []}})
+
+	# Through a session, the same as through the engine
+	second.updateSettings(newSettings)
+
+	for smartSQL in (engine, first, second):
+		prompt = smartSQL._buildPrompt('customer phones', ['CUSTOMERS'])
+
+		assert smartSQL.settings is newSettings
+		assert 'PHONE' in prompt and 'EMAIL' not in prompt
+		assert smartSQL.backlog.baseSettings is newSettings and list(smartSQL.backlog) == []
+
+def testConcurrentQueries(makeSmartSQL):
+	engine = makeSmartSQL(backend=FakeBackend(REPLIES, latency=0.01))
+	sessions = [engine.session() for _ in range(8)]
+	results = {}
+	barrier = threading.Barrier(len(sessions))
+
+	def run(index: int, session) -> None:
+		query = 'names' if index % 2 else 'totals'
+		rows = session.query(query)
+
+		# Every thread has prompted before any reads how its own prompt went
+		barrier.wait()
+		results[index] = (query, rows, session.ai.usage['completionTokens'], session.ai.timing)
+
+	threads = [threading.Thread(target=run, args=(index, session)) for index, session in enumerate(sessions)]
+
+	for thread in threads:
+		thread.start()
+
+	for thread in threads:
+		thread.join()
+
+	assert len(results) == len(sessions)
+
+	for query, rows, completionTokens, timing in results.values():
+		assert rows == engine.db.execute(REPLIES[query])
+		assert completionTokens == estimateTokens(REPLIES[query])
+		assert timing['total'] >= 0.01 and not timing['cached']
+
+	# Nothing from the sessions reached the engine
+	assert engine.ai.usage == {} and engine.promptTables == None
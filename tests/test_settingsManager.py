@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from src.settingsManager import catalog, findTable, getAllTables, loadSettings
+
+
+def testFindTable(settings):
+	assert findTable(settings, 'ORDERS') is settings['Tables'][1]
+	assert findTable(settings, 'orders') is settings['Tables'][1]
+
+	with pytest.raises(KeyError):
+		findTable(settings, 'MISSING')
+
+def testFindTablePrefersExactCase(settings):
+	settings['Tables'].append({**settings['Tables'][1], 'Name': 'orders'})
+
+	assert findTable(settings, 'orders') is settings['Tables'][2]
+	assert findTable(settings, 'ORDERS') is settings['Tables'][1]
+	assert findTable(settings, 'Orders') is settings['Tables'][1]
+
+def testFindTableSeesChangesInPlace(settings):
+	findTable(settings, 'ORDERS')
+
+	settings['Tables'].append({'Name': 'PRODUCTS', 'Layout': []})
+	assert findTable(settings, 'products') is settings['Tables'][2]
+
+	settings['Tables'][0]['Name'] = 'CLIENTS'
+	assert findTable(settings, 'CLIENTS') is settings['Tables'][0]
+
+	with pytest.raises(KeyError):
+		findTable(settings, 'CUSTOMERS')
+
+	settings['Tables'].reverse()
+	assert findTable(settings, 'ORDERS') is settings['Tables'][1]
+
+	settings['Tables'] = settings['Tables'][:1]
+	assert getAllTables(settings) == ['PRODUCTS']
+
+	with pytest.raises(KeyError):
+		findTable(settings, 'ORDERS')
+
+def testCatalogAndCompiledGiveCopies(settings, tmp_path):
+	path = tmp_path / 'settings.json'
+	path.write_text(json.dumps(settings))
+	compiled = loadSettings(str(path))
+
+	for source in (catalog(settings), compiled):
+		table = findTable(source, 'orders')
+
+		assert table == settings['Tables'][1] and table is not settings['Tables'][1]
+		assert getAllTables(source) == ['CUSTOMERS', 'ORDERS']
+
+		with pytest.raises(KeyError):
+			findTable(source, 'MISSING')
+
+	compiled.close()
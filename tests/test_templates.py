@@ -0,0 +1,113 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from Helpers.templates import TemplateCache, _render, _shape
+
+
+def testShapeReplacesLiterals():
+	shape, values = _shape("Orders for customer 1042 named 'Smith' since 2024-01-01?")
+
+	assert shape == 'orders for customer {number} named {text} since {date}'
+	assert values == ['1042', 'Smith', '2024-01-01']
+
+def testShapeIgnoresNumbersInWords():
+	shape, values = _shape('Top customers in region EU2 ')
+
+	assert shape == 'top customers in region eu2'
+	assert values == []
+
+def testRenderStyles():
+	parts = ('SELECT * FROM ORDERS WHERE CUSTOMER_ID = ', " AND STATUS = ", '')
+	slots = ((0, False), (1, True))
+
+	assert _render(parts, slots, ['877', 'OPEN'], 'named') == ("SELECT * FROM ORDERS WHERE CUSTOMER_ID = :p0 AND STATUS = :p1", {'p0': 877, 'p1': 'OPEN'})
+	assert _render(parts, slots, ['877', 'OPEN'], 'pyformat') == ("SELECT * FROM ORDERS WHERE CUSTOMER_ID = %(p0)s AND STATUS = %(p1)s", {'p0': 877, 'p1': 'OPEN'})
+	assert _render(parts, slots, ['877', 'OPEN'], 'numeric') == ("SELECT * FROM ORDERS WHERE CUSTOMER_ID = $1 AND STATUS = $2", [877, 'OPEN'])
+
+def testRenderConvertsNumbers():
+	sql, params = _render(('SELECT * FROM PRODUCTS WHERE PRICE > ', ''), ((0, False),), ['9.5'], 'named')
+
+	assert params == {'p0': 9.5}
+
+	try:
+		_render(('SELECT * FROM PRODUCTS WHERE PRICE > ', ''), ((0, False),), ['cheap'], 'named')
+	except ValueError:
+		pass
+	else:
+		assert False, 'text filled in where a number was'
+
+def testRenderEscapesPercentForPyformat():
+	sql, params = _render(("SELECT * FROM CUSTOMERS WHERE NAME = ", " AND EMAIL LIKE '%@example.com'"), ((0, True),), ['Lee'], 'pyformat')
+
+	assert sql == "SELECT * FROM CUSTOMERS WHERE NAME = %(p0)s AND EMAIL LIKE '%%@example.com'"
+
+def testLearnAndMatch():
+	templates = TemplateCache()
+
+	assert templates.learn('orders for customer 1042', None, 'SELECT * FROM ORDERS WHERE CUSTOMER_ID = 1042;', 1.5)
+	assert templates.match('Orders for customer 877', None) == ('SELECT * FROM ORDERS WHERE CUSTOMER_ID = :p0', {'p0': 877})
+	assert templates.stats()['savedSeconds'] == 1.5
+
+def testLearnQuotedText():
+	templates = TemplateCache()
+
+	assert templates.learn("customers named 'Smith'", None, "SELECT * FROM CUSTOMERS WHERE NAME = 'Smith' AND NOTE <> 'it''s'")
+	assert templates.match("customers named 'Lee'", None) == ("SELECT * FROM CUSTOMERS WHERE NAME = :p0 AND NOTE <> 'it''s'", {'p0': 'Lee'})
+
+def testLearnSkipsQuotedIdentifiers():
+	templates = TemplateCache()
+
+	assert templates.learn('orders for customer 7', None, 'SELECT "7" FROM ORDERS WHERE CUSTOMER_ID = 7')
+	assert templates.match('orders for customer 8', None) == ('SELECT "7" FROM ORDERS WHERE CUSTOMER_ID = :p0', {'p0': 8})
+
+def testLearnRefusesValueFoundTwice():
+	templates = TemplateCache()
+
+	# The flag equals the region by chance, and must not follow it
+	assert not templates.learn('customers in region 1', None, 'SELECT * FROM CUSTOMERS WHERE REGION_ID = 1 AND ACTIVE = 1')
+	assert templates.match('customers in region 3', None) == None
+
+	assert not templates.learn('first 5 orders', None, 'SELECT * FROM ORDERS WHERE STATUS = 5 FETCH FIRST 5 ROWS ONLY')
+
+def testLearnRefusesMissingValue():
+	templates = TemplateCache()
+
+	assert not templates.learn('orders for customer 1042 in 2024', None, 'SELECT * FROM ORDERS WHERE CUSTOMER_ID = 1042')
+
+def testLearnRefusesEqualRequestValues():
+	templates = TemplateCache()
+
+	assert not templates.learn('orders between 5 and 5', None, 'SELECT * FROM ORDERS WHERE TOTAL BETWEEN 5 AND 5')
+
+def testLearnRefusesUnbindable():
+	templates = TemplateCache()
+
+	assert not templates.learn('orders sorted by column 2', None, 'SELECT ORDER_ID, TOTAL FROM ORDERS ORDER BY 2')
+	assert not templates.learn("orders since '2024-01-01'", None, "SELECT * FROM ORDERS WHERE PLACED >= DATE '2024-01-01'")
+
+def testLearnOnlyQueries():
+	templates = TemplateCache()
+
+	assert not templates.learn('delete customer 7', None, 'DELETE FROM CUSTOMERS WHERE CUSTOMER_ID = 7')
+	assert not templates.learn('customer 7', None, 'SELECT * FROM CUSTOMERS WHERE CUSTOMER_ID = 7; DROP TABLE CUSTOMERS')
+
+def testMatchNeedsSameContext():
+	templates = TemplateCache()
+	templates.learn('orders for customer 1042', ('ORDERS',), 'SELECT * FROM ORDERS WHERE CUSTOMER_ID = 1042')
+
+	assert templates.match('orders for customer 877', None) == None
+	assert templates.match('orders for customer 877', ('ORDERS',)) != None
+
+def testForgetAndEviction():
+	templates = TemplateCache(maxTemplates=1)
+	templates.learn('orders for customer 1', None, 'SELECT * FROM ORDERS WHERE CUSTOMER_ID = 1')
+	templates.learn('products over 2', None, 'SELECT * FROM PRODUCTS WHERE PRICE > 2')
+
+	assert templates.match('orders for customer 3', None) == None
+	assert templates.match('products over 4', None) != None
+
+	templates.forget('products over 9', None)
+
+	assert templates.match('products over 4', None) == None